@@ -1,6 +1,16 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.routers import coach, translation
+from app.services.transcoding import live_transcoding_pool, transcoding_pool
+from app.services.audio_ingest import MAX_UPLOAD_BYTES
+from app.services.tts_assets import load_asset_pack
+from app.services.offline_speech import OfflineSpeechBackend
+from app.services.speech_backend import SPEECH_BACKEND, get_speech_backend
+from app.services.speech_gateway import speech_gateway
+from app.services.speech_pool import speech_pool
+from app.services.audio_formats import DEFAULT_AUDIO_FORMAT
+import asyncio
 import os
 import logging
 
@@ -13,7 +23,21 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s - %(filename)s:%(lineno)d - %(funcName)s'
 )
 
-# Configure CORS
+# Multipart framing adds a little on top of the audio itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Refuse uploads from the declared Content-Length before the body is read"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Upload is too large (limit {MAX_UPLOAD_BYTES} bytes)"}
+        )
+    return await call_next(request)
+
+# Configure CORS (added last so it wraps the upload check and its 413 responses)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -35,15 +59,38 @@ app.include_router(translation.router)
 async def startup_event():
     print("\n--- Registered Routes ---")
     for route in app.routes:
-        print(f"Path: {route.path}, Methods: {route.methods}, Name: {route.name}")
+        print(f"Path: {route.path}, Methods: {getattr(route, 'methods', 'WEBSOCKET')}, Name: {route.name}")
     print("--- End of Routes ---\n")
     
     # Additional debugging for translation router
     print("\n--- Translation Router Routes ---")
     for route in translation.router.routes:
-        print(f"Path: {route.path}, Methods: {route.methods}, Name: {route.name}")
+        print(f"Path: {route.path}, Methods: {getattr(route, 'methods', 'WEBSOCKET')}, Name: {route.name}")
     print("--- End of Translation Router Routes ---\n")
 
+    await transcoding_pool.start()
+    await live_transcoding_pool.start()
+    load_asset_pack()
+
+    # Open synthesizer connections for the busiest voices before the first request
+    prewarm_voices = [voice.strip() for voice in os.getenv("SPEECH_POOL_PREWARM_VOICES", "").split(",") if voice.strip()]
+    if prewarm_voices and SPEECH_BACKEND == "azure":
+        asyncio.get_running_loop().run_in_executor(None, speech_pool.prewarm, prewarm_voices, DEFAULT_AUDIO_FORMAT)
+    if SPEECH_BACKEND == "azure":
+        speech_pool.start_sweeper()
+
+    # Offline recognition models take a few seconds to load
+    speech_backend = get_speech_backend()
+    if isinstance(speech_backend, OfflineSpeechBackend):
+        asyncio.get_running_loop().run_in_executor(None, speech_backend.load_models)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await transcoding_pool.stop()
+    await live_transcoding_pool.stop()
+    speech_pool.close()
+    speech_gateway.close()
+
 # Root endpoint
 @app.get("/")
 def root():
@@ -1,18 +1,21 @@
 import os
-import azure.cognitiveservices.speech as speechsdk
 import numpy as np
-from typing import Dict, Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List, Union
 from dotenv import load_dotenv
 import logging
 import io
 import wave
-import json
-from pathlib import Path
 import asyncio
 import sys
-import audioop
-import time
 import subprocess
+from app.modules.accent_detection.embedding_store import EmbeddingStore, load_references
+from app.modules.accent_detection.embeddings import ReferenceEmbeddings, extract_embedding
+from app.services.audio_buffer import AudioBuffer
+from app.services.audio_conditioning import SPEECH_SAMPLE_RATE
+from app.services.speech_backend import NO_MATCH, RECOGNIZED, SPEECH_BACKEND, get_speech_backend
+from app.services.speech_pool import ACCENT_PROFILE
+from app.services.transcoding import TranscodingBusyError, TranscodingError, build_decode_args, transcoding_pool
+from app.services.vad import detect_speech
 
 # Configure logging
 logging.basicConfig(
@@ -24,13 +27,33 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Wall-clock budget for recognizing in all locales, including any wait for a gateway slot
+ACCENT_DETECTION_DEADLINE = float(os.getenv("ACCENT_DETECTION_DEADLINE_SECONDS", "5.0"))
+
+# One recognition per candidate locale, a single one with language identification,
+# or the local acoustic-embedding classifier with no recognition at all
+PER_LOCALE = "per_locale"
+IDENTIFY = "identify"
+EMBEDDING = "embedding"
+ACCENT_DETECTION_STRATEGIES = (PER_LOCALE, IDENTIFY, EMBEDDING)
+ACCENT_DETECTION_STRATEGY = os.getenv("ACCENT_DETECTION_STRATEGY", PER_LOCALE)
+
+# Softmax temperature over the embedding similarities
+ACCENT_EMBEDDING_TEMPERATURE = float(os.getenv("ACCENT_EMBEDDING_TEMPERATURE", "0.1"))
+# When the two most likely accents are closer than this, ask a recognition strategy too;
+# an empty ACCENT_EMBEDDING_TIE_BREAKER keeps detection fully local
+ACCENT_EMBEDDING_MARGIN = float(os.getenv("ACCENT_EMBEDDING_MARGIN", "0.15"))
+ACCENT_EMBEDDING_TIE_BREAKER = os.getenv("ACCENT_EMBEDDING_TIE_BREAKER", IDENTIFY)
+
 class AccentDetector:
-    def __init__(self):
+    def __init__(self, deadline: float = ACCENT_DETECTION_DEADLINE, references: Optional[Union[EmbeddingStore, ReferenceEmbeddings]] = None):
         self.speech_key = os.getenv("AZURE_SPEECH_KEY")
         self.service_region = os.getenv("AZURE_SPEECH_REGION")
+        self.deadline = deadline
+        self.references = references if references is not None else load_references()
         logger.info(f"Initializing AccentDetector with region: {self.service_region}")
         
-        if not self.speech_key or not self.service_region:
+        if SPEECH_BACKEND == "azure" and (not self.speech_key or not self.service_region):
             logger.error("Azure Speech credentials not found in environment variables")
             raise ValueError("Azure Speech credentials not found in environment variables")
         
@@ -53,186 +76,111 @@ class AccentDetector:
             }
         }
 
-    def _trim_silence(self, frames: bytes, sampwidth: int, threshold: int = 500) -> bytes:
+    def _trim_silence(self, audio: AudioBuffer, threshold: int = 500) -> AudioBuffer:
         """Trim silence from the beginning and end of the audio."""
         try:
-            # Convert bytes to array of samples
-            sample_size = sampwidth
-            total_samples = len(frames) // sample_size
-            
-            # Find start of speech
-            start_pos = 0
-            for i in range(0, len(frames), sample_size * 100):  # Process in blocks
-                chunk = frames[i:i + sample_size * 100]
-                if len(chunk) >= sample_size and audioop.rms(chunk, sample_size) > threshold:
-                    start_pos = i
-                    break
-            
-            # Find end of speech
-            end_pos = len(frames)
-            for i in range(len(frames) - sample_size * 100, 0, -sample_size * -100):
-                chunk = frames[i:i + sample_size * 100]
-                if len(chunk) >= sample_size and audioop.rms(chunk, sample_size) > threshold:
-                    end_pos = i + sample_size * 100
-                    break
-            
-            # Ensure we don't trim too much
-            if end_pos - start_pos < sample_size * 100:  # At least 100 samples
+            speech_map = detect_speech(audio, rms_threshold=threshold / 32768.0)
+            bounds = speech_map.bounds()
+            if bounds is None:
                 logger.warning("Audio too short after trimming, using original")
-                return frames
-            
-            trimmed = frames[start_pos:end_pos]
-            logger.debug(f"Trimmed audio from {len(frames)} to {len(trimmed)} bytes")
+                return audio
+
+            trimmed = audio.trim(*bounds)
+            logger.debug(f"Trimmed audio from {audio.frames} to {trimmed.frames} frames")
             return trimmed
-            
+
         except Exception as e:
             logger.error(f"Error trimming silence: {str(e)}", exc_info=True)
-            return frames
+            return audio
 
-    def _validate_audio(self, audio_data: bytes) -> bool:
-        """Validate audio data."""
+    def _validate_audio(self, audio: AudioBuffer) -> bool:
+        """Validate decoded audio."""
         try:
-            if audio_data is None or len(audio_data) < 44:  # WAV header is 44 bytes
-                logger.error("Invalid audio data (too short or None)")
+            if audio is None or audio.frames == 0:
+                logger.error("Invalid audio data (empty or None)")
                 return False
-            
-            try:
-                with wave.open(io.BytesIO(audio_data), 'rb') as wav_file:
-                    # Check channels (should be mono)
-                    channels = wav_file.getnchannels()
-                    if channels > 2:
-                        logger.error(f"Unsupported number of channels: {channels}")
-                        return False
-                    
-                    # Check sample width (should be 16-bit)
-                    sample_width = wav_file.getsampwidth()
-                    if sample_width not in [1, 2, 4]:  # 8-bit, 16-bit, or 32-bit
-                        logger.error(f"Unsupported sample width: {sample_width}")
-                        return False
-                    
-                    # Check frame rate (should be close to 16kHz)
-                    frame_rate = wav_file.getframerate()
-                    if not (8000 <= frame_rate <= 48000):
-                        logger.error(f"Unsupported frame rate: {frame_rate}")
-                        return False
-                    
-                    # Read a small chunk to verify data
-                    chunk = wav_file.readframes(1024)
-                    if not chunk:
-                        logger.error("No audio data found")
-                        return False
-                    
-                    # Check volume levels
-                    rms = audioop.rms(chunk, sample_width)
-                    if rms < 1:
-                        logger.error("Audio too quiet")
-                        return False
-                    
-                    return True
-                    
-            except Exception as e:
-                logger.error(f"WAV validation error: {str(e)}")
+
+            if audio.channels > 2:
+                logger.error(f"Unsupported number of channels: {audio.channels}")
                 return False
-                
+
+            if not (8000 <= audio.sample_rate <= 48000):
+                logger.error(f"Unsupported frame rate: {audio.sample_rate}")
+                return False
+
+            # Check volume levels on the first 1024 frames
+            if audio.slice(0, 1024).to_int16().rms() < 1:
+                logger.error("Audio too quiet")
+                return False
+
+            return True
+
         except Exception as e:
             logger.error(f"Audio validation error: {str(e)}")
             return False
 
-    def _preprocess_audio(self, audio_data: bytes) -> Optional[bytes]:
-        """Preprocess audio data for recognition."""
+    @staticmethod
+    def _preprocess_audio(audio: AudioBuffer) -> Optional[AudioBuffer]:
+        """Preprocess decoded audio for recognition."""
         try:
-            # Convert to WAV format if needed
-            wav_data = self._ensure_wav_format(audio_data)
-            if not wav_data:
-                return None
+            logger.debug(f"Original audio properties - Channels: {audio.channels}, "
+                        f"Frame rate: {audio.sample_rate}, Frames: {audio.frames}")
 
-            # Read WAV properties
-            with wave.open(io.BytesIO(wav_data), 'rb') as wav_file:
-                channels = wav_file.getnchannels()
-                sample_width = wav_file.getsampwidth()
-                frame_rate = wav_file.getframerate()
-                frames = wav_file.readframes(wav_file.getnframes())
-
-            logger.debug(f"Original audio properties - Channels: {channels}, "
-                        f"Sample width: {sample_width}, Frame rate: {frame_rate}")
-
-            # Convert to mono if needed
-            if channels > 1:
-                frames = audioop.tomono(frames, sample_width, 1, 1)
-
-            # Ensure 16-bit PCM
-            if sample_width != 2:
-                frames = audioop.lin2lin(frames, sample_width, 2)
-                sample_width = 2
-
-            # Resample to 16kHz if needed
-            if frame_rate != 16000:
-                frames = audioop.ratecv(frames, sample_width, 1, frame_rate, 16000, None)[0]
-                frame_rate = 16000
-
-            # Trim silence from start and end
-            start_pos = 0
-            end_pos = len(frames)
-            
-            # Find start (skip initial silence)
-            rms_threshold = 500  # Adjusted threshold for silence detection
-            chunk_size = 1024
-            for i in range(0, len(frames) - chunk_size, chunk_size):
-                chunk = frames[i:i + chunk_size]
-                rms = audioop.rms(chunk, sample_width)
-                if rms > rms_threshold:
-                    start_pos = max(0, i - chunk_size)  # Include a bit before speech
-                    break
-
-            # Find end (skip trailing silence)
-            for i in range(len(frames) - chunk_size, start_pos, -chunk_size):
-                chunk = frames[i:i + chunk_size]
-                rms = audioop.rms(chunk, sample_width)
-                if rms > rms_threshold:
-                    end_pos = min(len(frames), i + chunk_size * 2)  # Include a bit after speech
-                    break
+            # Mono 16-bit PCM at 16kHz
+            audio = audio.for_recognition()
+
+            # One VAD pass gives both the silence check and the trim points
+            speech_map = detect_speech(audio)
+            logger.debug(f"Speech map: {speech_map.pause_metrics()}")
 
             # Skip if too much silence
-            if end_pos - start_pos < chunk_size * 2:
+            if speech_map.is_mostly_silence(min_speech_seconds=0.064):
                 logger.warning("Audio contains mostly silence")
                 return None
 
-            # Trim the audio
-            frames = frames[start_pos:end_pos]
-
-            # Normalize volume
-            max_vol = audioop.max(frames, sample_width)
-            if max_vol > 0:
-                target_vol = 32000  # Target volume (16-bit audio)
-                frames = audioop.mul(frames, sample_width, min(target_vol / max_vol, 2.0))
+            # Trim the audio, keeping a bit before and after speech (a view, no copy)
+            audio = audio.trim(*speech_map.bounds(padding=0.05))
 
-            # Get final RMS value
-            final_rms = audioop.rms(frames, sample_width)
-            logger.debug(f"Final RMS value: {final_rms}")
+            # Filter, denoise and normalize with the shared conditioning engine
+            audio = audio.condition().to_int16()
 
-            # Create new WAV file
-            output = io.BytesIO()
-            with wave.open(output, 'wb') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(sample_width)
-                wav_file.setframerate(frame_rate)
-                wav_file.writeframes(frames)
+            logger.debug(f"Final RMS value: {audio.rms():.1f}")
 
-            processed_data = output.getvalue()
-            logger.debug(f"Processed audio size: {len(processed_data)} bytes")
-
-            if len(processed_data) < 1000:
+            if audio.frames < 500:
                 logger.warning("Processed audio is too short")
                 return None
 
-            return processed_data
+            return audio
 
         except Exception as e:
             logger.error(f"Error preprocessing audio: {str(e)}", exc_info=True)
             return None
 
-    def _ensure_wav_format(self, audio_data: bytes) -> Optional[bytes]:
-        """Ensure audio is in WAV format."""
+    @staticmethod
+    async def _decode(audio_data: bytes) -> Optional[AudioBuffer]:
+        """Decode an upload without blocking the event loop.
+
+        PCM WAV is read directly; anything else goes through the shared ffmpeg
+        transcoding pool.
+        """
+        if audio_data is None or len(audio_data) < 44:  # WAV header is 44 bytes
+            logger.error("Invalid audio data (too short or None)")
+            return None
+        audio = AudioBuffer.from_wav_bytes(audio_data)
+        if audio is not None:
+            return audio
+        try:
+            pcm_data = await transcoding_pool.submit(audio_data, build_decode_args(None))
+        except TranscodingBusyError:
+            raise
+        except TranscodingError as e:
+            logger.error(f"FFmpeg conversion failed: {str(e)}")
+            return None
+        return AudioBuffer.from_pcm16(pcm_data, SPEECH_SAMPLE_RATE)
+
+    @staticmethod
+    def _ensure_wav_format(audio_data: bytes) -> Optional[bytes]:
+        """Ensure audio is in WAV format, blocking on ffmpeg; for offline tools, see _decode."""
         try:
             if audio_data is None or len(audio_data) < 44:  # WAV header is 44 bytes
                 logger.error("Invalid audio data (too short or None)")
@@ -394,155 +342,195 @@ class AccentDetector:
             logger.error(f"Error calculating score: {str(e)}")
             return 0.0
 
-    async def _get_recognition_results(self, audio_data: bytes, language: str) -> Tuple[List[str], float]:
-        """Get recognition results using speech recognition."""
+    async def _get_recognition_results(
+        self,
+        processed_audio: AudioBuffer,
+        language: str,
+        timeout: float = ACCENT_DETECTION_DEADLINE
+    ) -> Tuple[List[str], float]:
+        """Get recognition results for audio already run through _preprocess_audio."""
         logger.debug(f"Starting recognition for {language}")
         
         try:
-            # Preprocess audio
-            processed_audio = self._preprocess_audio(audio_data)
-            if processed_audio is None:
-                logger.error("Audio preprocessing failed")
-                return [], 0.0
-            
-            # Create speech config with custom settings
-            speech_config = speechsdk.SpeechConfig(
-                subscription=self.speech_key,
-                region=self.service_region
-            )
-            speech_config.speech_recognition_language = language
-            
-            # Configure recognition settings
-            speech_config.set_property(
-                speechsdk.PropertyId.SpeechServiceConnection_InitialSilenceTimeoutMs,
-                "3000"  # 3 second initial silence timeout
-            )
-            speech_config.set_property(
-                speechsdk.PropertyId.SpeechServiceConnection_EndSilenceTimeoutMs,
-                "800"  # 800ms end silence timeout
-            )
-            speech_config.set_property(
-                speechsdk.PropertyId.Speech_SegmentationSilenceTimeoutMs,
-                "200"  # 200ms segmentation silence timeout
-            )
-            speech_config.enable_audio_logging()
-            
-            # Create audio stream and config
-            audio_stream = None
-            recognizer = None
-            
+            # Short silence timeouts and audio logging, see ACCENT_PROFILE
             try:
-                # Create a new memory stream from the processed audio
-                audio_stream = speechsdk.audio.PushAudioInputStream()
-                audio_config = speechsdk.audio.AudioConfig(stream=audio_stream)
+                # Recognition time is measured on the worker, so waiting for a gateway slot does not count against the score
+                result = await get_speech_backend().recognize(processed_audio, language, ACCENT_PROFILE, timeout=timeout)
                 
-                # Create recognizer
-                recognizer = speechsdk.SpeechRecognizer(
-                    speech_config=speech_config,
-                    audio_config=audio_config
-                )
+                if result.status == RECOGNIZED:
+                    text = result.text
+                    if text:
+                        logger.info(f"Recognized text for {language}: {text}")
+                        logger.debug(f"Recognition confidence: {result.confidence}")
+                        if result.alternatives:
+                            logger.debug(f"Alternative results: {result.alternatives[:2]}")
+                        
+                        # Calculate score
+                        final_score = self._calculate_score(text, result.elapsed, result.confidence, language)
+                        
+                        return [text], final_score
                 
-                # Write all audio data at once
-                audio_stream.write(processed_audio)
-                audio_stream.close()
+                elif result.status == NO_MATCH:
+                    logger.warning(f"No match for {language}: {result.detail}")
                 
-                # Start recognition
-                start_time = time.time()
-                try:
-                    result_future = asyncio.create_task(
-                        asyncio.to_thread(recognizer.recognize_once_async().get)
-                    )
-                    
-                    result = await asyncio.wait_for(result_future, timeout=5.0)
-                    recognition_time = time.time() - start_time
-                    
-                    if result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                        text = result.text.strip()
-                        if text:
-                            logger.info(f"Recognized text for {language}: {text}")
-                            
-                            # Get confidence and detailed results
-                            confidence = 1.0
-                            try:
-                                json_result = json.loads(result.properties.get(
-                                    speechsdk.PropertyId.SpeechServiceResponse_JsonResult
-                                ))
-                                confidence = json_result.get('NBest', [{}])[0].get('Confidence', 1.0)
-                                logger.debug(f"Recognition confidence: {confidence}")
-                                
-                                # Get alternative results if available
-                                alternatives = json_result.get('NBest', [])[1:]
-                                if alternatives:
-                                    alt_texts = [alt.get('Lexical', '') for alt in alternatives[:2]]
-                                    logger.debug(f"Alternative results: {alt_texts}")
-                            except Exception as e:
-                                logger.warning(f"Could not get detailed results: {str(e)}")
-                            
-                            # Calculate score
-                            final_score = self._calculate_score(text, recognition_time, confidence, language)
-                            
-                            return [text], final_score
-                    
-                    elif result.reason == speechsdk.ResultReason.NoMatch:
-                        no_match_reason = result.no_match_details.reason
-                        logger.warning(f"No match for {language}: {no_match_reason}")
-                        if no_match_reason == speechsdk.NoMatchReason.InitialSilenceTimeout:
-                            logger.debug("Initial silence detected")
-                        elif no_match_reason == speechsdk.NoMatchReason.InitialBabbleTimeout:
-                            logger.debug("Initial babble detected")
-                    
-                    elif result.reason == speechsdk.ResultReason.Canceled:
-                        cancellation = speechsdk.CancellationDetails(result)
-                        logger.warning(f"Recognition canceled: {cancellation.reason}")
-                        if cancellation.reason == speechsdk.CancellationReason.Error:
-                            logger.error(f"Error details: {cancellation.error_details}")
-                    
-                    else:
-                        logger.warning(f"Unexpected recognition result: {result.reason}")
-                    
-                except asyncio.TimeoutError:
-                    logger.warning(f"Recognition timeout for {language}")
-                
-                return [], 0.0
+                else:
+                    logger.warning(f"Recognition canceled: {result.detail}")
                 
-            finally:
-                # Clean up resources
-                if audio_stream:
-                    try:
-                        audio_stream.close()
-                    except:
-                        pass
+            except asyncio.TimeoutError:
+                logger.warning(f"Recognition timeout for {language}")
+            
+            return [], 0.0
             
         except Exception as e:
             logger.error(f"Error in recognition: {str(e)}", exc_info=True)
             return [], 0.0
 
-    async def detect_accent(self, audio_data: bytes) -> Dict[str, float]:
-        """Detect accent by comparing recognition across different language models."""
+    async def _score_per_locale(self, processed_audio: AudioBuffer) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+        """One recognition per candidate locale, all at once under one shared deadline."""
+        scores = {accent: 0.0 for accent in self.accent_configs}
+        texts = {accent: [] for accent in self.accent_configs}
+        tasks = {
+            asyncio.create_task(self._get_recognition_results(processed_audio, config["lang"], self.deadline)): accent
+            for accent, config in self.accent_configs.items()
+        }
+        done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            # Keep the locales that finished; the rest count as unrecognized
+            logger.warning(f"Recognition timed out for: {', '.join(tasks[task] for task in pending)}")
+        
+        for task in done:
+            accent = tasks[task]
+            texts_list, score = task.result()
+            scores[accent] = score * self.accent_configs[accent]["weight"]
+            texts[accent] = texts_list
+        return scores, texts
+
+    async def _score_identified(self, processed_audio: AudioBuffer) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+        """A single recognition that identifies the locale among the candidates.
+
+        The identified locale gets the service's language confidence and the
+        others share the remainder; each is then scored on the one transcript
+        with the same lexical markers as the per-locale strategy.
+        """
+        scores = {accent: 0.0 for accent in self.accent_configs}
+        texts = {accent: [] for accent in self.accent_configs}
+        candidates = [config["lang"] for config in self.accent_configs.values()]
         try:
-            logger.info(f"Starting accent detection with {len(audio_data)} bytes of audio")
-            
-            # Ensure audio is in WAV format
-            audio_data = self._ensure_wav_format(audio_data)
-            
-            # Process each accent
-            scores = {}
-            texts = {}
-            total_score = 0.0
-            
-            for accent, config in self.accent_configs.items():
-                logger.info(f"Processing {accent} accent")
-                texts_list, score = await self._get_recognition_results(
-                    audio_data,
-                    config["lang"]
-                )
-                weighted_score = score * config["weight"]
-                scores[accent] = weighted_score
-                texts[accent] = texts_list
-                total_score += weighted_score
-            
-            logger.info(f"Raw scores: {scores}")
-            logger.info(f"Recognition texts: {texts}")
+            result = await get_speech_backend().identify_language(
+                processed_audio, candidates, ACCENT_PROFILE, timeout=self.deadline
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Language identification timed out")
+            return scores, texts
+        
+        if not result.recognized or not result.text:
+            logger.warning(f"Language identification found no speech: {result.detail}")
+            return scores, texts
+        logger.info(f"Identified {result.language} ({result.language_confidence}): {result.text}")
+        
+        others = max(1, len(candidates) - 1)
+        for accent, config in self.accent_configs.items():
+            if config["lang"] == result.language:
+                language_confidence = result.language_confidence
+            else:
+                language_confidence = (1.0 - result.language_confidence) / others
+            score = self._calculate_score(result.text, result.elapsed, result.confidence * language_confidence, config["lang"])
+            scores[accent] = score * config["weight"]
+            texts[accent] = [result.text]
+        return scores, texts
+
+    async def _score_embedding(
+        self, processed_audio: AudioBuffer, tie_breaker: Optional[str] = ACCENT_EMBEDDING_TIE_BREAKER
+    ) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+        """Local classifier: the clip's acoustic embedding against the accent references.
+
+        The references are the binary store's nearest neighbours when one has
+        been built, else each accent's centroid from reference_embeddings.json.
+        Runs on the CPU in milliseconds. When there are no references, or the
+        top two accents are within ACCENT_EMBEDDING_MARGIN, the ``tie_breaker``
+        strategy is run and averaged in; an empty one keeps scoring local.
+        """
+        accents = [accent for accent in self.accent_configs if accent in self.references.accents]
+        tie_breaker = tie_breaker if tie_breaker in (PER_LOCALE, IDENTIFY) else None
+        if not accents:
+            logger.warning("No reference embeddings loaded, see build_reference_embeddings.py")
+            if tie_breaker is None:
+                return {accent: 0.0 for accent in self.accent_configs}, {accent: [] for accent in self.accent_configs}
+            return await self._score_by(tie_breaker, processed_audio)
+        
+        loop = asyncio.get_running_loop()
+        embedding = await loop.run_in_executor(None, extract_embedding, processed_audio)
+        similarities = self.references.scores(embedding)
+        logger.info(f"Embedding similarities: {similarities}")
+        
+        weights = {accent: np.exp(similarities[accent] / ACCENT_EMBEDDING_TEMPERATURE) if accent in accents else 0.0 for accent in self.accent_configs}
+        total = sum(weights.values())
+        scores = {accent: weight / total for accent, weight in weights.items()}
+        texts = {accent: [] for accent in self.accent_configs}
+        
+        top = sorted(scores.values(), reverse=True)
+        if tie_breaker and len(top) > 1 and top[0] - top[1] < ACCENT_EMBEDDING_MARGIN:
+            logger.info(f"Embedding margin {top[0] - top[1]:.3f} too small, breaking the tie with {tie_breaker}")
+            tie_scores, texts = await self._score_by(tie_breaker, processed_audio)
+            tie_total = sum(tie_scores.values())
+            if tie_total > 0:
+                scores = {accent: (scores[accent] + tie_scores[accent] / tie_total) / 2 for accent in scores}
+        return scores, texts
+
+    async def _score_by(
+        self, strategy: str, processed_audio: AudioBuffer, tie_breaker: Optional[str] = ACCENT_EMBEDDING_TIE_BREAKER
+    ) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+        if strategy == EMBEDDING:
+            return await self._score_embedding(processed_audio, tie_breaker)
+        if strategy == IDENTIFY:
+            return await self._score_identified(processed_audio)
+        return await self._score_per_locale(processed_audio)
+
+    async def score_accents(
+        self, audio_data: bytes, strategy: Optional[str] = None, tie_breaker: Optional[str] = ACCENT_EMBEDDING_TIE_BREAKER
+    ) -> Dict[str, float]:
+        """Raw per-accent scores of a recording, all zero when it gave no evidence.
+
+        ``strategy`` is PER_LOCALE (one recognition per candidate locale),
+        IDENTIFY (one recognition with language identification) or EMBEDDING
+        (local acoustic classifier); defaults to ACCENT_DETECTION_STRATEGY.
+        ``tie_breaker`` is the recognition strategy EMBEDDING falls back on.
+        """
+        strategy = strategy or ACCENT_DETECTION_STRATEGY
+        if strategy not in ACCENT_DETECTION_STRATEGIES:
+            raise ValueError(f"Unknown accent detection strategy: {strategy}")
+        logger.info(f"Starting accent detection ({strategy}) with {len(audio_data)} bytes of audio")
+        
+        # Decode once for every locale, on the transcoding pool when it is not WAV
+        audio = await self._decode(audio_data)
+        if audio is None:
+            raise ValueError("Could not decode audio")
+        
+        # Preprocess once, off the event loop, and share the result across locales
+        loop = asyncio.get_running_loop()
+        processed_audio = await loop.run_in_executor(None, self._preprocess_audio, audio)
+        
+        if processed_audio is None:
+            logger.error("Audio preprocessing failed")
+            scores = {accent: 0.0 for accent in self.accent_configs}
+            texts = {accent: [] for accent in self.accent_configs}
+        else:
+            scores, texts = await self._score_by(strategy, processed_audio, tie_breaker)
+        
+        logger.info(f"Raw scores: {scores}")
+        logger.info(f"Recognition texts: {texts}")
+        return scores
+
+    async def detect_accent(self, audio_data: bytes, strategy: Optional[str] = None) -> Dict[str, float]:
+        """Detect accent by comparing recognition across different language models.
+
+        Returns percentages, most likely first; see score_accents for ``strategy``.
+        """
+        try:
+            scores = await self.score_accents(audio_data, strategy)
+            total_score = sum(scores.values())
             
             # Calculate percentages
             if total_score > 0:
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+from app.modules.accent_detection.accent_detector import ACCENT_EMBEDDING_TIE_BREAKER, EMBEDDING, AccentDetector
+
+logger = logging.getLogger(__name__)
+
+# Posterior probability of the leading accent after which a session stops being probed
+ACCENT_TRACKER_CONFIDENCE = float(os.getenv("ACCENT_TRACKER_CONFIDENCE", "0.9"))
+# Turns are not independent evidence (same speaker, same microphone), so each
+# one's log-likelihood is tempered by this weight before it is added
+ACCENT_TRACKER_EVIDENCE_WEIGHT = float(os.getenv("ACCENT_TRACKER_EVIDENCE_WEIGHT", "0.5"))
+# Strategy scoring conversation turns, see AccentDetector.score_accents. Turns are
+# never sent to a tie-breaker, so with the default they stay local and free, and are
+# not scored at all until reference embeddings have been built
+ACCENT_TRACKER_TURN_STRATEGY = os.getenv("ACCENT_TRACKER_TURN_STRATEGY", EMBEDDING)
+# A turn's probabilities are floored so one bad turn can never rule an accent out
+MIN_TURN_PROBABILITY = 0.01
+
+
+@dataclass
+class AccentEstimate:
+    """Running log-posterior of one session's accent
+
+    Each turn adds its tempered log-probabilities, so an update costs the
+    same however many turns came before.
+    """
+    log_posterior: Dict[str, float]
+    turns: int = 0
+    expires_at: float = 0.0
+
+    def update(self, probabilities: Dict[str, float], weight: float):
+        total = sum(probabilities.get(accent, 0.0) for accent in self.log_posterior)
+        if total <= 0:
+            return
+        for accent in self.log_posterior:
+            probability = max(MIN_TURN_PROBABILITY, probabilities.get(accent, 0.0) / total)
+            self.log_posterior[accent] += weight * math.log(probability)
+        # Keep the largest at zero so the sums never drift towards -inf
+        peak = max(self.log_posterior.values())
+        self.log_posterior = {accent: value - peak for accent, value in self.log_posterior.items()}
+        self.turns += 1
+
+    def posterior(self) -> Dict[str, float]:
+        weights = {accent: math.exp(value) for accent, value in self.log_posterior.items()}
+        total = sum(weights.values())
+        return dict(sorted(((accent, weight / total) for accent, weight in weights.items()), key=lambda x: x[1], reverse=True))
+
+    @property
+    def confidence(self) -> float:
+        return next(iter(self.posterior().values()))
+
+    def percentages(self) -> Dict[str, float]:
+        """Posterior in AccentDetector.detect_accent's shape: percentages, most likely first"""
+        return {accent: probability * 100 for accent, probability in self.posterior().items()}
+
+
+class AccentTracker:
+    """Per-session accent estimate accumulated across detections and conversation turns
+
+    Sessions expire after ``ttl`` seconds without evidence and the least
+    recently updated are evicted past ``max_sessions``. Once a session's
+    leading accent passes ``confidence``, further audio is not scored.
+    """
+
+    def __init__(
+        self,
+        detector: Optional[AccentDetector] = None,
+        confidence: float = ACCENT_TRACKER_CONFIDENCE,
+        weight: float = ACCENT_TRACKER_EVIDENCE_WEIGHT,
+        ttl: Optional[float] = None,
+        max_sessions: Optional[int] = None
+    ):
+        self._detector = detector
+        self.confidence = confidence
+        self.weight = weight
+        self.ttl = ttl or float(os.getenv("ACCENT_TRACKER_TTL_SECONDS", "3600"))
+        self.max_sessions = max_sessions or int(os.getenv("ACCENT_TRACKER_MAX_SESSIONS", "10000"))
+        self._sessions: "OrderedDict[str, AccentEstimate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        self._counts = {"observed": 0, "skipped": 0, "failed": 0}
+        self._turns_enabled: Optional[bool] = None
+
+    @property
+    def detector(self) -> AccentDetector:
+        if self._detector is None:
+            self._detector = AccentDetector()
+        return self._detector
+
+    @property
+    def turns_enabled(self) -> bool:
+        """Whether conversation turns can be scored; the embedding strategy needs references"""
+        if self._turns_enabled is None:
+            self._turns_enabled = ACCENT_TRACKER_TURN_STRATEGY != EMBEDDING or not self.detector.references.is_empty
+            if not self._turns_enabled:
+                logger.warning("Accent tracking from conversation turns is inactive: no reference embeddings, see build_reference_embeddings.py")
+        return self._turns_enabled
+
+    def wants_turn(self, session_id: str) -> bool:
+        """Whether a conversation turn of this session would be scored"""
+        return self.turns_enabled and not self.is_confident(session_id)
+
+    def estimate(self, session_id: str) -> Optional[AccentEstimate]:
+        with self._lock:
+            self._purge_expired()
+            return self._sessions.get(session_id)
+
+    def is_confident(self, session_id: str) -> bool:
+        estimate = self.estimate(session_id)
+        return estimate is not None and estimate.confidence >= self.confidence
+
+    def observe(self, session_id: str, scores: Dict[str, float]) -> AccentEstimate:
+        """Fold one turn's accent scores (any scale; all zero is no evidence) into the session"""
+        with self._lock:
+            self._purge_expired()
+            estimate = self._sessions.pop(session_id, None)
+            if estimate is None:
+                estimate = AccentEstimate(self._prior())
+            estimate.update(scores, self.weight)
+            estimate.expires_at = time.monotonic() + self.ttl
+            # Re-inserted at the end, so the dict stays in expiry order
+            self._sessions[session_id] = estimate
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            self._counts["observed"] += 1
+            return estimate
+
+    async def observe_audio(
+        self, session_id: str, audio_data: bytes, strategy: Optional[str] = None, tie_breaker: Optional[str] = ACCENT_EMBEDDING_TIE_BREAKER
+    ) -> AccentEstimate:
+        """Score a recording and fold it in, unless the session is already confident"""
+        estimate = self.estimate(session_id)
+        if estimate is not None and estimate.confidence >= self.confidence:
+            with self._lock:
+                self._counts["skipped"] += 1
+            return estimate
+        scores = await self.detector.score_accents(audio_data, strategy, tie_breaker)
+        estimate = self.observe(session_id, scores)
+        logger.info(f"Accent estimate for session {session_id} after {estimate.turns} turns: {estimate.posterior()}")
+        return estimate
+
+    def observe_turn(self, session_id: str, audio_data: bytes):
+        """Use a conversation turn's audio as evidence in the background; no-op once confident"""
+        if not self.turns_enabled:
+            return
+        if self.is_confident(session_id):
+            with self._lock:
+                self._counts["skipped"] += 1
+            return
+        task = asyncio.create_task(self._observe_turn(session_id, audio_data))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _observe_turn(self, session_id: str, audio_data: bytes):
+        try:
+            await self.observe_audio(session_id, audio_data, ACCENT_TRACKER_TURN_STRATEGY, tie_breaker=None)
+        except Exception as e:
+            with self._lock:
+                self._counts["failed"] += 1
+            logger.warning(f"Could not score turn for session {session_id}: {e}")
+
+    def forget(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            self._purge_expired()
+            confident = sum(estimate.confidence >= self.confidence for estimate in self._sessions.values())
+            return {"sessions": len(self._sessions), "confident": confident, "pending": len(self._tasks), **self._counts}
+
+    def _prior(self) -> Dict[str, float]:
+        """Log prior from the detector's accent weights"""
+        configs = self.detector.accent_configs
+        total = sum(config["weight"] for config in configs.values())
+        return {accent: math.log(config["weight"] / total) for accent, config in configs.items()}
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        # Sessions are kept in expiry order, so stop at the first live one
+        while self._sessions:
+            session_id, estimate = next(iter(self._sessions.items()))
+            if estimate.expires_at > now:
+                break
+            self._sessions.popitem(last=False)
+
+
+accent_tracker = AccentTracker()
@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.modules.accent_detection.embeddings import EMBEDDING_VERSION, ReferenceEmbeddings
+
+logger = logging.getLogger(__name__)
+
+# Binary reference store, preferred over reference_embeddings.json when present
+REFERENCE_STORE_PATH = os.getenv(
+    "ACCENT_REFERENCE_STORE",
+    str(Path(__file__).resolve().parents[3] / "reference_store")
+)
+# Nearest references considered per clip, and clusters probed when the store is clustered
+STORE_NEIGHBOURS = int(os.getenv("ACCENT_STORE_NEIGHBOURS", "10"))
+STORE_NPROBE = int(os.getenv("ACCENT_STORE_NPROBE", "4"))
+
+STORE_VERSION = 1
+# Each save writes a new generation directory and then atomically repoints CURRENT at it
+CURRENT_FILE = "CURRENT"
+GENERATION_PREFIX = "generation-"
+INDEX_FILE = "index.json"
+VECTORS_FILE = "vectors.npy"
+LABELS_FILE = "labels.npy"
+CENTROIDS_FILE = "centroids.npy"
+# Rows compared per matrix product, bounds the scratch memory of a brute-force scan
+SCAN_ROWS = 65536
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    return vectors / (np.linalg.norm(vectors, axis=-1, keepdims=True) + 1e-12)
+
+
+def _encode(values: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    names, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return names.tolist(), codes.astype(np.int32)
+
+
+class EmbeddingStore:
+    """Individual reference embeddings in a float32 matrix, searched by cosine similarity
+
+    On disk a store is a directory whose ``CURRENT`` file names the live
+    generation, a subdirectory holding ``vectors.npy`` (one standardised,
+    unit-length row per reference recording), ``labels.npy`` (accent and
+    speaker code per row) and a small ``index.json`` with the names and the
+    standardisation. Opened stores are memory-mapped read-only, so every
+    worker shares the same pages and startup does not parse the vectors.
+
+    A clustered store also has ``centroids.npy`` and its rows are grouped by
+    cluster, so a search only scans the few contiguous slices nearest the
+    query (an inverted-file index) instead of every row.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        labels: np.ndarray,
+        accents: List[str],
+        speakers: List[str],
+        center: np.ndarray,
+        scale: np.ndarray,
+        centroids: Optional[np.ndarray] = None,
+        offsets: Optional[np.ndarray] = None
+    ):
+        self.vectors = vectors
+        self.labels = labels
+        self.accents = accents
+        self.speakers = speakers
+        self.center = np.asarray(center, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.centroids = centroids
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def is_clustered(self) -> bool:
+        return self.centroids is not None
+
+    @classmethod
+    def empty(cls) -> 'EmbeddingStore':
+        return cls(np.zeros((0, 0), np.float32), np.zeros((0, 2), np.int32), [], [], np.zeros(0), np.ones(0))
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        accents: Sequence[str],
+        speakers: Sequence[str],
+        center: Optional[np.ndarray] = None,
+        scale: Optional[np.ndarray] = None
+    ) -> 'EmbeddingStore':
+        """In-memory store of raw embeddings, one accent and speaker name per row
+
+        Standardisation is fitted to ``embeddings`` unless ``center`` and
+        ``scale`` are given, which lets new rows join an existing store.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float64)
+        if center is None or scale is None:
+            center, scale = embeddings.mean(axis=0), embeddings.std(axis=0) + 1e-6
+        accent_names, accent_codes = _encode(accents)
+        speaker_names, speaker_codes = _encode(speakers)
+        vectors = _unit((embeddings - center) / scale).astype(np.float32)
+        return cls(vectors, np.stack([accent_codes, speaker_codes], axis=1), accent_names, speaker_names, center, scale)
+
+    @classmethod
+    def from_references(cls, references: ReferenceEmbeddings) -> 'EmbeddingStore':
+        """Convert reference_embeddings.json statistics: one row per accent centroid"""
+        if references.is_empty:
+            return cls.empty()
+        codes = np.arange(len(references.names), dtype=np.int32)
+        return cls(
+            references.centroids.astype(np.float32),
+            np.stack([codes, np.zeros_like(codes)], axis=1),
+            list(references.names), ["centroid"],
+            references.center, references.scale
+        )
+
+    def _rows(self) -> Tuple[np.ndarray, np.ndarray]:
+        accents = np.asarray(self.accents, dtype=str)[self.labels[:, 0]] if len(self) else np.zeros(0, str)
+        speakers = np.asarray(self.speakers, dtype=str)[self.labels[:, 1]] if len(self) else np.zeros(0, str)
+        return accents, speakers
+
+    def without_accents(self, accents: Iterable[str]) -> 'EmbeddingStore':
+        """Copy without the rows of ``accents``, unclustered"""
+        row_accents, row_speakers = self._rows()
+        keep = ~np.isin(row_accents, list(accents))
+        if not keep.any():
+            return self.empty()
+        accent_names, accent_codes = _encode(row_accents[keep])
+        speaker_names, speaker_codes = _encode(row_speakers[keep])
+        return EmbeddingStore(
+            np.asarray(self.vectors[keep]), np.stack([accent_codes, speaker_codes], axis=1),
+            accent_names, speaker_names, self.center, self.scale
+        )
+
+    def extend(self, other: 'EmbeddingStore') -> 'EmbeddingStore':
+        """Rows of both stores, unclustered; ``other`` must share this store's standardisation"""
+        if self.is_empty:
+            return other
+        if other.is_empty:
+            return self
+        if not (np.allclose(self.center, other.center) and np.allclose(self.scale, other.scale)):
+            raise ValueError("Stores were standardised differently, rebuild with a shared center and scale")
+        accents, speakers = (np.concatenate(pair) for pair in zip(self._rows(), other._rows()))
+        accent_names, accent_codes = _encode(accents)
+        speaker_names, speaker_codes = _encode(speakers)
+        return EmbeddingStore(
+            np.concatenate([np.asarray(self.vectors), np.asarray(other.vectors)]),
+            np.stack([accent_codes, speaker_codes], axis=1),
+            accent_names, speaker_names, self.center, self.scale
+        )
+
+    def clustered(self, clusters: int, iterations: int = 20, seed: int = 0) -> 'EmbeddingStore':
+        """Copy indexed with spherical k-means, rows grouped by cluster"""
+        vectors = np.asarray(self.vectors)
+        clusters = min(clusters, len(vectors))
+        if clusters < 2:
+            return EmbeddingStore(vectors, np.asarray(self.labels), self.accents, self.speakers, self.center, self.scale)
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(len(vectors), clusters, replace=False)]
+        for _ in range(iterations):
+            assignment = self._nearest_centroid(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, vectors)
+            # An emptied cluster keeps its previous centroid
+            filled = np.bincount(assignment, minlength=clusters) > 0
+            centroids[filled] = _unit(sums[filled])
+        assignment = self._nearest_centroid(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=clusters))])
+        return EmbeddingStore(
+            vectors[order], np.asarray(self.labels)[order], self.accents, self.speakers,
+            self.center, self.scale, centroids.astype(np.float32), offsets.astype(np.int64)
+        )
+
+    @staticmethod
+    def _nearest_centroid(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[start:start + SCAN_ROWS] @ centroids.T, axis=1)
+            for start in range(0, len(vectors), SCAN_ROWS)
+        ]) if len(vectors) else np.zeros(0, np.int64)
+
+    def standardise(self, embeddings: np.ndarray) -> np.ndarray:
+        """Raw embeddings to the unit-length rows the store is searched with"""
+        return _unit((np.atleast_2d(embeddings) - self.center) / self.scale).astype(np.float32)
+
+    def _scan(self, query: np.ndarray, ranges: Iterable[Tuple[int, int]], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (similarity, row) of one query over row ranges, a chunk at a time"""
+        best_similarities = np.zeros(0, np.float32)
+        best_rows = np.zeros(0, np.int64)
+        for start, stop in ranges:
+            for chunk_start in range(start, stop, SCAN_ROWS):
+                chunk_stop = min(stop, chunk_start + SCAN_ROWS)
+                similarities = np.concatenate([best_similarities, self.vectors[chunk_start:chunk_stop] @ query])
+                rows = np.concatenate([best_rows, np.arange(chunk_start, chunk_stop)])
+                if len(similarities) > k:
+                    top = np.argpartition(similarities, -k)[-k:]
+                    similarities, rows = similarities[top], rows[top]
+                best_similarities, best_rows = similarities, rows
+        order = np.argsort(best_similarities)[::-1]
+        return best_similarities[order], best_rows[order]
+
+    def search(self, embeddings: np.ndarray, k: int = STORE_NEIGHBOURS, nprobe: int = STORE_NPROBE) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Nearest references of each raw embedding: (similarities, rows), most similar first
+
+        Scans every row, or only the ``nprobe`` nearest clusters of a clustered store.
+        """
+        results = []
+        for query in self.standardise(embeddings):
+            if self.is_clustered and nprobe < len(self.centroids):
+                probes = np.argpartition(self.centroids @ query, -nprobe)[-nprobe:]
+                ranges = [(int(self.offsets[probe]), int(self.offsets[probe + 1])) for probe in sorted(probes)]
+            else:
+                ranges = [(0, len(self))]
+            results.append(self._scan(query, ranges, k))
+        return results
+
+    def scores(self, embedding: np.ndarray, k: int = STORE_NEIGHBOURS, nprobe: int = STORE_NPROBE) -> Dict[str, float]:
+        """Per-accent similarity of the closest reference among the k nearest
+
+        An accent with no reference among them scores the k-th similarity,
+        since none of its references can be any closer than that.
+        """
+        similarities, rows = self.search(embedding, k, nprobe)[0]
+        floor = float(similarities[-1]) if len(similarities) else -1.0
+        scores = {accent: floor for accent in self.accents}
+        for similarity, row in zip(similarities.tolist(), rows.tolist()):
+            accent = self.accents[self.labels[row, 0]]
+            scores[accent] = max(scores[accent], similarity)
+        return scores
+
+    @classmethod
+    def open(cls, path: str = REFERENCE_STORE_PATH, attempts: int = 3) -> 'EmbeddingStore':
+        """Memory-map the current generation read-only; a missing or stale store opens empty"""
+        for attempt in range(attempts):
+            try:
+                with open(os.path.join(path, CURRENT_FILE), "r", encoding="utf-8") as f:
+                    generation = f.read().strip()
+            except FileNotFoundError:
+                return cls.empty()
+            try:
+                return cls._open_generation(os.path.join(path, generation))
+            except FileNotFoundError:
+                # A writer pruned this generation after we read the pointer; follow it again
+                if attempt == attempts - 1:
+                    raise
+        return cls.empty()
+
+    @classmethod
+    def _open_generation(cls, directory: str) -> 'EmbeddingStore':
+        with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != STORE_VERSION or index.get("embedding_version") != EMBEDDING_VERSION:
+            logger.warning(f"Ignoring reference store {directory} built for another embedding version")
+            return cls.empty()
+        vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+        labels = np.load(os.path.join(directory, LABELS_FILE), mmap_mode="r")
+        if vectors.shape != (index["count"], index["dim"]) or len(labels) != index["count"]:
+            raise ValueError(f"Reference store {directory} does not match its index, rebuild it")
+        centroids = offsets = None
+        if index.get("offsets") is not None:
+            centroids = np.load(os.path.join(directory, CENTROIDS_FILE))
+            offsets = np.asarray(index["offsets"], dtype=np.int64)
+        return cls(
+            vectors, labels, index["accents"], index["speakers"],
+            np.array(index["center"]), np.array(index["scale"]), centroids, offsets
+        )
+
+    def save(self, path: str = REFERENCE_STORE_PATH):
+        """Write a new generation, then switch the CURRENT pointer to it in one rename
+
+        Files of a generation are never modified once written, so a reader sees
+        either the old generation or the new one in full. The previous
+        generation is kept for readers that resolved the pointer just before
+        the switch; older ones are removed.
+        """
+        os.makedirs(path, exist_ok=True)
+        generation = f"{GENERATION_PREFIX}{time.time_ns()}"
+        directory = os.path.join(path, generation)
+        os.makedirs(directory)
+
+        np.save(os.path.join(directory, VECTORS_FILE), np.ascontiguousarray(self.vectors, dtype=np.float32))
+        np.save(os.path.join(directory, LABELS_FILE), np.ascontiguousarray(self.labels, dtype=np.int32))
+        if self.is_clustered:
+            np.save(os.path.join(directory, CENTROIDS_FILE), self.centroids.astype(np.float32))
+        index = {
+            "version": STORE_VERSION,
+            "embedding_version": EMBEDDING_VERSION,
+            "count": len(self),
+            "dim": int(self.vectors.shape[1]) if len(self) else 0,
+            "accents": self.accents,
+            "speakers": self.speakers,
+            "center": self.center.round(6).tolist(),
+            "scale": self.scale.round(6).tolist(),
+            "offsets": self.offsets.tolist() if self.is_clustered else None
+        }
+        with open(os.path.join(directory, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+        temporary = os.path.join(path, f".{CURRENT_FILE}.tmp")
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(generation)
+        os.replace(temporary, os.path.join(path, CURRENT_FILE))
+
+        generations = sorted(name for name in os.listdir(path) if name.startswith(GENERATION_PREFIX))
+        for stale in generations[:-2]:
+            shutil.rmtree(os.path.join(path, stale), ignore_errors=True)
+
+def load_references() -> Union[EmbeddingStore, ReferenceEmbeddings]:
+    """The binary reference store when one has been built, else reference_embeddings.json"""
+    store = EmbeddingStore.open()
+    if not store.is_empty:
+        logger.info(f"Using reference store with {len(store)} embeddings ({'clustered' if store.is_clustered else 'brute force'})")
+        return store
+    return ReferenceEmbeddings.load()
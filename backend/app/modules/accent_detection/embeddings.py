@@ -0,0 +1,169 @@
+import json
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.fft import dct
+
+from app.services.audio_buffer import AudioBuffer
+from app.services.audio_conditioning import SPEECH_SAMPLE_RATE
+
+# Per-accent reference statistics, written by build_reference_embeddings.py
+REFERENCE_EMBEDDINGS_PATH = os.getenv(
+    "ACCENT_REFERENCE_EMBEDDINGS",
+    str(Path(__file__).resolve().parents[3] / "reference_embeddings.json")
+)
+
+EMBEDDING_VERSION = 1
+FRAME_MS = 25.0
+HOP_MS = 10.0
+N_FFT = 512
+N_MELS = 40
+N_MFCC = 13
+
+
+@lru_cache(maxsize=4)
+def mel_filterbank(sample_rate: int = SPEECH_SAMPLE_RATE, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    """(n_mels, n_fft // 2 + 1) triangular filters spaced evenly on the mel scale"""
+    def to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    edges = to_hz(np.linspace(to_mel(20.0), to_mel(sample_rate / 2), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def log_mel_frames(audio: AudioBuffer) -> np.ndarray:
+    """(frames, N_MELS) log mel energies of 16kHz mono audio, all frames in one batch"""
+    samples = audio.to_float32().samples
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    frame = int(audio.sample_rate * FRAME_MS / 1000)
+    hop = int(audio.sample_rate * HOP_MS / 1000)
+    if len(samples) < frame:
+        samples = np.pad(samples, (0, frame - len(samples)))
+
+    # Pre-emphasis, then every windowed frame transformed at once
+    emphasized = np.append(samples[0], samples[1:] - 0.97 * samples[:-1])
+    windows = sliding_window_view(emphasized, frame)[::hop] * np.hamming(frame).astype(np.float32)
+    power = np.abs(np.fft.rfft(windows, n=N_FFT, axis=1)) ** 2 / N_FFT
+    return np.log(power @ mel_filterbank(audio.sample_rate).T + 1e-10)
+
+
+def extract_embedding(audio: AudioBuffer) -> np.ndarray:
+    """Fixed-size acoustic embedding of a preprocessed clip
+
+    Spread (standard deviation and mean absolute value) of the mean-normalised
+    MFCCs and of their deltas, plus the average log mel spectral shape:
+    4 * N_MFCC + N_MELS values whatever the clip length.
+    """
+    log_mel = log_mel_frames(audio)
+    mfcc = dct(log_mel, type=2, axis=1, norm="ortho")[:, :N_MFCC]
+    # Cepstral mean normalisation removes the channel (microphone) response
+    mfcc = mfcc - mfcc.mean(axis=0)
+    delta = np.gradient(mfcc, axis=0) if len(mfcc) > 1 else np.zeros_like(mfcc)
+    return np.concatenate([
+        mfcc.std(axis=0),
+        np.abs(mfcc).mean(axis=0),
+        delta.std(axis=0),
+        np.abs(delta).mean(axis=0),
+        log_mel.mean(axis=0) - log_mel.mean()
+    ]).astype(np.float32)
+
+
+@dataclass
+class AccentReference:
+    """Running statistics of the embeddings of one accent's recordings"""
+    count: int
+    mean: np.ndarray
+    var: np.ndarray
+
+    @classmethod
+    def from_embeddings(cls, embeddings: np.ndarray) -> 'AccentReference':
+        return cls(len(embeddings), embeddings.mean(axis=0), embeddings.var(axis=0))
+
+    def to_json(self) -> Dict:
+        return {"count": self.count, "mean": self.mean.round(6).tolist(), "var": self.var.round(6).tolist()}
+
+
+@dataclass
+class ReferenceEmbeddings:
+    """Per-accent reference centroids scored by cosine similarity
+
+    Embeddings are standardised with statistics pooled across every accent's
+    recordings before comparison, so no single feature dominates the angle.
+    """
+    accents: Dict[str, AccentReference] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._prepare()
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.accents
+
+    def _prepare(self):
+        if self.is_empty:
+            self.names, self.center, self.scale, self.centroids = [], None, None, None
+            return
+        counts = np.array([reference.count for reference in self.accents.values()], dtype=np.float64)[:, None]
+        means = np.stack([reference.mean for reference in self.accents.values()])
+        variances = np.stack([reference.var for reference in self.accents.values()])
+        total = counts.sum()
+        # Pooled mean and variance across all recordings (law of total variance)
+        self.center = (counts * means).sum(axis=0) / total
+        pooled = (counts * (variances + (means - self.center) ** 2)).sum(axis=0) / total
+        self.scale = np.sqrt(pooled) + 1e-6
+        self.names = list(self.accents)
+        self.centroids = self._unit((means - self.center) / self.scale)
+
+    @staticmethod
+    def _unit(vectors: np.ndarray) -> np.ndarray:
+        return vectors / (np.linalg.norm(vectors, axis=-1, keepdims=True) + 1e-12)
+
+    def similarities(self, embeddings: np.ndarray) -> np.ndarray:
+        """(clips, accents) cosine similarities for a batch of embeddings"""
+        standardised = (np.atleast_2d(embeddings) - self.center) / self.scale
+        return self._unit(standardised) @ self.centroids.T
+
+    def scores(self, embedding: np.ndarray) -> Dict[str, float]:
+        return dict(zip(self.names, self.similarities(embedding)[0].tolist()))
+
+    def update(self, accent: str, embeddings: np.ndarray):
+        """Replace one accent's statistics with those of ``embeddings``"""
+        self.accents[accent] = AccentReference.from_embeddings(np.asarray(embeddings, dtype=np.float64))
+        self._prepare()
+
+    @classmethod
+    def load(cls, path: str = REFERENCE_EMBEDDINGS_PATH) -> 'ReferenceEmbeddings':
+        """Read the reference file; missing, empty or stale files load as no references"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        if not data or data.get("version") != EMBEDDING_VERSION:
+            return cls()
+        return cls({
+            accent: AccentReference(entry["count"], np.array(entry["mean"]), np.array(entry["var"]))
+            for accent, entry in data.get("accents", {}).items()
+        })
+
+    def save(self, path: str = REFERENCE_EMBEDDINGS_PATH):
+        data = {
+            "version": EMBEDDING_VERSION,
+            "features": {"sample_rate": SPEECH_SAMPLE_RATE, "n_mels": N_MELS, "n_mfcc": N_MFCC},
+            "accents": {accent: reference.to_json() for accent, reference in sorted(self.accents.items())}
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
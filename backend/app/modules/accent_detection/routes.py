@@ -1,6 +1,8 @@
-from fastapi import APIRouter, UploadFile, HTTPException
-from .accent_detector import AccentDetector
-from typing import Dict
+from fastapi import APIRouter, Form, UploadFile, HTTPException
+from .accent_detector import ACCENT_DETECTION_STRATEGIES
+from .accent_tracker import accent_tracker
+from app.services.audio_ingest import UploadTooLargeError, read_upload
+from typing import Dict, Optional
 import logging
 
 # Configure logging
@@ -8,12 +10,20 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-accent_detector = AccentDetector()
+accent_detector = accent_tracker.detector
 
 @router.post("/detect-accent")
-async def detect_accent(audio: UploadFile) -> Dict[str, float]:
+async def detect_accent(
+    audio: UploadFile,
+    strategy: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None)
+) -> Dict[str, float]:
     """
     Endpoint to detect accent from uploaded audio file.
+    ``strategy`` picks "per_locale", "identify" or "embedding", see AccentDetector.detect_accent.
+    With ``session_id`` the recording is folded into the session's running
+    estimate, which is returned instead; once that estimate is confident the
+    recording is not analysed at all.
     Returns a dictionary of accent probabilities.
     """
     logger.info(f"Received audio file: {audio.filename}, content_type: {audio.content_type}")
@@ -23,20 +33,49 @@ async def detect_accent(audio: UploadFile) -> Dict[str, float]:
             status_code=400,
             detail="File must be an audio file"
         )
+    if strategy is not None and strategy not in ACCENT_DETECTION_STRATEGIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"strategy must be one of: {', '.join(ACCENT_DETECTION_STRATEGIES)}"
+        )
     
     try:
-        # Read the audio file
-        audio_data = await audio.read()
+        # Read the audio file, enforcing the upload limits
+        audio_data = await read_upload(audio)
         logger.info(f"Successfully read audio data, size: {len(audio_data)} bytes")
         
         # Detect accent
-        result = await accent_detector.detect_accent(audio_data)
+        if session_id:
+            estimate = await accent_tracker.observe_audio(session_id, audio_data, strategy)
+            result = estimate.percentages()
+        else:
+            result = await accent_detector.detect_accent(audio_data, strategy)
         logger.info(f"Accent detection result: {result}")
         
         return result
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing audio: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing audio: {str(e)}"
         )
+
+@router.get("/accent-estimate/{session_id}")
+async def accent_estimate(session_id: str):
+    """Running accent estimate of a session, from /detect-accent calls and transcribed turns"""
+    estimate = accent_tracker.estimate(session_id)
+    if estimate is None:
+        raise HTTPException(status_code=404, detail="No accent evidence for this session")
+    return {
+        "probabilities": estimate.percentages(),
+        "turns": estimate.turns,
+        "confident": estimate.confidence >= accent_tracker.confidence
+    }
+
+@router.delete("/accent-estimate/{session_id}")
+async def reset_accent_estimate(session_id: str):
+    """Drop a session's estimate, e.g. when someone else starts speaking"""
+    accent_tracker.forget(session_id)
+    return {"status": "ok"}
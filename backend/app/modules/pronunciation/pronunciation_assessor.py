@@ -1,13 +1,12 @@
 import os
 import io
 import wave
-import audioop
 import logging
-import azure.cognitiveservices.speech as speechsdk
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
 import asyncio
-import json
+from app.services.audio_buffer import AudioBuffer
+from app.services.speech_backend import CANCELED, SPEECH_BACKEND, get_speech_backend
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -43,7 +42,7 @@ class PronunciationAssessor:
         self.speech_key = os.getenv("AZURE_SPEECH_KEY")
         self.service_region = os.getenv("AZURE_SPEECH_REGION")
         
-        if not self.speech_key or not self.service_region:
+        if SPEECH_BACKEND == "azure" and (not self.speech_key or not self.service_region):
             raise ValueError("Azure Speech credentials not found in environment variables")
 
     def _validate_wav(self, audio_data: bytes) -> bool:
@@ -95,61 +94,18 @@ class PronunciationAssessor:
             logger.error(f"Error validating WAV format: {str(e)}")
             return False
 
-    def _preprocess_audio(self, audio_data: bytes) -> Optional[bytes]:
-        """Preprocess audio data for assessment."""
+    def _preprocess_audio(self, audio: AudioBuffer) -> Optional[AudioBuffer]:
+        """Preprocess decoded audio for assessment."""
         try:
-            logger.debug(f"Starting audio preprocessing, input size: {len(audio_data)} bytes")
-            
-            # Log input audio format
-            logger.debug(f"Input audio data first 4 bytes: {audio_data[:4].hex()}")
-            
-            # Validate WAV format
-            if not self._validate_wav(audio_data):
-                logger.error("Invalid WAV format")
-                return None
-            
-            # Create WAV from input data
-            input_stream = io.BytesIO(audio_data)
-            logger.debug("Created input stream")
-            
-            # Read WAV properties
-            with wave.open(input_stream, 'rb') as wav_file:
-                channels = wav_file.getnchannels()
-                sample_width = wav_file.getsampwidth()
-                frame_rate = wav_file.getframerate()
-                frames = wav_file.readframes(wav_file.getnframes())
-
-            logger.debug(f"Original audio properties - Channels: {channels}, "
-                        f"Sample width: {sample_width}, Frame rate: {frame_rate}, "
-                        f"Frames size: {len(frames)} bytes")
+            logger.debug(f"Starting audio preprocessing - Channels: {audio.channels}, "
+                        f"Frame rate: {audio.sample_rate}, Frames: {audio.frames}")
 
-            # Convert to mono if needed
-            if channels > 1:
-                logger.debug(f"Converting {channels} channels to mono")
-                frames = audioop.tomono(frames, sample_width, 1, 1)
-                channels = 1
-                logger.debug(f"Converted to mono, new frames size: {len(frames)} bytes")
+            # Mono mixdown, resampling to 16kHz, filtering, denoise and loudness
+            # normalisation all come from the shared conditioning engine
+            processed = audio.condition().to_int16()
+            logger.debug(f"Processed audio: {processed.frames} frames at {processed.sample_rate} Hz")
 
-            # Convert sample rate if needed
-            if frame_rate != 16000:
-                logger.debug(f"Converting sample rate from {frame_rate} to 16000")
-                frames, _ = audioop.ratecv(frames, sample_width, channels, frame_rate, 16000, None)
-                frame_rate = 16000
-                logger.debug(f"Converted sample rate, new frames size: {len(frames)} bytes")
-
-            # Create new WAV file
-            output = io.BytesIO()
-            with wave.open(output, 'wb') as wav_file:
-                wav_file.setnchannels(channels)
-                wav_file.setsampwidth(sample_width)
-                wav_file.setframerate(frame_rate)
-                wav_file.writeframes(frames)
-
-            processed_data = output.getvalue()
-            logger.debug(f"Processed audio size: {len(processed_data)} bytes")
-            logger.debug(f"Processed audio first 4 bytes: {processed_data[:4].hex()}")
-
-            return processed_data
+            return processed
 
         except Exception as e:
             logger.error(f"Error preprocessing audio: {str(e)}", exc_info=True)
@@ -194,189 +150,110 @@ class PronunciationAssessor:
         
         return phoneme_tips.get(phoneme, [f"Pay attention to the '{phoneme}' sound in '{word}'"])
 
-    async def assess_pronunciation(self, audio_data: bytes, reference_text: str) -> PronunciationFeedback:
+    async def assess_pronunciation(self, audio: Union[bytes, AudioBuffer], reference_text: str) -> PronunciationFeedback:
         """Assess pronunciation using Azure Speech Services."""
         try:
             logger.info(f"Starting pronunciation assessment for text: {reference_text}")
             
+            # Decode once; raw bytes must be a valid WAV file
+            if not isinstance(audio, AudioBuffer):
+                if not self._validate_wav(audio):
+                    raise ValueError("Invalid WAV format")
+                audio = AudioBuffer.from_wav_bytes(audio)
+
             # Preprocess audio
-            processed_audio = self._preprocess_audio(audio_data)
+            processed_audio = self._preprocess_audio(audio)
             if processed_audio is None:
                 logger.error("Audio preprocessing failed")
                 raise ValueError("Audio preprocessing failed")
             
-            logger.info(f"Audio preprocessed successfully, size: {len(processed_audio)} bytes")
-
-            # Create speech config
-            speech_config = speechsdk.SpeechConfig(
-                subscription=self.speech_key,
-                region=self.service_region
-            )
-            speech_config.speech_recognition_language = "en-US"
-            logger.info(f"Created speech config for region: {self.service_region}")
-
-            # Create pronunciation assessment config
-            pronunciation_config = speechsdk.PronunciationAssessmentConfig(
-                reference_text=reference_text,
-                grading_system=speechsdk.PronunciationAssessmentGradingSystem.HundredMark,
-                granularity=speechsdk.PronunciationAssessmentGranularity.Phoneme
-            )
-            logger.info("Created pronunciation assessment config")
-
-            # Create audio stream
-            audio_stream = speechsdk.audio.PushAudioInputStream()
-            audio_config = speechsdk.audio.AudioConfig(stream=audio_stream)
-            logger.info("Created audio stream configuration")
-
-            # Create speech recognizer
-            speech_recognizer = speechsdk.SpeechRecognizer(
-                speech_config=speech_config,
-                audio_config=audio_config
-            )
-            pronunciation_config.apply_to(speech_recognizer)
-            logger.info("Created speech recognizer with pronunciation assessment")
-
-            # Write audio data to stream
-            audio_stream.write(processed_audio)
-            audio_stream.close()
-            logger.info("Wrote audio data to stream")
+            logger.info(f"Audio preprocessed successfully, duration: {processed_audio.duration:.2f}s")
 
-            # Create a loop to handle the async recognition
-            loop = asyncio.get_event_loop()
-            future = loop.create_future()
-            
-            def handle_result(evt):
-                try:
-                    logger.info(f"Recognition result received: {evt}")
-                    if not future.done():
-                        future.set_result(evt)
-                except Exception as e:
-                    logger.error(f"Error in handle_result: {str(e)}")
-                    if not future.done():
-                        future.set_exception(e)
-
-            def handle_canceled(evt):
-                logger.error(f"Recognition canceled. Reason: {evt.reason}")
-                if evt.reason == speechsdk.CancellationReason.Error:
-                    logger.error(f"Error details: {evt.error_details}")
-                if not future.done():
-                    future.set_exception(ValueError(f"Recognition canceled: {evt.reason} - {evt.error_details if evt.reason == speechsdk.CancellationReason.Error else ''}"))
-
-            # Subscribe to events
-            speech_recognizer.recognized.connect(handle_result)
-            speech_recognizer.canceled.connect(handle_canceled)
-
-            # Start recognition
-            speech_recognizer.start_continuous_recognition()
-            
+            # Score the processed 16kHz mono PCM against the reference text
+            backend = get_speech_backend()
             try:
-                # Wait for result with timeout
-                result = await asyncio.wait_for(future, timeout=10.0)
-                logger.info(f"Recognition completed: {result}")
-
-                if result.result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                    logger.info(f"Recognized text: {result.result.text}")
-                    
-                    # Get pronunciation assessment
-                    assessment = result.result.properties.get(
-                        speechsdk.PropertyId.SpeechServiceResponse_JsonResult
-                    )
-                    logger.info(f"Assessment result: {assessment}")
-
-                    if assessment:
-                        try:
-                            assessment_data = json.loads(assessment)
-                            logger.info(f"Parsed assessment data: {assessment_data}")
-                            
-                            # Extract NBest results
-                            if 'NBest' in assessment_data and len(assessment_data['NBest']) > 0:
-                                nbest = assessment_data['NBest'][0]
-                                pronunciation_assessment = nbest.get('PronunciationAssessment', {})
-                                
-                                # Get pronunciation assessment scores
-                                scores = {
-                                    'Accuracy': pronunciation_assessment.get('AccuracyScore', 0),
-                                    'Pronunciation': pronunciation_assessment.get('PronScore', 0),
-                                    'Completeness': pronunciation_assessment.get('CompletenessScore', 0),
-                                    'Fluency': pronunciation_assessment.get('FluencyScore', 0)
-                                }
-                                logger.info(f"Extracted scores: {scores}")
-
-                                # Get word-level details
-                                words = nbest.get('Words', [])
-                                word_details = []
-                                for word in words:
-                                    word_assessment = word.get('PronunciationAssessment', {})
-                                    syllables = word.get('Syllables', [])
-                                    phonemes = word.get('Phonemes', [])
-                                    
-                                    word_details.append({
-                                        'word': word.get('Word', ''),
-                                        'accuracy': word_assessment.get('AccuracyScore', 0),
-                                        'error_type': word_assessment.get('ErrorType', 'None'),
-                                        'syllables': [
-                                            {
-                                                'syllable': s.get('Syllable', ''),
-                                                'accuracy': s.get('PronunciationAssessment', {}).get('AccuracyScore', 0)
-                                            }
-                                            for s in syllables
-                                        ],
-                                        'phonemes': [
-                                            {
-                                                'phoneme': p.get('Phoneme', ''),
-                                                'accuracy': p.get('PronunciationAssessment', {}).get('AccuracyScore', 0)
-                                            }
-                                            for p in phonemes
-                                        ]
-                                    })
-
-                                # Generate feedback based on scores and details
-                                general_feedback = []
-                                if scores['Accuracy'] < 70:
-                                    general_feedback.append("Work on overall pronunciation accuracy")
-                                if scores['Fluency'] < 70:
-                                    general_feedback.append("Try to speak more smoothly and naturally")
-                                if scores['Completeness'] < 70:
-                                    general_feedback.append("Make sure to pronounce all parts of each word")
-
-                                # Generate phoneme-level feedback
-                                phoneme_feedback = []
-                                for word_detail in word_details:
-                                    for phoneme in word_detail['phonemes']:
-                                        if phoneme['accuracy'] < 70:
-                                            phoneme_feedback.append(
-                                                f"The sound '{phoneme['phoneme']}' in '{word_detail['word']}' needs improvement"
-                                            )
-
-                                feedback = PronunciationFeedback(
-                                    accuracy_score=float(scores['Accuracy']),
-                                    pronunciation_score=float(scores['Pronunciation']),
-                                    completeness_score=float(scores['Completeness']),
-                                    fluency_score=float(scores['Fluency']),
-                                    words=word_details,
-                                    phoneme_level_feedback=phoneme_feedback,
-                                    general_feedback=general_feedback
-                                )
-
-                                logger.info(f"Created feedback: {feedback}")
-                                return feedback
-                            else:
-                                raise ValueError("No pronunciation assessment results found")
-                        except json.JSONDecodeError as e:
-                            logger.error(f"Failed to parse assessment result: {e}")
-                            raise ValueError("Failed to parse pronunciation assessment result")
-                    else:
-                        raise ValueError("No pronunciation assessment result available")
-                else:
-                    raise ValueError(f"Recognition failed: {result.result.reason}")
-
+                result = await backend.assess_pronunciation(processed_audio, reference_text, "en-US", timeout=10.0)
             except asyncio.TimeoutError:
                 logger.error("Recognition timed out after 10 seconds")
                 raise ValueError("Recognition timed out")
-            finally:
-                # Stop recognition
-                speech_recognizer.stop_continuous_recognition()
-                logger.info("Stopped recognition")
+            logger.info(f"Recognition completed on {backend.name}: {result.status}")
+
+            if result.status == CANCELED:
+                logger.error(f"Recognition canceled: {result.detail}")
+                raise ValueError(f"Recognition canceled: {result.detail}")
+            if not result.recognized:
+                raise ValueError(f"Recognition failed: {result.detail}")
+            logger.info(f"Recognized text: {result.text}")
+
+            if not result.scores:
+                raise ValueError("No pronunciation assessment results found")
+
+            # Get pronunciation assessment scores
+            scores = {
+                'Accuracy': result.scores.get('AccuracyScore', 0),
+                'Pronunciation': result.scores.get('PronScore', 0),
+                'Completeness': result.scores.get('CompletenessScore', 0),
+                'Fluency': result.scores.get('FluencyScore', 0)
+            }
+            logger.info(f"Extracted scores: {scores}")
+
+            # Get word-level details
+            word_details = []
+            for word in result.words:
+                word_assessment = word.get('PronunciationAssessment', {})
+                syllables = word.get('Syllables', [])
+                phonemes = word.get('Phonemes', [])
+
+                word_details.append({
+                    'word': word.get('Word', ''),
+                    'accuracy': word_assessment.get('AccuracyScore', 0),
+                    'error_type': word_assessment.get('ErrorType', 'None'),
+                    'syllables': [
+                        {
+                            'syllable': s.get('Syllable', ''),
+                            'accuracy': s.get('PronunciationAssessment', {}).get('AccuracyScore', 0)
+                        }
+                        for s in syllables
+                    ],
+                    'phonemes': [
+                        {
+                            'phoneme': p.get('Phoneme', ''),
+                            'accuracy': p.get('PronunciationAssessment', {}).get('AccuracyScore', 0)
+                        }
+                        for p in phonemes
+                    ]
+                })
+
+            # Generate feedback based on scores and details
+            general_feedback = []
+            if scores['Accuracy'] < 70:
+                general_feedback.append("Work on overall pronunciation accuracy")
+            if scores['Fluency'] < 70:
+                general_feedback.append("Try to speak more smoothly and naturally")
+            if scores['Completeness'] < 70:
+                general_feedback.append("Make sure to pronounce all parts of each word")
+
+            # Generate phoneme-level feedback
+            phoneme_feedback = []
+            for word_detail in word_details:
+                for phoneme in word_detail['phonemes']:
+                    if phoneme['accuracy'] < 70:
+                        phoneme_feedback.append(
+                            f"The sound '{phoneme['phoneme']}' in '{word_detail['word']}' needs improvement"
+                        )
+
+            feedback = PronunciationFeedback(
+                accuracy_score=float(scores['Accuracy']),
+                pronunciation_score=float(scores['Pronunciation']),
+                completeness_score=float(scores['Completeness']),
+                fluency_score=float(scores['Fluency']),
+                words=word_details,
+                phoneme_level_feedback=phoneme_feedback,
+                general_feedback=general_feedback
+            )
+
+            logger.info(f"Created feedback: {feedback}")
+            return feedback
 
         except Exception as e:
             logger.error(f"Error in pronunciation assessment: {str(e)}", exc_info=True)
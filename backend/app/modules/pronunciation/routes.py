@@ -2,6 +2,7 @@ import logging
 from fastapi import APIRouter, File, Form, UploadFile, HTTPException
 from typing import Dict, List
 from .pronunciation_assessor import PronunciationAssessor
+from app.services.audio_ingest import UploadTooLargeError, read_upload
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -30,12 +31,12 @@ async def improve_pronunciation(
     try:
         logger.info(f"Processing pronunciation assessment for reference text: {reference_text}")
         
-        # Read audio data
-        audio_data = await audio.read()
+        # Read audio data, enforcing the upload limits
+        audio_data = await read_upload(audio)
         
         # Get pronunciation assessment
         assessment = await pronunciation_assessor.assess_pronunciation(
-            audio_data=audio_data,
+            audio=audio_data,
             reference_text=reference_text
         )
         
@@ -73,6 +74,8 @@ async def improve_pronunciation(
             "general_feedback": assessment.general_feedback
         }
         
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing pronunciation assessment: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -1,27 +1,310 @@
-from fastapi import APIRouter, File, Form, UploadFile, Depends
-from typing import Dict, Optional, Any
-import base64
-from ..services.conversation import generate_initial_message, generate_response
-from ..services.speech import transcribe_audio, generate_speech
-import io
-import wave
-import struct
-import ffmpeg
-import os
+from fastapi import APIRouter, File, Form, UploadFile, Request, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+from starlette.requests import HTTPConnection
+from typing import Dict, List, Optional, Any
+from ..services.conversation import generate_initial_message, generate_response, generate_response_stream
+from ..services.speech import transcribe_audio_stream, transcribe_live, generate_speech, generate_speech_stream
 import json
-from app.services.pronunciation import generate_pronunciation_help, analyze_pronunciation
-from app.schemas.conversation import PronunciationHelpRequest, ConversationRequest, HistoryMessage
+import asyncio
+import os
+from app.services.pronunciation import (
+    PRONUNCIATION_BATCH_MAX_ITEMS, generate_pronunciation_help, analyze_pronunciation, analyze_pronunciation_batch
+)
+from app.schemas.conversation import PronunciationHelpRequest, HistoryMessage
+from app.services.transcoding import live_transcoding_pool, transcoding_pool, build_decode_args, TranscodingBusyError, TranscodingError, SPEECH_SAMPLE_RATE
+from app.services.audio_ingest import UploadTooLargeError, iter_upload, read_upload
+from app.services.audio_buffer import AudioBuffer
+from app.services.audio_formats import negotiate_audio_format
+from app.services.streaming_tts import streaming_format
+from app.services.tts_cache import tts_cache
+from app.services import tts_assets
+from app.services.speech_backend import get_speech_backend
+from app.services.speech_gateway import SpeechGatewayError, speech_gateway
+from app.services.speech_pool import LONG_FORM_PROFILE, RECOGNITION_PROFILES, speech_pool
+from app.services.audio_store import AUDIO_DELIVERY_BASE64, audio_payload, audio_store, parse_range
+from app.services.vad import detect_speech
+from app.modules.accent_detection.accent_tracker import accent_tracker
 import random
 
 router = APIRouter(prefix="/api/coach", tags=["coach"])
 
+# Azure neural voice for each language, accent and gender
+VOICE_MAPPING = {
+    "en": {
+        "neutral": {
+            "male": "en-US-GuyNeural",
+            "female": "en-US-JennyNeural"
+        },
+        "british": {
+            "male": "en-GB-RyanNeural", 
+            "female": "en-GB-LibbyNeural"
+        },
+        "australian": {
+            "male": "en-AU-WilliamNeural",
+            "female": "en-AU-NatashaNeural"
+        }
+    },
+    "fr": {
+        "neutral": {
+            "male": "fr-FR-ClaudeNeural",
+            "female": "fr-FR-DeniseNeural"
+        },
+        "canadian": {
+            "male": "fr-CA-JeanNeural",
+            "female": "fr-CA-SylvieNeural"
+        }
+    },
+    "es": {
+        "neutral": {
+            "male": "es-ES-AlvaroNeural",
+            "female": "es-ES-ElviraNeural"
+        },
+        "mexican": {
+            "male": "es-MX-JorgeNeural",
+            "female": "es-MX-DaliaNeural"
+        }
+    },
+    "ar": {
+        "neutral": {
+            "male": "ar-EG-AhmedNeural",
+            "female": "ar-EG-NouraNeural"
+        }
+    },
+    "it": {
+        "neutral": {
+            "male": "it-IT-FrancescoNeural",
+            "female": "it-IT-IsabellaNeural"
+        }
+    },
+    "zh": {
+        "neutral": {
+            "male": "zh-CN-YunyangNeural",
+            "female": "zh-CN-XiaoxiaoNeural"
+        }
+    },
+    "pt": {
+        "neutral": {
+            "male": "pt-BR-AntonioNeural",
+            "female": "pt-BR-FranciscaNeural"
+        }
+    }
+}
+
+# Gender of the voices offered for conversations; unknown voices count as female
+VOICE_GENDERS = {
+    "en-US-GuyNeural": "male",
+    "en-GB-RyanNeural": "male", 
+    "en-AU-WilliamNeural": "male",
+    "fr-FR-ClaudeNeural": "male",
+    "fr-CA-JeanNeural": "male",
+    "es-ES-AlvaroNeural": "male",
+    "es-MX-JorgeNeural": "male",
+    
+    "en-US-JennyNeural": "female",
+    "en-GB-LibbyNeural": "female",
+    "en-AU-NatashaNeural": "female", 
+    "fr-FR-DeniseNeural": "female",
+    "fr-CA-SylvieNeural": "female",
+    "es-ES-ElviraNeural": "female",
+    "es-MX-DaliaNeural": "female"
+}
+
+async def build_initial_message(
+    language: str,
+    accent: str,
+    voice_name: str,
+    topic: Optional[str] = None,
+    is_kids_mode: bool = False
+) -> Dict[str, Any]:
+    """Build the opening message for /start-conversation
+
+    Kept separate from the endpoint so the TTS asset-pack builder can replay
+    exactly the texts the endpoint will synthesize.
+    """
+    # Get the gender from the voice name, default to 'female'
+    gender = VOICE_GENDERS.get(voice_name, 'female')
+    print(f"Determined gender: {gender}")
+    
+    # Mapping of language and accent to Azure language codes
+    language_code_mapping = {
+        'en': {
+            'us': 'en-US',
+            'neutral': 'en-US',
+            'british': 'en-GB',
+            'australian': 'en-AU'
+        },
+        'fr': {
+            'neutral': 'fr-FR',
+            'canadian': 'fr-CA'
+        },
+        'es': {
+            'neutral': 'es-ES',
+            'mexican': 'es-MX'
+        },
+        'ar': {
+            'neutral': 'ar-EG',
+            'eg': 'ar-EG',
+            'sa': 'ar-SA'
+        },
+        'it': {
+            'neutral': 'it-IT'
+        },
+        'zh': {
+            'neutral': 'zh-CN'
+        },
+        'pt': {
+            'neutral': 'pt-BR'
+        }
+    }
+    
+    # Get the correct language code
+    language_code = language_code_mapping.get(language, {}).get(accent, f"{language}-{accent}")
+    print(f"Using language code: {language_code}")
+    
+    # Language and accent mapping for more descriptive names
+    language_accent_mapping = {
+        'EN-US': {
+            'language': 'American English',
+            'accent': 'American accent'
+        },
+        'EN-GB': {
+            'language': 'British English',
+            'accent': 'British accent'
+        },
+        'EN-AU': {
+            'language': 'Australian English',
+            'accent': 'Australian accent'
+        },
+        'FR-FR': {
+            'language': 'Français',
+            'accent': 'accent français'
+        },
+        'FR-CA': {
+            'language': 'Français',
+            'accent': 'accent québécois'
+        },
+        'ES-ES': {
+            'language': 'Español',
+            'accent': 'acento español'
+        },
+        'ES-MX': {
+            'language': 'Español',
+            'accent': 'acento mexicano'
+        },
+        'AR-EG': {
+            'language': 'Arabic',
+            'accent': 'Egyptian accent'
+        },
+        'IT-IT': {
+            'language': 'Italiano',
+            'accent': 'Italian accent'
+        },
+        'ZH-CN': {
+            'language': 'Mandarin Chinese',
+            'accent': 'Chinese accent'
+        },
+        'PT-BR': {
+            'language': 'Português',
+            'accent': 'Brazilian accent'
+        }
+    }
+    
+    # Get the descriptive language and accent names
+    language_details = language_accent_mapping.get(language_code.upper(), {
+        'language': language_code,
+        'accent': f'{language_code} accent'
+    })
+    
+    print(f"Debug - Language Code: {language_code}")
+    print(f"Debug - Language Details: {language_details}")
+    print(f"Debug - Original Language: {language}")
+    print(f"Debug - Original Accent: {accent}")
+    
+    if topic:
+        from app.topics.manager import TopicManager
+        topic_manager = TopicManager()
+        print('heeehhehhhe',topic_manager,topic)
+        selected_topic = topic_manager.get_topic(topic)
+        if not selected_topic:
+            print(f"Warning: Topic {topic} not found, falling back to random")
+            initial_message_data = await generate_initial_message(
+                language=language, 
+                accent=accent, 
+                voice_gender=gender, 
+                topic_id=topic,
+                is_kids_mode=is_kids_mode
+            )
+        else:
+            # Language-specific greetings and message structures
+            # Determine the language base for prompt selection
+            language_base = language_code[:2].lower()
+            
+            # Select the initial prompt based on language
+            if isinstance(selected_topic.initial_prompt, dict):
+                initial_prompt = selected_topic.initial_prompt.get(language_base, 
+                                                                   selected_topic.initial_prompt.get('en', 'Let\'s start a conversation'))
+            else:
+                initial_prompt = selected_topic.initial_prompt
+            
+            # Select topic name based on language
+            topic_name = selected_topic.name
+            if isinstance(topic_name, dict):
+                # Use language-specific name or fallback to English
+                if language_base == 'fr':
+                    topic_name = topic_name.get('fr', topic_name.get('en', 'Topic'))
+                elif language_base == 'es':
+                    topic_name = topic_name.get('es', topic_name.get('en', 'Topic'))
+                else:  # Default to English
+                    topic_name = topic_name.get('en', 'Topic')
+            
+            # Construct the message with language-specific topic name
+            if language_base == 'fr':
+                message = (
+                    f"Bonjour ! Je suis votre coach linguistique IA. "
+                    f"Pratiquons votre {language_details['accent']} en {language_details['language']}. "
+                    f"Aujourd'hui, nous allons parler de {topic_name}. {initial_prompt}"
+                )
+            elif language_base == 'es':
+                message = (
+                    f"¡Hola! Soy tu coach de idiomas IA. "
+                    f"Practiquemos tu {language_details['accent']} en {language_details['language']}. "
+                    f"Hoy hablaremos sobre {topic_name}. {initial_prompt}"
+                )
+            else:  # Default to English
+                message = (
+                    f"{'Hello' if gender == 'female' else 'Hey'} there! I'm your AI language coach. "
+                    f"Let's practice your {language_details['accent']} in {language_details['language']}. "
+                    f"Today, we'll talk about {topic_name}. {initial_prompt}"
+                )
+            topic_id = selected_topic.id
+            print('jkklfgkf',topic_id, topic)
+            initial_message_data = {
+                "message": message,
+                "topic_id": topic_id,
+                "topic_name": topic_name,
+                "initial_history_message": None
+            }
+    else:
+        initial_message_data = await generate_initial_message(
+            language=language, 
+            accent=accent, 
+            voice_gender=gender, 
+            topic_id=topic,
+            is_kids_mode=is_kids_mode
+        )
+    
+    return initial_message_data
+
 @router.post("/start-conversation")
 async def start_conversation_endpoint(
+    request: Request,
     language: str = Form(...), 
     accent: str = Form(...), 
     voice_name: str = Form('en-US-JennyNeural'),
     topic: Optional[str] = Form(None),
-    is_kids_mode: bool = Form(False)
+    is_kids_mode: bool = Form(False),
+    audio_delivery: str = Form(AUDIO_DELIVERY_BASE64),
+    audio_format: Optional[str] = Form(None)
 ):
     try:
         # Validate language and accent
@@ -36,196 +319,7 @@ async def start_conversation_endpoint(
         
         print(f"Start Conversation Debug - Input: language={language}, accent={accent}, voice_name={voice_name}, topic={topic}")
         
-        # Determine the voice gender based on the voice name
-        gender_mapping = {
-            "en-US-GuyNeural": "male",
-            "en-GB-RyanNeural": "male", 
-            "en-AU-WilliamNeural": "male",
-            "fr-FR-ClaudeNeural": "male",
-            "fr-CA-JeanNeural": "male",
-            "es-ES-AlvaroNeural": "male",
-            "es-MX-JorgeNeural": "male",
-            
-            "en-US-JennyNeural": "female",
-            "en-GB-LibbyNeural": "female",
-            "en-AU-NatashaNeural": "female", 
-            "fr-FR-DeniseNeural": "female",
-            "fr-CA-SylvieNeural": "female",
-            "es-ES-ElviraNeural": "female",
-            "es-MX-DaliaNeural": "female"
-        }
-        
-        # Get the gender from the voice name, default to 'female'
-        gender = gender_mapping.get(voice_name, 'female')
-        print(f"Determined gender: {gender}")
-        
-        # Mapping of language and accent to Azure language codes
-        language_code_mapping = {
-            'en': {
-                'us': 'en-US',
-                'neutral': 'en-US',
-                'british': 'en-GB',
-                'australian': 'en-AU'
-            },
-            'fr': {
-                'neutral': 'fr-FR',
-                'canadian': 'fr-CA'
-            },
-            'es': {
-                'neutral': 'es-ES',
-                'mexican': 'es-MX'
-            },
-            'ar': {
-                'neutral': 'ar-EG',
-                'eg': 'ar-EG',
-                'sa': 'ar-SA'
-            },
-            'it': {
-                'neutral': 'it-IT'
-            },
-            'zh': {
-                'neutral': 'zh-CN'
-            },
-            'pt': {
-                'neutral': 'pt-BR'
-            }
-        }
-        
-        # Get the correct language code
-        language_code = language_code_mapping.get(language, {}).get(accent, f"{language}-{accent}")
-        print(f"Using language code: {language_code}")
-        
-        # Language and accent mapping for more descriptive names
-        language_accent_mapping = {
-            'EN-US': {
-                'language': 'American English',
-                'accent': 'American accent'
-            },
-            'EN-GB': {
-                'language': 'British English',
-                'accent': 'British accent'
-            },
-            'EN-AU': {
-                'language': 'Australian English',
-                'accent': 'Australian accent'
-            },
-            'FR-FR': {
-                'language': 'Français',
-                'accent': 'accent français'
-            },
-            'FR-CA': {
-                'language': 'Français',
-                'accent': 'accent québécois'
-            },
-            'ES-ES': {
-                'language': 'Español',
-                'accent': 'acento español'
-            },
-            'ES-MX': {
-                'language': 'Español',
-                'accent': 'acento mexicano'
-            },
-            'AR-EG': {
-                'language': 'Arabic',
-                'accent': 'Egyptian accent'
-            },
-            'IT-IT': {
-                'language': 'Italiano',
-                'accent': 'Italian accent'
-            },
-            'ZH-CN': {
-                'language': 'Mandarin Chinese',
-                'accent': 'Chinese accent'
-            },
-            'PT-BR': {
-                'language': 'Português',
-                'accent': 'Brazilian accent'
-            }
-        }
-        
-        # Get the descriptive language and accent names
-        language_details = language_accent_mapping.get(language_code.upper(), {
-            'language': language_code,
-            'accent': f'{language_code} accent'
-        })
-        
-        print(f"Debug - Language Code: {language_code}")
-        print(f"Debug - Language Details: {language_details}")
-        print(f"Debug - Original Language: {language}")
-        print(f"Debug - Original Accent: {accent}")
-        
-        if topic:
-            from app.topics.manager import TopicManager
-            topic_manager = TopicManager()
-            print('heeehhehhhe',topic_manager,topic)
-            selected_topic = topic_manager.get_topic(topic)
-            if not selected_topic:
-                print(f"Warning: Topic {topic} not found, falling back to random")
-                initial_message_data = await generate_initial_message(
-                    language=language, 
-                    accent=accent, 
-                    voice_gender=gender, 
-                    topic_id=topic,
-                    is_kids_mode=is_kids_mode
-                )
-            else:
-                # Language-specific greetings and message structures
-                # Determine the language base for prompt selection
-                language_base = language_code[:2].lower()
-                
-                # Select the initial prompt based on language
-                if isinstance(selected_topic.initial_prompt, dict):
-                    initial_prompt = selected_topic.initial_prompt.get(language_base, 
-                                                                       selected_topic.initial_prompt.get('en', 'Let\'s start a conversation'))
-                else:
-                    initial_prompt = selected_topic.initial_prompt
-                
-                # Select topic name based on language
-                topic_name = selected_topic.name
-                if isinstance(topic_name, dict):
-                    # Use language-specific name or fallback to English
-                    if language_base == 'fr':
-                        topic_name = topic_name.get('fr', topic_name.get('en', 'Topic'))
-                    elif language_base == 'es':
-                        topic_name = topic_name.get('es', topic_name.get('en', 'Topic'))
-                    else:  # Default to English
-                        topic_name = topic_name.get('en', 'Topic')
-                
-                # Construct the message with language-specific topic name
-                if language_base == 'fr':
-                    message = (
-                        f"Bonjour ! Je suis votre coach linguistique IA. "
-                        f"Pratiquons votre {language_details['accent']} en {language_details['language']}. "
-                        f"Aujourd'hui, nous allons parler de {topic_name}. {initial_prompt}"
-                    )
-                elif language_base == 'es':
-                    message = (
-                        f"¡Hola! Soy tu coach de idiomas IA. "
-                        f"Practiquemos tu {language_details['accent']} en {language_details['language']}. "
-                        f"Hoy hablaremos sobre {topic_name}. {initial_prompt}"
-                    )
-                else:  # Default to English
-                    message = (
-                        f"{'Hello' if gender == 'female' else 'Hey'} there! I'm your AI language coach. "
-                        f"Let's practice your {language_details['accent']} in {language_details['language']}. "
-                        f"Today, we'll talk about {topic_name}. {initial_prompt}"
-                    )
-                topic_id = selected_topic.id
-                print('jkklfgkf',topic_id, topic)
-                initial_message_data = {
-                    "message": message,
-                    "topic_id": topic_id,
-                    "topic_name": topic_name,
-                    "initial_history_message": None
-                }
-        else:
-            initial_message_data = await generate_initial_message(
-                language=language, 
-                accent=accent, 
-                voice_gender=gender, 
-                topic_id=topic,
-                is_kids_mode=is_kids_mode
-            )
+        initial_message_data = await build_initial_message(language, accent, voice_name, topic, is_kids_mode)
         
         message = initial_message_data["message"]
         topic_id = initial_message_data["topic_id"]
@@ -240,16 +334,14 @@ async def start_conversation_endpoint(
         print(f"Generated message: {message}")
         
         # Generate speech for initial message
-        audio_file_path = await generate_speech(message, voice_name=voice_name)
-        
-        # Read the audio file and convert to base64
-        with open(audio_file_path, 'rb') as audio_file:
-            audio_base64 = base64.b64encode(audio_file.read()).decode('utf-8')
+        output_format = negotiate_audio_format(audio_format, request.headers.get("accept"))
+        audio_data = await generate_speech(message, voice_name=voice_name, audio_format=output_format)
+        audio_fields = with_audio_url(request, audio_payload(audio_data, audio_delivery, output_format.content_type)) if audio_data else {"audio": ""}
         
         # Return the response
         return {
             "message": message,
-            "audio": audio_base64,
+            **audio_fields,
             "topic": topic_id,
             "topicName": topic_name
         }
@@ -264,69 +356,93 @@ async def start_conversation_endpoint(
             "error": f"Failed to start conversation: {str(e)}"
         }
 
-@router.post("/transcribe")
-async def transcribe_audio_endpoint(
-    audio: UploadFile = File(...),
-    language: str = Form(...),
-    accent: str = Form(...)
-):
-    """Transcribe audio file"""
+# Azure recognition locale for each language and accent
+TRANSCRIPTION_LANGUAGE_CODES = {
+    'en': {
+        'us': 'en-US',
+        'neutral': 'en-US',
+        'british': 'en-GB',
+        'australian': 'en-AU'
+    },
+    'fr': {
+        'neutral': 'fr-FR',
+        'canadian': 'fr-CA'
+    },
+    'es': {
+        'neutral': 'es-ES',
+        'mexican': 'es-MX'
+    },
+    'ar': {
+        'neutral': 'ar-EG',
+        'eg': 'ar-EG',
+        'sa': 'ar-SA'
+    },
+    'it': {
+        'neutral': 'it-IT'
+    },
+    'zh': {
+        'neutral': 'zh-CN'
+    },
+    'pt': {
+        'neutral': 'pt-BR'
+    }
+}
+
+# Binary frames buffered per live session before the client is held back
+LIVE_FRAME_QUEUE_SIZE = int(os.getenv("LIVE_FRAME_QUEUE_SIZE", "64"))
+
+def transcription_language_code(language: str, accent: str) -> str:
+    """Azure recognition locale for a language and accent, e.g. en/british -> en-GB"""
+    return TRANSCRIPTION_LANGUAGE_CODES.get(language, {}).get(accent, f"{language}-{accent}")
+
+async def transcribe_upload(
+    audio: UploadFile,
+    language: str,
+    accent: str,
+    mode: str = "long_form",
+    deadline: Optional[float] = None,
+    session_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Transcribe an uploaded recording, for /transcribe and /generate-response
+
+    ``mode`` picks the latency profile ("word", "sentence" or "long_form") and
+    ``deadline`` caps the seconds spent; partial text is returned when it hits.
+    With ``session_id`` the turn also feeds the session's accent estimate in the
+    background, until that estimate is confident.
+    """
     try:
         print(f"Transcribing audio - language: {language}, accent: {accent}, audio: {audio.filename}")
         print(f"Audio content type: {audio.content_type}")
         
-        # Read audio file
-        audio_data = await audio.read()
-        print(f"Audio data size: {len(audio_data)} bytes")
+        # Get the correct language code
+        language_code = transcription_language_code(language, accent)
+        print(f"Using language code: {language_code}")
         
-        # Convert audio to WAV
-        wav_data = await convert_audio(audio_data)
-        if not wav_data:
+        # Keep a copy of the turn for accent evidence while the session still needs it
+        turn_chunks = [] if session_id and accent_tracker.wants_turn(session_id) else None
+
+        async def upload_chunks():
+            async for chunk in iter_upload(audio):
+                if turn_chunks is not None:
+                    turn_chunks.append(chunk)
+                yield chunk
+
+        # Transcribe while the upload is decoded, chunk by chunk
+        try:
+            profile = RECOGNITION_PROFILES.get(mode, LONG_FORM_PROFILE)
+            transcription = await transcribe_audio_stream(upload_chunks(), language_code, profile, deadline)
+        except (UploadTooLargeError, TranscodingBusyError, SpeechGatewayError) as e:
+            return {
+                "transcription": "",
+                "error": str(e)
+            }
+        except TranscodingError:
             print("Failed to convert audio to WAV")
             return {
                 "transcription": "",
                 "error": "Failed to convert audio"
             }
         
-        # Mapping of language and accent to Azure language codes
-        language_code_mapping = {
-            'en': {
-                'us': 'en-US',
-                'neutral': 'en-US',
-                'british': 'en-GB',
-                'australian': 'en-AU'
-            },
-            'fr': {
-                'neutral': 'fr-FR',
-                'canadian': 'fr-CA'
-            },
-            'es': {
-                'neutral': 'es-ES',
-                'mexican': 'es-MX'
-            },
-            'ar': {
-                'neutral': 'ar-EG',
-                'eg': 'ar-EG',
-                'sa': 'ar-SA'
-            },
-            'it': {
-                'neutral': 'it-IT'
-            },
-            'zh': {
-                'neutral': 'zh-CN'
-            },
-            'pt': {
-                'neutral': 'pt-BR'
-            }
-        }
-        
-        # Get the correct language code
-        language_code = language_code_mapping.get(language, {}).get(accent, f"{language}-{accent}")
-        print(f"Using language code: {language_code}")
-        
-        # Transcribe audio
-        transcription = await transcribe_audio(wav_data, language_code)
-        
         # If transcription is a string (which shouldn't happen), convert to dict
         if isinstance(transcription, str):
             transcription = {
@@ -344,6 +460,8 @@ async def transcribe_audio_endpoint(
         
         # If no error, return transcription
         print(f"Transcribed text: {transcription}")
+        if turn_chunks and transcription.get('text'):
+            accent_tracker.observe_turn(session_id, b"".join(turn_chunks))
         return {
             "transcription": transcription.get('text', ''),
             "confidence": transcription.get('confidence', 'none')
@@ -356,56 +474,231 @@ async def transcribe_audio_endpoint(
             "error": str(e)
         }
 
-async def convert_audio(audio_data: bytes) -> Optional[bytes]:
-    """Convert audio to WAV format using ffmpeg with audio preprocessing"""
+@router.post("/transcribe")
+async def transcribe_audio_endpoint(
+    audio: UploadFile = File(...),
+    language: str = Form(...),
+    accent: str = Form(...),
+    mode: str = Form("long_form"),
+    deadline: Optional[float] = Form(None),
+    session_id: Optional[str] = Form(None)
+):
+    """Transcribe audio file, see transcribe_upload"""
+    return await transcribe_upload(audio, language, accent, mode, deadline, session_id)
+
+@router.websocket("/transcribe-live")
+async def transcribe_live_endpoint(
+    websocket: WebSocket,
+    language: str,
+    accent: str,
+    mode: str = "long_form",
+    input_format: Optional[str] = None
+):
+    """Transcribe audio frames while the user is still speaking
+
+    The client sends audio as binary frames (16kHz 16-bit mono PCM with
+    ``input_format=pcm``, otherwise MediaRecorder webm/ogg Opus chunks) and then
+    a text frame ``{"type": "end"}``. The server answers with JSON messages:
+    ``{"type": "recognizing", "text": ...}`` partial hypotheses and
+    ``{"type": "recognized", "text": ...}`` final segments as they arrive, then
+    ``{"type": "transcript", "text": ..., "complete": ..., "reason": ...}``.
+
+    The end message may carry a ``respond`` object with the /generate-response
+    fields (voice_name, topic_id, history, is_kids_mode, audio_delivery,
+    audio_format); the transcript is then handed straight to the conversation
+    pipeline and its events follow, as in the streamed /generate-response.
+    """
+    await websocket.accept()
+    # Bounded, so a client sending faster than decoding and recognition is held back
+    frames: asyncio.Queue = asyncio.Queue(maxsize=LIVE_FRAME_QUEUE_SIZE)
+    outbox: asyncio.Queue = asyncio.Queue()
+    end_message: Dict[str, Any] = {}
+    protocol_errors: List[str] = []
+
+    async def queued_frames():
+        while True:
+            frame = await frames.get()
+            if frame is None:
+                return
+            yield frame
+
+    async def receive():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("bytes"):
+                    await frames.put(message["bytes"])
+                elif message.get("text"):
+                    try:
+                        data = json.loads(message["text"])
+                    except ValueError:
+                        protocol_errors.append("Text frames must be JSON messages")
+                        return
+                    if isinstance(data, dict) and data.get("type") == "end":
+                        end_message.update(data)
+                        return
+        finally:
+            await frames.put(None)
+
+    async def send():
+        while True:
+            message = await outbox.get()
+            if message is None:
+                return
+            await websocket.send_json(message)
+
+    receiver = asyncio.create_task(receive())
+    sender = asyncio.create_task(send())
     try:
-        # Run ffmpeg to convert WebM to WAV with audio preprocessing
-        process = (
-            ffmpeg
-            .input('pipe:0', format='webm')
-            # Add audio filters for better speech recognition
-            .filter('volume', '1.5')        # Slightly increase volume
-            .filter('highpass', f='100')    # Remove very low frequencies
-            .filter('lowpass', f='8000')    # Keep speech frequencies
-            .filter('afftdn')               # Reduce noise
-            .filter('dynaudnorm')           # Normalize audio levels
-            # Set output format for Azure Speech Services
-            .output(
-                'pipe:1',
-                format='wav',
-                acodec='pcm_s16le',
-                ac=1,              # Mono
-                ar=16000,          # 16kHz
-                loglevel='error'   # Reduce logging
-            )
-            .overwrite_output()
-            .run_async(
-                pipe_stdin=True,
-                pipe_stdout=True,
-                pipe_stderr=True
-            )
+        language_code = transcription_language_code(language, accent)
+        profile = RECOGNITION_PROFILES.get(mode, LONG_FORM_PROFILE)
+        transcript = await transcribe_live(
+            queued_frames(),
+            language_code,
+            profile,
+            input_format,
+            lambda name, text: outbox.put_nowait({"type": name, "text": text})
         )
-        
+        if protocol_errors:
+            # Malformed client message: report it and close instead of answering
+            outbox.put_nowait({"type": "error", "error": protocol_errors[0]})
+            return
+        outbox.put_nowait({
+            "type": "transcript",
+            "text": transcript.text,
+            "complete": transcript.complete,
+            "reason": transcript.reason,
+            **({"error": transcript.error} if transcript.error else {})
+        })
+
+        respond = end_message.get("respond")
+        if respond is not None and transcript.text:
+            topic_id = respond.get("topic_id") or respond.get("topic")
+            parsed_history = parse_history(respond.get("history") or [])
+            parsed_history.append(HistoryMessage(text=transcript.text, isUser=True, topic_id=topic_id))
+            events = generate_response_stream(
+                transcript.text,
+                language=language,
+                accent=accent,
+                voice_name=respond.get("voice_name", 'en-US-JennyNeural'),
+                topic_id=topic_id,
+                history=parsed_history,
+                is_kids_mode=bool(respond.get("is_kids_mode", False)),
+                audio_delivery=respond.get("audio_delivery", AUDIO_DELIVERY_BASE64),
+                audio_format=negotiate_audio_format(respond.get("audio_format"))
+            )
+            async for line in ndjson_response_events(websocket, events, transcript.text, parsed_history, topic_id):
+                outbox.put_nowait(json.loads(line))
+    except (UploadTooLargeError, TranscodingError, SpeechGatewayError, ValueError) as e:
+        outbox.put_nowait({"type": "error", "error": str(e)})
+    except Exception as e:
+        print(f"Error in live transcription: {str(e)}")
+        outbox.put_nowait({"type": "error", "error": "Live transcription failed"})
+    finally:
+        outbox.put_nowait(None)
+        receiver.cancel()
+        await asyncio.gather(receiver, return_exceptions=True)
         try:
-            # Write input data and get output
-            stdout_data, stderr_data = process.communicate(input=audio_data)
-            
-            if process.returncode != 0:
-                print(f"FFmpeg error: {stderr_data.decode() if stderr_data else 'Unknown error'}")
-                raise ValueError("Failed to convert audio format")
-            
-            return stdout_data
-            
-        except Exception as e:
-            print(f"Error during FFmpeg conversion: {str(e)}")
-            if stderr_data:
-                print(f"FFmpeg stderr: {stderr_data.decode()}")
-            raise
-            
+            await sender
+            await websocket.close()
+        except (WebSocketDisconnect, RuntimeError):
+            # The client already went away
+            pass
+
+async def decode_audio(audio_data: bytes) -> Optional[AudioBuffer]:
+    """Decode an upload once and condition it to 16kHz mono for speech recognition
+
+    PCM WAV uploads are read directly; anything else is decoded by the
+    shared ffmpeg transcoding pool first.
+    """
+    try:
+        # Uploads that are already PCM skip the ffmpeg round trip entirely
+        audio = AudioBuffer.from_wav_bytes(audio_data)
+        if audio is None:
+            pcm_data = await transcoding_pool.submit(audio_data, build_decode_args('webm'))
+            audio = AudioBuffer.from_pcm16(pcm_data, SPEECH_SAMPLE_RATE)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: audio.condition().to_int16())
+    except TranscodingBusyError:
+        # Let the endpoint report back-pressure instead of a generic conversion failure
+        raise
     except Exception as e:
         print(f"Error converting audio: {str(e)}")
         return None
 
+async def convert_audio(audio_data: bytes) -> Optional[bytes]:
+    """Convert audio to conditioned 16kHz mono WAV format"""
+    audio = await decode_audio(audio_data)
+    return audio.to_wav_bytes() if audio is not None else None
+
+def with_audio_url(request: HTTPConnection, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the fetch URL for audio delivered by handle"""
+    if payload.get("audio_id"):
+        payload["audio_url"] = str(request.url_for("get_audio_endpoint", audio_id=payload["audio_id"]))
+    return payload
+
+def iter_audio_chunks(data: memoryview, chunk_size: int = 64 * 1024):
+    for offset in range(0, len(data), chunk_size):
+        yield bytes(data[offset:offset + chunk_size])
+
+@router.get("/audio/{audio_id}")
+async def get_audio_endpoint(audio_id: str, request: Request):
+    """Serve synthesized audio delivered by handle, with single-range support for seeking"""
+    entry = audio_store.get(audio_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Audio not found or expired")
+
+    size = len(entry.data)
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    start, end = byte_range or (0, size - 1)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(end - start + 1),
+        "Cache-Control": "private, max-age=300"
+    }
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    return StreamingResponse(
+        iter_audio_chunks(memoryview(entry.data)[start:end + 1]),
+        status_code=206 if byte_range else 200,
+        media_type=entry.content_type,
+        headers=headers
+    )
+
+@router.get("/transcoding-stats")
+async def transcoding_stats_endpoint():
+    """Report queue depth and throughput of the audio transcoding pool and the live-stream pool"""
+    return {**transcoding_pool.stats(), "live": live_transcoding_pool.stats()}
+
+@router.get("/speech-pool-stats")
+async def speech_pool_stats_endpoint():
+    """Report warm Azure client counts and reuse counters of the speech client pool"""
+    return speech_pool.stats()
+
+@router.get("/speech-gateway-stats")
+async def speech_gateway_stats_endpoint():
+    """Report in-flight calls, queue wait and service time of speech calls per operation"""
+    return {**speech_gateway.stats(), "backend": get_speech_backend().stats()}
+
+@router.get("/accent-tracker-stats")
+async def accent_tracker_stats_endpoint():
+    """Report tracked sessions, how many are confident and turns scored or skipped"""
+    return accent_tracker.stats()
+
+@router.get("/tts-cache-stats")
+async def tts_cache_stats_endpoint():
+    """Report hit, miss and eviction counters of the synthesis cache and asset pack"""
+    pack = tts_assets.asset_pack
+    return {**tts_cache.stats(), "asset_pack": pack.stats() if pack else None}
+
 @router.post("/analyze-pronunciation")
 async def analyze_pronunciation_endpoint(
     audio: UploadFile = File(...),
@@ -423,44 +716,18 @@ async def analyze_pronunciation_endpoint(
         print(f"    Reference Text: {reference_text}")
         print(f"    Is Word Practice: {is_word_practice}")
         
-        # Mapping of language and accent to Azure language codes
-        language_code_mapping = {
-            'en': {
-                'us': 'en-US',
-                'neutral': 'en-US',
-                'british': 'en-GB',
-                'australian': 'en-AU'
-            },
-            'fr': {
-                'neutral': 'fr-FR',
-                'canadian': 'fr-CA'
-            },
-            'es': {
-                'neutral': 'es-ES',
-                'mexican': 'es-MX'
-            },
-            'ar': {
-                'neutral': 'ar-EG',
-                'eg': 'ar-EG',
-                'sa': 'ar-SA'
-            },
-            'it': {
-                'neutral': 'it-IT'
-            },
-            'zh': {
-                'neutral': 'zh-CN'
-            },
-            'pt': {
-                'neutral': 'pt-BR'
-            }
-        }
-        
         # Get the correct language code
-        language_code = language_code_mapping.get(language, {}).get(accent, f"{language}-{accent}")
+        language_code = transcription_language_code(language, accent)
         print(f"  Determined Language Code: {language_code}")
         
-        # Read audio file
-        audio_data = await audio.read()
+        # Read audio file, enforcing the upload limits
+        try:
+            audio_data = await read_upload(audio)
+        except UploadTooLargeError as e:
+            return {
+                "pronunciation_feedback": "",
+                "error": str(e)
+            }
         print(f"  Audio data size: {len(audio_data)} bytes")
         
         # Convert audio to WAV
@@ -494,8 +761,66 @@ async def analyze_pronunciation_endpoint(
             "error": f"Failed to analyze pronunciation: {str(e)}"
         }
 
+@router.post("/analyze-pronunciation-batch")
+async def analyze_pronunciation_batch_endpoint(
+    audio: List[UploadFile] = File(...),
+    reference_texts: str = Form(...),
+    language: str = Form(...),
+    accent: str = Form(...),
+    is_word_practice: str = Form(default="false"),
+    concurrency: Optional[int] = Form(None)
+):
+    """Analyze pronunciation of a whole word list or game round in one request
+
+    ``reference_texts`` is a JSON list. Send one audio file per reference text,
+    or a single recording of all of them with pauses in between, which is split
+    into one utterance per reference text.
+    """
+    try:
+        references = json.loads(reference_texts)
+    except json.JSONDecodeError:
+        references = None
+    if not isinstance(references, list) or not references or not all(isinstance(text, str) for text in references):
+        return {"results": [], "error": "reference_texts must be a JSON list of strings"}
+    if len(references) > PRONUNCIATION_BATCH_MAX_ITEMS:
+        return {"results": [], "error": f"At most {PRONUNCIATION_BATCH_MAX_ITEMS} items per batch"}
+    if len(audio) != 1 and len(audio) != len(references):
+        return {"results": [], "error": "Send one audio file per reference text, or a single recording of all of them"}
+
+    language_code = transcription_language_code(language, accent)
+    try:
+        uploads = await asyncio.gather(*(read_upload(upload) for upload in audio))
+        # All clips are converted in parallel on the transcoding pool
+        decoded = await asyncio.gather(*(decode_audio(audio_data) for audio_data in uploads))
+    except UploadTooLargeError as e:
+        return {"results": [], "error": str(e)}
+    except TranscodingBusyError:
+        raise HTTPException(status_code=503, detail="Audio conversion is busy, please retry shortly")
+
+    if len(decoded) == len(references):
+        clips = list(decoded)
+    elif decoded[0] is None:
+        return {"results": [], "error": "Failed to convert audio"}
+    else:
+        # One recording: cut it at the longest pauses into one utterance per reference text
+        recording = decoded[0]
+        loop = asyncio.get_running_loop()
+        speech_map = await loop.run_in_executor(None, detect_speech, recording)
+        spans = speech_map.utterances(len(references))
+        clips = [recording.trim(start, end) for start, end in spans]
+        clips += [None] * (len(references) - len(clips))
+
+    try:
+        return await analyze_pronunciation_batch(
+            list(zip(clips, references)), language_code, is_word_practice, concurrency
+        )
+    except Exception as e:
+        print(f"Error analyzing pronunciation batch: {str(e)}")
+        return {"results": [], "error": f"Failed to analyze pronunciation: {str(e)}"}
+
 @router.post("/generate-response")
 async def generate_response_endpoint(
+    request: Request,
     audio: UploadFile = File(...),
     text: Optional[str] = Form(None),
     language: str = Form(...), 
@@ -504,16 +829,16 @@ async def generate_response_endpoint(
     topic_id: Optional[str] = Form(None),
     topic: Optional[str] = Form(None),
     history: Optional[str] = Form(None),
-    is_kids_mode: bool = Form(False)
+    is_kids_mode: bool = Form(False),
+    audio_delivery: str = Form(AUDIO_DELIVERY_BASE64),
+    audio_format: Optional[str] = Form(None),
+    stream: bool = Form(False),
+    session_id: Optional[str] = Form(None)
 ):
     try:
         # First, transcribe the audio if text is not provided
         if not text:
-            transcription_data = await transcribe_audio_endpoint(
-                audio=audio, 
-                language=language, 
-                accent=accent
-            )
+            transcription_data = await transcribe_upload(audio, language, accent, session_id=session_id)
             text = transcription_data.get('transcription', '')
             
             # Check if transcription is empty
@@ -526,14 +851,7 @@ async def generate_response_endpoint(
         parsed_history = []
         if history:
             try:
-                history_data = json.loads(history)
-                parsed_history = [
-                    HistoryMessage(
-                        text=msg.get('text', ''), 
-                        isUser=msg.get('isUser', False),
-                        topic_id=msg.get('topic_id')
-                    ) for msg in history_data
-                ]
+                parsed_history = parse_history(json.loads(history))
             except json.JSONDecodeError:
                 print("Failed to parse history JSON")
         
@@ -549,6 +867,24 @@ async def generate_response_endpoint(
         )
         parsed_history.append(user_message)
         
+        output_format = negotiate_audio_format(audio_format, request.headers.get("accept"))
+        if stream:
+            events = generate_response_stream(
+                text, 
+                language=language, 
+                accent=accent, 
+                voice_name=voice_name, 
+                topic_id=effective_topic_id,
+                history=parsed_history,
+                is_kids_mode=is_kids_mode,
+                audio_delivery=audio_delivery,
+                audio_format=output_format
+            )
+            return StreamingResponse(
+                ndjson_response_events(request, events, text, parsed_history, effective_topic_id),
+                media_type="application/x-ndjson"
+            )
+        
         # Generate AI response
         response = await generate_response(
             text, 
@@ -557,135 +893,98 @@ async def generate_response_endpoint(
             voice_name=voice_name, 
             topic_id=effective_topic_id,
             history=parsed_history,
-            is_kids_mode=is_kids_mode
+            is_kids_mode=is_kids_mode,
+            audio_delivery=audio_delivery,
+            audio_format=output_format
         )
+        with_audio_url(request, response)
         
-        # Add AI response to history
-        ai_message = HistoryMessage(
-            text=response['message'], 
-            isUser=False, 
-            topic_id=effective_topic_id
-        )
-        parsed_history.append(ai_message)
-        
-        # Convert history back to JSON for frontend
-        history_json = json.dumps([
-            {
-                'text': msg.text, 
-                'isUser': msg.isUser, 
-                'topic_id': msg.topic_id
-            } for msg in parsed_history
-        ])
-        
-        return {
-            **response,
-            'transcribed_text': text,
-            'history': history_json,
-            'topic_id': effective_topic_id
-        }
+        return with_history(response, text, parsed_history, effective_topic_id)
     except Exception as e:
         print(f"Error in generate_response_endpoint: {str(e)}")
         return {"error": str(e)}
 
+def parse_history(history_data: List[Dict[str, Any]]) -> List[HistoryMessage]:
+    """Conversation history as the frontend sends it, as HistoryMessage objects"""
+    return [
+        HistoryMessage(
+            text=msg.get('text', ''), 
+            isUser=msg.get('isUser', False),
+            topic_id=msg.get('topic_id')
+        ) for msg in history_data
+    ]
+
+def with_history(response: Dict[str, Any], text: str, parsed_history: list, topic_id: Optional[str]) -> Dict[str, Any]:
+    """Final /generate-response payload: the reply plus the updated history for the frontend"""
+    # Add AI response to history
+    ai_message = HistoryMessage(
+        text=response['message'], 
+        isUser=False, 
+        topic_id=topic_id
+    )
+    parsed_history.append(ai_message)
+    
+    # Convert history back to JSON for frontend
+    history_json = json.dumps([
+        {
+            'text': msg.text, 
+            'isUser': msg.isUser, 
+            'topic_id': msg.topic_id
+        } for msg in parsed_history
+    ])
+    
+    return {
+        **response,
+        'transcribed_text': text,
+        'history': history_json,
+        'topic_id': topic_id
+    }
+
+async def ndjson_response_events(request: HTTPConnection, events, text: str, parsed_history: list, topic_id: Optional[str]):
+    """Serialize generate_response_stream events as newline-delimited JSON"""
+    async for event in events:
+        if event["type"] == "audio":
+            with_audio_url(request, event)
+        elif event["type"] == "done":
+            event["response"] = with_history(event["response"], text, parsed_history, topic_id)
+        yield json.dumps(event, ensure_ascii=False) + "\n"
+
+def resolve_voice_name(voice_name: Optional[str], language: str, accent: str) -> Optional[str]:
+    """Turn an accent or gender passed as voice_name into the matching neural voice"""
+    if voice_name in ["neutral", "british", "australian", "canadian", "mexican", "male", "female"]:
+        # Extract gender from voice_name if possible, otherwise default to female
+        gender = "female"
+        if voice_name in ["male", "female"]:
+            gender = voice_name
+        
+        # Get the voice based on language, accent, and gender
+        voice_name = VOICE_MAPPING.get(language, {}).get(accent, {}).get(gender, "en-US-JennyNeural")
+    
+    print(f'Voice Mapping Debug: language={language}, accent={accent}, voice_name={voice_name}')
+    print(f'Final voice name: {voice_name}')
+    return voice_name
+
 @router.post("/generate-speech")
 async def generate_speech_endpoint(
+    request: Request,
     text: str = Form(...),
     language: str = Form(default="en"),
     accent: str = Form(default="neutral"),
-    voice_name: Optional[str] = Form(None)
+    voice_name: Optional[str] = Form(None),
+    audio_delivery: str = Form(AUDIO_DELIVERY_BASE64),
+    audio_format: Optional[str] = Form(None)
 ):
     """Generate speech from text for a given language and accent"""
     try:
-        # Determine voice name based on language and accent
-        voice_mapping = {
-            "en": {
-                "neutral": {
-                    "male": "en-US-GuyNeural",
-                    "female": "en-US-JennyNeural"
-                },
-                "british": {
-                    "male": "en-GB-RyanNeural", 
-                    "female": "en-GB-LibbyNeural"
-                },
-                "australian": {
-                    "male": "en-AU-WilliamNeural",
-                    "female": "en-AU-NatashaNeural"
-                }
-            },
-            "fr": {
-                "neutral": {
-                    "male": "fr-FR-ClaudeNeural",
-                    "female": "fr-FR-DeniseNeural"
-                },
-                "canadian": {
-                    "male": "fr-CA-JeanNeural",
-                    "female": "fr-CA-SylvieNeural"
-                }
-            },
-            "es": {
-                "neutral": {
-                    "male": "es-ES-AlvaroNeural",
-                    "female": "es-ES-ElviraNeural"
-                },
-                "mexican": {
-                    "male": "es-MX-JorgeNeural",
-                    "female": "es-MX-DaliaNeural"
-                }
-            },
-            "ar": {
-                "neutral": {
-                    "male": "ar-EG-AhmedNeural",
-                    "female": "ar-EG-NouraNeural"
-                }
-            },
-            "it": {
-                "neutral": {
-                    "male": "it-IT-FrancescoNeural",
-                    "female": "it-IT-IsabellaNeural"
-                }
-            },
-            "zh": {
-                "neutral": {
-                    "male": "zh-CN-YunyangNeural",
-                    "female": "zh-CN-XiaoxiaoNeural"
-                }
-            },
-            "pt": {
-                "neutral": {
-                    "male": "pt-BR-AntonioNeural",
-                    "female": "pt-BR-FranciscaNeural"
-                }
-            }
-        }
-        
-        # If voice_name is an accent or gender, convert it to the correct neural voice
-        if voice_name in ["neutral", "british", "australian", "canadian", "mexican", "male", "female"]:
-            # Extract gender from voice_name if possible, otherwise default to female
-            gender = "female"
-            if voice_name in ["male", "female"]:
-                gender = voice_name
-            
-            # Get the voice based on language, accent, and gender
-            voice_name = voice_mapping.get(language, {}).get(accent, {}).get(gender, "en-US-JennyNeural")
-        
-        print(f'Voice Mapping Debug: language={language}, accent={accent}, voice_name={voice_name}')
-        print(f'Full Voice Mapping: {json.dumps(voice_mapping, indent=2)}')
-        
-        print(f'Final voice name: {voice_name}')
+        voice_name = resolve_voice_name(voice_name, language, accent) or "en-US-JennyNeural"
         
         # Generate speech
-        audio_file_path = await generate_speech(text, voice_name=voice_name)
+        output_format = negotiate_audio_format(audio_format, request.headers.get("accept"))
+        audio_data = await generate_speech(text, voice_name=voice_name, audio_format=output_format)
         
-        # Read the audio file and convert to base64
-        if audio_file_path and os.path.exists(audio_file_path):
-            with open(audio_file_path, 'rb') as audio_file:
-                audio_base64 = base64.b64encode(audio_file.read()).decode('utf-8')
-            
-            # Clean up the temporary file
-            os.unlink(audio_file_path)
-            
+        if audio_data:
             return {
-                "audio": audio_base64,
+                **with_audio_url(request, audio_payload(audio_data, audio_delivery, output_format.content_type)),
                 "voice_name": voice_name
             }
         else:
@@ -703,6 +1002,31 @@ async def generate_speech_endpoint(
             "error": f"Speech generation error: {str(e)}"
         }
 
+@router.post("/generate-speech-stream")
+async def generate_speech_stream_endpoint(
+    request: Request,
+    text: str = Form(...),
+    language: str = Form(default="en"),
+    accent: str = Form(default="neutral"),
+    voice_name: Optional[str] = Form(None),
+    audio_format: Optional[str] = Form(None)
+):
+    """Stream speech as raw audio, sentence by sentence, so playback starts after the first sentence"""
+    voice_name = resolve_voice_name(voice_name, language, accent) or "en-US-JennyNeural"
+    output_format = negotiate_audio_format(audio_format, request.headers.get("accept"))
+    stream_format, _, _ = streaming_format(output_format)
+    try:
+        chunks = generate_speech_stream(text, voice_name=voice_name, audio_format=output_format)
+    except Exception as e:
+        print(f"Error in generate_speech_stream_endpoint: {str(e)}")
+        return {"voice_name": voice_name, "error": f"Speech generation error: {str(e)}"}
+    
+    return StreamingResponse(
+        chunks,
+        media_type=stream_format.content_type,
+        headers={"X-Voice-Name": voice_name, "Cache-Control": "no-store"}
+    )
+
 @router.post("/pronunciation-help")
 def get_pronunciation_help(request: PronunciationHelpRequest):
     """
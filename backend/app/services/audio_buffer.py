@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+from math import gcd
+from typing import Optional, Union
+
+import numpy as np
+from scipy import signal
+
+from app.services.audio_conditioning import (
+    ConditioningConfig,
+    DEFAULT_CONFIG,
+    SPEECH_SAMPLE_RATE,
+    condition_speech,
+    decode_wav,
+    encode_wav,
+    to_float32,
+    to_pcm16
+)
+
+
+@dataclass
+class AudioBuffer:
+    """Decoded PCM audio shared across services for the lifetime of a request.
+
+    ``samples`` is either a 1-D mono array or a (frames, channels) array, stored as
+    int16 or float32. Operations that only select data (mono views of single-channel
+    audio, slicing, trimming) return views over the same memory; operations that
+    change sample values return a new buffer.
+    """
+    samples: np.ndarray
+    sample_rate: int
+
+    @classmethod
+    def from_wav_bytes(cls, wav_data: bytes) -> Optional['AudioBuffer']:
+        """Decode PCM WAV bytes without copying the frame data; None if not a PCM WAV file"""
+        decoded = decode_wav(wav_data)
+        if decoded is None:
+            return None
+        samples, sample_rate = decoded
+        if samples.dtype != np.int16:
+            samples = to_pcm16(to_float32(samples.reshape(-1)).reshape(samples.shape))
+        return cls(samples, sample_rate)
+
+    @classmethod
+    def from_pcm16(cls, pcm_data: bytes, sample_rate: int = SPEECH_SAMPLE_RATE, channels: int = 1) -> 'AudioBuffer':
+        """Wrap raw little-endian 16-bit PCM bytes"""
+        samples = np.frombuffer(pcm_data, dtype=np.int16)
+        if channels > 1:
+            samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+        return cls(samples, sample_rate)
+
+    @classmethod
+    def coerce(cls, audio: Union[bytes, 'AudioBuffer'], sample_rate: int = SPEECH_SAMPLE_RATE) -> 'AudioBuffer':
+        """Accept an AudioBuffer, WAV bytes, or raw mono 16-bit PCM bytes at ``sample_rate``"""
+        if isinstance(audio, AudioBuffer):
+            return audio
+        buffer = cls.from_wav_bytes(audio)
+        if buffer is None:
+            buffer = cls.from_pcm16(audio, sample_rate)
+        return buffer
+
+    @property
+    def channels(self) -> int:
+        return 1 if self.samples.ndim == 1 else self.samples.shape[1]
+
+    @property
+    def frames(self) -> int:
+        return self.samples.shape[0]
+
+    @property
+    def duration(self) -> float:
+        return self.frames / float(self.sample_rate) if self.sample_rate else 0.0
+
+    @property
+    def is_float(self) -> bool:
+        return np.issubdtype(self.samples.dtype, np.floating)
+
+    def __len__(self) -> int:
+        return self.frames
+
+    def to_float32(self) -> 'AudioBuffer':
+        if self.samples.dtype == np.float32:
+            return self
+        return AudioBuffer(to_float32(self.samples.reshape(-1)).reshape(self.samples.shape), self.sample_rate)
+
+    def to_int16(self) -> 'AudioBuffer':
+        if self.samples.dtype == np.int16:
+            return self
+        return AudioBuffer(to_pcm16(self.samples), self.sample_rate)
+
+    def to_mono(self) -> 'AudioBuffer':
+        """Mix down to mono; single-channel input is returned as a view"""
+        if self.samples.ndim == 1:
+            return self
+        if self.channels == 1:
+            return AudioBuffer(self.samples[:, 0], self.sample_rate)
+        mixed = self.samples.mean(axis=1, dtype=np.float32)
+        if self.samples.dtype == np.int16:
+            mixed = np.round(mixed).astype(np.int16)
+        return AudioBuffer(mixed, self.sample_rate)
+
+    def resample(self, sample_rate: int) -> 'AudioBuffer':
+        """Polyphase resampling to ``sample_rate``, preserving the sample dtype"""
+        if sample_rate == self.sample_rate:
+            return self
+        divisor = gcd(self.sample_rate, sample_rate)
+        resampled = signal.resample_poly(
+            self.to_float32().samples, sample_rate // divisor, self.sample_rate // divisor, axis=0
+        ).astype(np.float32)
+        if self.samples.dtype == np.int16:
+            resampled = to_pcm16(resampled)
+        return AudioBuffer(resampled, sample_rate)
+
+    def slice(self, start_frame: int, end_frame: Optional[int] = None) -> 'AudioBuffer':
+        """Frame-range view over the same samples"""
+        return AudioBuffer(self.samples[max(0, start_frame):end_frame], self.sample_rate)
+
+    def trim(self, start_seconds: float, end_seconds: Optional[float] = None) -> 'AudioBuffer':
+        """Time-range view over the same samples"""
+        end_frame = None if end_seconds is None else int(round(end_seconds * self.sample_rate))
+        return self.slice(int(round(start_seconds * self.sample_rate)), end_frame)
+
+    def rms(self) -> float:
+        """Root mean square level in the units of the stored samples"""
+        if self.samples.size == 0:
+            return 0.0
+        return float(np.sqrt(np.mean(np.square(self.samples, dtype=np.float64))))
+
+    def peak(self) -> float:
+        if self.samples.size == 0:
+            return 0.0
+        return float(np.max(np.abs(self.samples.astype(np.float64, copy=False))))
+
+    def normalize(self, target_peak: float = 0.97, max_gain: float = 2.0, in_place: bool = False) -> 'AudioBuffer':
+        """Peak-normalize; float buffers can be scaled in place to avoid a copy"""
+        full_scale = 1.0 if self.is_float else 32767.0
+        peak = self.peak()
+        if peak <= 0:
+            return self
+        scale = min(target_peak * full_scale / peak, max_gain)
+        if in_place and self.is_float and self.samples.flags.writeable:
+            self.samples *= scale
+            return self
+        scaled = self.to_float32().samples * scale
+        return AudioBuffer(scaled, self.sample_rate) if self.is_float else AudioBuffer(to_pcm16(scaled), self.sample_rate)
+
+    def condition(self, config: ConditioningConfig = DEFAULT_CONFIG) -> 'AudioBuffer':
+        """Run the shared speech conditioning chain; returns mono float32 at the target rate"""
+        return AudioBuffer(condition_speech(self.samples, self.sample_rate, config), config.target_rate)
+
+    def for_recognition(self) -> 'AudioBuffer':
+        """Mono 16-bit PCM at 16kHz, the input format Azure speech streams expect by default"""
+        return self.to_mono().resample(SPEECH_SAMPLE_RATE).to_int16()
+
+    def to_pcm16_bytes(self) -> bytes:
+        return self.to_int16().samples.tobytes()
+
+    def to_wav_bytes(self) -> bytes:
+        return encode_wav(self.to_mono().samples, self.sample_rate)
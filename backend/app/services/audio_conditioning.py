@@ -0,0 +1,187 @@
+import io
+import wave
+from dataclasses import dataclass
+from math import gcd
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy import signal
+
+SPEECH_SAMPLE_RATE = 16000
+
+
+@dataclass
+class ConditioningConfig:
+    """Speech conditioning settings, mirroring the former ffmpeg filter graph"""
+    target_rate: int = SPEECH_SAMPLE_RATE
+    gain: float = 1.5                 # volume=1.5
+    highpass_hz: float = 100.0        # highpass=f=100
+    lowpass_hz: float = 8000.0        # lowpass=f=8000
+    filter_order: int = 4
+    denoise: bool = True              # afftdn
+    noise_percentile: float = 10.0    # Quietest frames used as the noise estimate
+    over_subtraction: float = 1.5
+    spectral_floor: float = 0.05
+    frame_size: int = 512
+    target_rms_db: float = -20.0      # dynaudnorm
+    max_gain: float = 10.0
+    peak_ceiling: float = 0.97
+
+
+DEFAULT_CONFIG = ConditioningConfig()
+
+
+def to_float32(samples: np.ndarray) -> np.ndarray:
+    """Convert integer PCM to float32 in [-1, 1], mixing multi-channel input down to mono"""
+    if samples.dtype == np.int16:
+        audio = samples.astype(np.float32) / 32768.0
+    elif samples.dtype == np.int32:
+        audio = samples.astype(np.float32) / 2147483648.0
+    elif samples.dtype == np.uint8:
+        audio = (samples.astype(np.float32) - 128.0) / 128.0
+    else:
+        audio = samples.astype(np.float32, copy=False)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    return audio
+
+
+def to_pcm16(samples: np.ndarray) -> np.ndarray:
+    """Convert float samples in [-1, 1] to clipped int16 PCM"""
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+
+def decode_wav(wav_data: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """Decode PCM WAV bytes into a (frames, channels) int array and its sample rate.
+
+    Returns None when the data is not a PCM WAV file, so callers can fall back to ffmpeg.
+    """
+    if len(wav_data) < 44 or wav_data[:4] != b'RIFF' or wav_data[8:12] != b'WAVE':
+        return None
+    try:
+        with wave.open(io.BytesIO(wav_data), 'rb') as wav_file:
+            channels = wav_file.getnchannels()
+            sample_width = wav_file.getsampwidth()
+            frame_rate = wav_file.getframerate()
+            frames = wav_file.readframes(wav_file.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}.get(sample_width)
+    if dtype is None:
+        return None
+    samples = np.frombuffer(frames, dtype=dtype)
+    return samples.reshape(-1, channels), frame_rate
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Encode mono float or int16 samples as 16-bit PCM WAV bytes"""
+    pcm = samples if samples.dtype == np.int16 else to_pcm16(samples)
+    output = io.BytesIO()
+    with wave.open(output, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+    return output.getvalue()
+
+
+def _band_sos(sample_rate: int, config: ConditioningConfig) -> np.ndarray:
+    """High-pass (and low-pass when below Nyquist) Butterworth sections"""
+    nyquist = sample_rate / 2.0
+    sections = [signal.butter(config.filter_order, config.highpass_hz, btype='highpass', fs=sample_rate, output='sos')]
+    if config.lowpass_hz < nyquist * 0.98:
+        sections.append(signal.butter(config.filter_order, config.lowpass_hz, btype='lowpass', fs=sample_rate, output='sos'))
+    return np.vstack(sections)
+
+
+def band_limit(samples: np.ndarray, sample_rate: int, config: ConditioningConfig = DEFAULT_CONFIG) -> np.ndarray:
+    """Band-limit filtering in a single SOS pass"""
+    return signal.sosfilt(_band_sos(sample_rate, config), samples).astype(np.float32)
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Polyphase resampling between integer sample rates"""
+    if source_rate == target_rate:
+        return samples
+    divisor = gcd(source_rate, target_rate)
+    return signal.resample_poly(samples, target_rate // divisor, source_rate // divisor).astype(np.float32)
+
+
+def spectral_subtract(samples: np.ndarray, sample_rate: int, config: ConditioningConfig = DEFAULT_CONFIG) -> np.ndarray:
+    """Spectral-subtraction denoise using the quietest frames as the noise profile"""
+    if len(samples) < config.frame_size * 4:
+        return samples
+
+    hop = config.frame_size // 2
+    _, _, spectrum = signal.stft(samples, fs=sample_rate, nperseg=config.frame_size, noverlap=config.frame_size - hop)
+    magnitude = np.abs(spectrum)
+
+    frame_energy = magnitude.sum(axis=0)
+    quiet = frame_energy <= np.percentile(frame_energy, config.noise_percentile)
+    noise = magnitude[:, quiet].mean(axis=1, keepdims=True)
+
+    cleaned = np.maximum(magnitude - config.over_subtraction * noise, config.spectral_floor * magnitude)
+    gain = np.divide(cleaned, magnitude, out=np.zeros_like(magnitude), where=magnitude > 0)
+    _, denoised = signal.istft(spectrum * gain, fs=sample_rate, nperseg=config.frame_size, noverlap=config.frame_size - hop)
+    return denoised[:len(samples)].astype(np.float32)
+
+
+def normalize_loudness(samples: np.ndarray, config: ConditioningConfig = DEFAULT_CONFIG) -> np.ndarray:
+    """Scale to the target RMS level, capped by a maximum gain and a peak ceiling"""
+    if samples.size == 0:
+        return samples
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    peak = float(np.max(np.abs(samples)))
+    if rms <= 0 or peak <= 0:
+        return samples
+    target_rms = 10 ** (config.target_rms_db / 20.0)
+    scale = min(target_rms / rms, config.max_gain, config.peak_ceiling / peak)
+    return (samples * scale).astype(np.float32)
+
+
+def condition_speech(samples: np.ndarray, sample_rate: int, config: ConditioningConfig = DEFAULT_CONFIG) -> np.ndarray:
+    """Apply the full speech conditioning chain to decoded PCM
+
+    Args:
+        samples (np.ndarray): PCM samples, int or float, mono or (frames, channels)
+        sample_rate (int): Sample rate of the input
+        config (ConditioningConfig): Conditioning settings
+
+    Returns:
+        np.ndarray: Mono float32 samples at ``config.target_rate``
+    """
+    audio = to_float32(samples) * config.gain
+    audio = band_limit(audio, sample_rate, config)
+    audio = resample(audio, sample_rate, config.target_rate)
+    if config.denoise:
+        audio = spectral_subtract(audio, config.target_rate, config)
+    return normalize_loudness(audio, config)
+
+
+
+class StreamingConditioner:
+    """Incremental version of the gain and band-limit stages for audio that arrives in blocks
+
+    Filter state is carried between blocks so the output matches filtering the whole
+    clip at once. Denoise and loudness normalisation need the complete clip and are
+    not applied; Azure's front end handles level for streamed recognition. Only
+    encoded uploads and live streams use this; PCM WAV uploads get condition_speech.
+    """
+
+    def __init__(self, sample_rate: int = SPEECH_SAMPLE_RATE, config: ConditioningConfig = DEFAULT_CONFIG):
+        self.config = config
+        self._sos = _band_sos(sample_rate, config)
+        self._state = np.zeros((self._sos.shape[0], 2))
+        self._carry = b''
+
+    def process(self, pcm_data: bytes) -> bytes:
+        """Condition a block of mono 16-bit PCM; odd trailing bytes are held for the next block"""
+        pcm_data = self._carry + pcm_data
+        usable = len(pcm_data) - len(pcm_data) % 2
+        self._carry = pcm_data[usable:]
+        if not usable:
+            return b''
+        audio = to_float32(np.frombuffer(pcm_data[:usable], dtype=np.int16)) * self.config.gain
+        filtered, self._state = signal.sosfilt(self._sos, audio, zi=self._state)
+        return to_pcm16(np.clip(filtered, -self.config.peak_ceiling, self.config.peak_ceiling)).tobytes()
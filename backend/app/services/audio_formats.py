@@ -0,0 +1,88 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import azure.cognitiveservices.speech as speechsdk
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """A synthesis output format and how it is labelled on the wire"""
+    name: str
+    azure_format: speechsdk.SpeechSynthesisOutputFormat
+    content_type: str
+    extension: str
+
+
+AUDIO_FORMATS: Dict[str, AudioFormat] = {
+    "wav": AudioFormat("wav", speechsdk.SpeechSynthesisOutputFormat.Riff16Khz16BitMonoPcm, "audio/wav", "wav"),
+    "wav-24k": AudioFormat("wav-24k", speechsdk.SpeechSynthesisOutputFormat.Riff24Khz16BitMonoPcm, "audio/wav", "wav"),
+    "pcm-16k": AudioFormat("pcm-16k", speechsdk.SpeechSynthesisOutputFormat.Raw16Khz16BitMonoPcm, "audio/L16; rate=16000; channels=1", "pcm"),
+    "pcm-24k": AudioFormat("pcm-24k", speechsdk.SpeechSynthesisOutputFormat.Raw24Khz16BitMonoPcm, "audio/L16; rate=24000; channels=1", "pcm"),
+    "mp3": AudioFormat("mp3", speechsdk.SpeechSynthesisOutputFormat.Audio24Khz48KBitRateMonoMp3, "audio/mpeg", "mp3"),
+    "opus": AudioFormat("opus", speechsdk.SpeechSynthesisOutputFormat.Ogg24Khz16BitMonoOpus, "audio/ogg; codecs=opus", "ogg"),
+    "webm-opus": AudioFormat("webm-opus", speechsdk.SpeechSynthesisOutputFormat.Webm24Khz16BitMonoOpus, "audio/webm; codecs=opus", "webm"),
+}
+
+# WAV stays the default so clients that decode base64 as audio/wav keep working
+DEFAULT_AUDIO_FORMAT = AUDIO_FORMATS.get(os.getenv("TTS_OUTPUT_FORMAT", "wav"), AUDIO_FORMATS["wav"])
+
+# Accept media types (lower-case, without parameters) mapped to format names
+_MEDIA_TYPES = {
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+    "audio/webm": "webm-opus",
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/x-wav": "wav",
+}
+
+
+def _parse_accept(accept: str) -> List[Tuple[float, str, Dict[str, str]]]:
+    """Accept header entries as (q, media type, params), best first"""
+    entries = []
+    for position, part in enumerate(accept.split(",")):
+        pieces = [piece.strip() for piece in part.split(";")]
+        media_type = pieces[0].lower()
+        if not media_type:
+            continue
+        params = {}
+        for piece in pieces[1:]:
+            key, _, value = piece.partition("=")
+            params[key.strip().lower()] = value.strip()
+        try:
+            quality = float(params.pop("q", "1"))
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            entries.append((quality, -position, media_type, params))
+    entries.sort(reverse=True)
+    return [(quality, media_type, params) for quality, _, media_type, params in entries]
+
+
+def negotiate_audio_format(requested: Optional[str] = None, accept: Optional[str] = None) -> AudioFormat:
+    """Pick the synthesis output format for a request
+
+    An explicit format name (a form or query parameter) wins. Otherwise the first
+    audio media type in the Accept header that maps to a supported format is used,
+    and anything else falls back to the default.
+
+    Args:
+        requested (str, optional): Format name such as "opus", "mp3" or "pcm-24k"
+        accept (str, optional): The request's Accept header
+
+    Returns:
+        AudioFormat: The format to synthesize
+    """
+    if requested and requested.lower() in AUDIO_FORMATS:
+        return AUDIO_FORMATS[requested.lower()]
+
+    for _, media_type, params in _parse_accept(accept or ""):
+        if media_type == "audio/l16":
+            rate = params.get("rate", "16000")
+            return AUDIO_FORMATS["pcm-24k" if rate == "24000" else "pcm-16k"]
+        if media_type in _MEDIA_TYPES:
+            return AUDIO_FORMATS[_MEDIA_TYPES[media_type]]
+    return DEFAULT_AUDIO_FORMAT
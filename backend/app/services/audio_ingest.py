@@ -0,0 +1,94 @@
+import os
+import struct
+from typing import AsyncIterator, Optional
+
+from fastapi import UploadFile
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_AUDIO_SECONDS = float(os.getenv("MAX_AUDIO_SECONDS", "120"))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured size or duration limits"""
+
+
+def wav_declared_duration(header: bytes) -> Optional[float]:
+    """Duration in seconds declared by a RIFF/WAVE header, or None if it cannot be read
+
+    Only the header is needed: the byte rate comes from the ``fmt `` chunk and the
+    length from the ``data`` chunk size, so this works on the first upload chunk.
+    """
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+
+    byte_rate = None
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_id = header[offset:offset + 4]
+        chunk_size = struct.unpack('<I', header[offset + 4:offset + 8])[0]
+        if chunk_id == b'fmt ' and offset + 16 <= len(header):
+            byte_rate = struct.unpack('<I', header[offset + 16:offset + 20])[0] if offset + 20 <= len(header) else None
+        elif chunk_id == b'data':
+            # Streaming writers leave the size at 0 or 0xFFFFFFFF when unknown
+            if not byte_rate or chunk_size in (0, 0xFFFFFFFF):
+                return None
+            return chunk_size / float(byte_rate)
+        offset += 8 + chunk_size + (chunk_size % 2)
+    return None
+
+
+def sniff_input_format(first_chunk: bytes) -> str:
+    """Best-effort ffmpeg input format from the first bytes of an upload"""
+    if first_chunk[:4] == b'RIFF':
+        return 'wav'
+    if first_chunk[:4] == b'OggS':
+        return 'ogg'
+    if first_chunk[:4] == b'\x1a\x45\xdf\xa3':
+        return 'webm'
+    if first_chunk[4:8] == b'ftyp':
+        return 'mp4'
+    return 'webm'
+
+
+def check_declared_size(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES):
+    """Reject an upload whose declared size is over the limit before reading any of it"""
+    declared = upload.size
+    if declared is None:
+        content_length = upload.headers.get('content-length') if upload.headers else None
+        declared = int(content_length) if content_length and content_length.isdigit() else None
+    if declared is not None and declared > max_bytes:
+        raise UploadTooLargeError(f"Audio upload is too large ({declared} bytes, limit {max_bytes})")
+
+
+async def iter_upload(
+    upload: UploadFile,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    max_seconds: float = MAX_AUDIO_SECONDS
+) -> AsyncIterator[bytes]:
+    """Yield an upload in chunks, enforcing size and header-declared duration limits as it goes"""
+    check_declared_size(upload, max_bytes)
+
+    total = 0
+    first = True
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+
+        if first:
+            first = False
+            duration = wav_declared_duration(chunk)
+            if duration is not None and duration > max_seconds:
+                raise UploadTooLargeError(f"Audio is too long ({duration:.1f}s, limit {max_seconds:.0f}s)")
+
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLargeError(f"Audio upload is too large (over {max_bytes} bytes)")
+        yield chunk
+
+
+async def read_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES, max_seconds: float = MAX_AUDIO_SECONDS) -> bytes:
+    """Read a whole upload with the same limits as ``iter_upload``, for callers that need every byte"""
+    return b''.join([chunk async for chunk in iter_upload(upload, max_bytes=max_bytes, max_seconds=max_seconds)])
@@ -0,0 +1,42 @@
+from typing import Optional, Union
+
+import azure.cognitiveservices.speech as speechsdk
+
+from app.services.audio_buffer import AudioBuffer
+from app.services.audio_conditioning import SPEECH_SAMPLE_RATE
+
+
+def recognition_stream_format() -> speechsdk.audio.AudioStreamFormat:
+    """16kHz 16-bit mono PCM, the format every recognition input is brought to"""
+    return speechsdk.audio.AudioStreamFormat(samples_per_second=SPEECH_SAMPLE_RATE, bits_per_sample=16, channels=1)
+
+
+def recognition_audio_config(audio: Union[bytes, AudioBuffer]) -> speechsdk.audio.AudioConfig:
+    """Audio config backed by an in-memory push stream holding the whole clip
+
+    Push streams are consumed by the recognizer they are attached to, so build a
+    new config for every recognizer; decode once and pass the AudioBuffer to avoid
+    re-parsing the bytes each time.
+
+    Args:
+        audio (Union[bytes, AudioBuffer]): WAV bytes, raw 16kHz mono PCM, or a decoded buffer
+
+    Returns:
+        speechsdk.audio.AudioConfig: Config ready to hand to a recognizer
+    """
+    stream = speechsdk.audio.PushAudioInputStream(stream_format=recognition_stream_format())
+    write_recognition_audio(stream, audio)
+    return speechsdk.audio.AudioConfig(stream=stream)
+
+
+def write_recognition_audio(stream: speechsdk.audio.PushAudioInputStream, audio: Union[bytes, AudioBuffer]):
+    """Condition the whole clip into a recognition push stream and close it"""
+    stream.write(AudioBuffer.coerce(audio).for_recognition().to_pcm16_bytes())
+    stream.close()
+
+
+def synthesized_audio(result: speechsdk.SpeechSynthesisResult) -> Optional[bytes]:
+    """Audio bytes from a completed synthesis, or None if it failed or came back empty"""
+    if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+        return None
+    return result.audio_data or None
@@ -0,0 +1,115 @@
+import base64
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+AUDIO_DELIVERY_BASE64 = "base64"
+AUDIO_DELIVERY_HANDLE = "handle"
+AUDIO_DELIVERY_MODES = (AUDIO_DELIVERY_BASE64, AUDIO_DELIVERY_HANDLE)
+
+
+@dataclass
+class StoredAudio:
+    data: bytes
+    content_type: str
+    expires_at: float
+
+
+class AudioStore:
+    """Short-lived in-memory store for synthesized audio served by handle
+
+    Entries expire after ``ttl`` seconds and the oldest entries are evicted once
+    the total size passes ``max_bytes``, so an unfetched handle can never pin
+    memory for long.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.ttl = ttl or float(os.getenv("AUDIO_STORE_TTL_SECONDS", "300"))
+        self.max_bytes = max_bytes or int(os.getenv("AUDIO_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self._entries: "OrderedDict[str, StoredAudio]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, data: bytes, content_type: str = "audio/wav") -> str:
+        """Store audio and return its handle"""
+        audio_id = secrets.token_urlsafe(16)
+        with self._lock:
+            self._purge_expired()
+            self._entries[audio_id] = StoredAudio(data, content_type, time.monotonic() + self.ttl)
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.data)
+        return audio_id
+
+    def get(self, audio_id: str) -> Optional[StoredAudio]:
+        with self._lock:
+            entry = self._entries.get(audio_id)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(audio_id)
+                return None
+            return entry
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes}
+
+    def _remove(self, audio_id: str):
+        entry = self._entries.pop(audio_id, None)
+        if entry is not None:
+            self._size -= len(entry.data)
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        # Entries are inserted in expiry order, so stop at the first live one
+        while self._entries:
+            audio_id, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now:
+                break
+            self._remove(audio_id)
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Resolve a single ``bytes=`` Range header to inclusive (start, end) offsets
+
+    Returns None when the whole body should be sent (no header, or a form this
+    endpoint does not serve such as multiple ranges) and raises ValueError when
+    the range cannot be satisfied.
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    start_text, _, end_text = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if not start_text:
+            # Suffix range: the last N bytes
+            length = int(end_text)
+            if length <= 0:
+                raise ValueError("Empty suffix range")
+            return max(0, size - length), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        raise ValueError(f"Invalid range: {range_header}")
+    if start >= size or end < start:
+        raise ValueError(f"Range not satisfiable: {range_header}")
+    return start, min(end, size - 1)
+
+
+def audio_payload(audio_data: bytes, delivery: str = AUDIO_DELIVERY_BASE64, content_type: str = "audio/wav") -> Dict[str, Optional[str]]:
+    """JSON fields for synthesized audio: inline base64, or a handle for the audio endpoint"""
+    if delivery == AUDIO_DELIVERY_HANDLE:
+        return {
+            "audio": None,
+            "audio_id": audio_store.put(audio_data, content_type),
+            "audio_content_type": content_type
+        }
+    return {"audio": base64.b64encode(audio_data).decode('utf-8'), "audio_content_type": content_type}
+
+
+audio_store = AudioStore()
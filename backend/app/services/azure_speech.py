@@ -0,0 +1,221 @@
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import azure.cognitiveservices.speech as speechsdk
+
+from app.services.audio_formats import AudioFormat
+from app.services.audio_io import recognition_audio_config, synthesized_audio, write_recognition_audio
+from app.services.recognition import Transcript, recognize_continuous
+from app.services.speech_backend import (
+    CANCELED, LANGUAGE_CONFIDENCE, NO_MATCH, RECOGNIZED, Audio, AssessmentResult, AudioFeed, LanguageIdentification,
+    RecognitionResult, SpeechBackend, SynthesisError
+)
+from app.services.speech_gateway import ASSESSMENT, RECOGNITION, SYNTHESIS, SpeechGateway, speech_gateway
+from app.services.speech_pool import SINGLE_SHOT_PROFILE, RecognitionProfile, SpeechClientPool, speech_pool
+
+
+def _detailed_json(result: speechsdk.RecognitionResult) -> Dict[str, Any]:
+    try:
+        return json.loads(result.properties.get(speechsdk.PropertyId.SpeechServiceResponse_JsonResult) or "{}")
+    except json.JSONDecodeError:
+        return {}
+
+
+def _status(result: speechsdk.RecognitionResult):
+    """(status, detail) of a recognition result"""
+    if result.reason == speechsdk.ResultReason.RecognizedSpeech:
+        return RECOGNIZED, None
+    if result.reason == speechsdk.ResultReason.NoMatch:
+        details = result.no_match_details
+        return NO_MATCH, str(details.reason) if details else None
+    if result.reason == speechsdk.ResultReason.Canceled:
+        details = speechsdk.CancellationDetails(result)
+        if details.reason == speechsdk.CancellationReason.Error:
+            return CANCELED, f"{details.reason}: {details.error_details}"
+        return CANCELED, str(details.reason)
+    return NO_MATCH, str(result.reason)
+
+
+def _synthesis_failure(result: speechsdk.SpeechSynthesisResult) -> str:
+    if result.reason == speechsdk.ResultReason.Canceled:
+        details = result.cancellation_details
+        if details.reason == speechsdk.CancellationReason.Error:
+            return f"Speech synthesis canceled: {details.error_details}"
+        return f"Speech synthesis canceled: {details.reason}"
+    return f"Speech synthesis failed: {result.reason}"
+
+
+class AzureSpeechBackend(SpeechBackend):
+    """Azure Speech Services through the shared client pool and speech gateway"""
+
+    name = "azure"
+
+    def __init__(self, pool: SpeechClientPool = speech_pool, gateway: SpeechGateway = speech_gateway):
+        self.pool = pool
+        self.gateway = gateway
+
+    async def _take_recognizer(
+        self, language: str, profile: RecognitionProfile, audio: Optional[Audio] = None
+    ) -> Tuple[speechsdk.SpeechRecognizer, speechsdk.audio.PushAudioInputStream]:
+        """A pooled recognizer with ``audio`` already written, taken off the event loop
+
+        A pool miss builds and connects the recognizer, and writing may resample
+        the clip; both block, so they run on the gateway executor.
+        """
+        def take():
+            recognizer, push_stream = self.pool.take_recognizer(language, profile)
+            if audio is not None:
+                write_recognition_audio(push_stream, audio)
+            return recognizer, push_stream
+
+        return await self.gateway.offload(take)
+
+    async def synthesize(
+        self,
+        text: str,
+        voice_name: str,
+        audio_format: AudioFormat,
+        ssml: bool = False,
+        on_chunk: Optional[Callable[[bytes], None]] = None
+    ) -> bytes:
+        def speak() -> bytes:
+            # Synthesize in memory on a warm pooled synthesizer; the audio comes back on the result
+            with self.pool.synthesizer(voice_name, audio_format) as synthesizer:
+                if on_chunk:
+                    synthesizer.synthesizing.connect(
+                        lambda evt: evt.result.audio_data and on_chunk(evt.result.audio_data)
+                    )
+                speak_async = synthesizer.speak_ssml_async if ssml else synthesizer.speak_text_async
+                result = speak_async(text).get()
+            audio_data = synthesized_audio(result)
+            if audio_data is None:
+                raise SynthesisError(_synthesis_failure(result))
+            return audio_data
+
+        return await self.gateway.run(SYNTHESIS, speak)
+
+    async def recognize(
+        self,
+        audio: Audio,
+        language: str,
+        profile: RecognitionProfile = SINGLE_SHOT_PROFILE,
+        timeout: Optional[float] = None
+    ) -> RecognitionResult:
+        recognizer, push_stream = await self._take_recognizer(language, profile, audio)
+
+        def recognize() -> RecognitionResult:
+            # Timed on the worker so waiting for a gateway slot is not counted
+            started = time.monotonic()
+            result = recognizer.recognize_once()
+            elapsed = time.monotonic() - started
+
+            status, detail = _status(result)
+            nbest = _detailed_json(result).get('NBest', []) if status == RECOGNIZED else []
+            return RecognitionResult(
+                text=result.text.strip() if status == RECOGNIZED else "",
+                status=status,
+                detail=detail,
+                confidence=nbest[0].get('Confidence', 1.0) if nbest else 1.0,
+                alternatives=[alternative.get('Lexical', '') for alternative in nbest[1:]],
+                elapsed=elapsed
+            )
+
+        return await self.gateway.run(RECOGNITION, recognize, timeout=timeout or profile.deadline)
+
+    async def recognize_continuous(
+        self,
+        language: str,
+        profile: RecognitionProfile,
+        audio: Optional[Audio] = None,
+        feed: Optional[AudioFeed] = None,
+        timeout: Optional[float] = None,
+        on_event: Optional[Callable[[str, str], None]] = None
+    ) -> Transcript:
+        recognizer, push_stream = await self._take_recognizer(language, profile, audio)
+
+        async def write_feed():
+            await feed(push_stream.write)
+
+        return await recognize_continuous(
+            recognizer, push_stream, profile, write_feed if feed else None, timeout, on_event
+        )
+
+    async def assess_pronunciation(
+        self,
+        audio: Audio,
+        reference_text: str,
+        language: str,
+        granularity: str = "Phoneme",
+        enable_miscue: bool = False,
+        timeout: Optional[float] = None
+    ) -> AssessmentResult:
+        recognizer, push_stream = await self._take_recognizer(language, SINGLE_SHOT_PROFILE, audio)
+        speechsdk.PronunciationAssessmentConfig(
+            reference_text=reference_text,
+            grading_system=speechsdk.PronunciationAssessmentGradingSystem.HundredMark,
+            granularity=getattr(speechsdk.PronunciationAssessmentGranularity, granularity),
+            enable_miscue=enable_miscue
+        ).apply_to(recognizer)
+
+        def assess() -> AssessmentResult:
+            started = time.monotonic()
+            result = recognizer.recognize_once()
+            elapsed = time.monotonic() - started
+
+            status, detail = _status(result)
+            nbest = _detailed_json(result).get('NBest', []) if status == RECOGNIZED else []
+            best = nbest[0] if nbest else {}
+            return AssessmentResult(
+                text=result.text.strip() if status == RECOGNIZED else "",
+                status=status,
+                detail=detail,
+                scores=best.get('PronunciationAssessment', {}),
+                words=best.get('Words', []),
+                elapsed=elapsed
+            )
+
+        return await self.gateway.run(ASSESSMENT, assess, timeout=timeout)
+
+    async def identify_language(
+        self,
+        audio: Audio,
+        candidates: List[str],
+        profile: RecognitionProfile = SINGLE_SHOT_PROFILE,
+        timeout: Optional[float] = None
+    ) -> LanguageIdentification:
+        # Recognizers with language identification are not pooled; the pool keys on one locale
+        def identify() -> LanguageIdentification:
+            audio_config = recognition_audio_config(audio)
+            speech_config = self.pool.config()
+            profile.apply(speech_config)
+            recognizer = speechsdk.SpeechRecognizer(
+                speech_config=speech_config,
+                auto_detect_source_language_config=speechsdk.languageconfig.AutoDetectSourceLanguageConfig(
+                    languages=candidates
+                ),
+                audio_config=audio_config
+            )
+            started = time.monotonic()
+            result = recognizer.recognize_once()
+            elapsed = time.monotonic() - started
+
+            status, detail = _status(result)
+            details = _detailed_json(result) if status == RECOGNIZED else {}
+            nbest = details.get('NBest', [])
+            primary = details.get('PrimaryLanguage', {})
+            return LanguageIdentification(
+                text=result.text.strip() if status == RECOGNIZED else "",
+                status=status,
+                detail=detail,
+                confidence=nbest[0].get('Confidence', 1.0) if nbest else 1.0,
+                alternatives=[alternative.get('Lexical', '') for alternative in nbest[1:]],
+                elapsed=elapsed,
+                language=speechsdk.AutoDetectSourceLanguageResult(result).language if status == RECOGNIZED else None,
+                language_confidence=LANGUAGE_CONFIDENCE.get(primary.get('Confidence'), 0.5)
+            )
+
+        return await self.gateway.run(RECOGNITION, identify, timeout=timeout or profile.deadline)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "pool": self.pool.stats()}
@@ -1,14 +1,19 @@
 from openai import AsyncOpenAI, OpenAIError
+import asyncio
 import os
-from typing import List, Dict, Optional, Union, Tuple
+from typing import Any, AsyncIterator, Callable, List, Dict, Optional, Union, Tuple
 from app.schemas.conversation import HistoryMessage
 from dataclasses import dataclass
 import random
 from dotenv import load_dotenv
 from pydantic import BaseModel
-import base64
 import azure.cognitiveservices.speech as speechsdk
-import tempfile
+from app.services.audio_formats import AudioFormat, DEFAULT_AUDIO_FORMAT
+from app.services.speech_backend import get_speech_backend
+from app.services.tts_cache import cached_synthesis
+from app.services.audio_store import AUDIO_DELIVERY_BASE64, audio_payload
+from app.services.response_stream import consume_response_stream, parse_response_line
+from app.services.streaming_tts import SegmentPipeline, split_sentences
 from app.topics.manager import TopicManager as KidsTopicManager
 from app.services.topics import TopicManager as AdultTopicManager
 
@@ -534,9 +539,18 @@ async def generate_response(
     voice_name: str = 'en-US-JennyNeural',
     topic_id: Optional[str] = None,
     history: Optional[List[HistoryMessage]] = None,
-    is_kids_mode: bool = False
+    is_kids_mode: bool = False,
+    audio_delivery: str = AUDIO_DELIVERY_BASE64,
+    audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT,
+    on_event: Optional[Callable[[str, str], None]] = None
 ) -> Dict[str, str]:
-    """Generate AI response based on user's text"""
+    """Generate AI response based on user's text
+
+    With ``on_event`` the completion is streamed: each reply field is reported
+    as (field, value) once its line is complete, and each sentence of the
+    ``Response:`` field as ("sentence", text) as soon as it ends. No audio is
+    synthesized in that mode; see generate_response_stream.
+    """
     try:
         # Extract topic_id from conversation history if not provided
         if not topic_id and history:
@@ -1247,15 +1261,21 @@ async def generate_response(
 
         # Generate response
         if client:
-            response = await client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1000  # Increased to accommodate grammar feedback
-            )
+            completion_args = {
+                "model": "gpt-3.5-turbo",
+                "messages": messages,
+                "temperature": 0.7,
+                "max_tokens": 1000  # Increased to accommodate grammar feedback
+            }
+            if on_event is None:
+                response = await client.chat.completions.create(**completion_args)
 
-            # Parse response into grammar and message parts
-            message = response.choices[0].message.content.strip()
+                # Parse response into grammar and message parts
+                message = response.choices[0].message.content.strip()
+            else:
+                # Pipelined mode: fields and response sentences are reported while the model is still writing
+                stream = await client.chat.completions.create(**completion_args, stream=True)
+                message = (await consume_response_stream(stream, on_event)).strip()
             print(f"messagesQK: {messages}")
 
             print(f"Generated response: {message}")
@@ -1279,16 +1299,20 @@ async def generate_response(
             creative_feedback = ""
 
             for line in lines:
-                if line.startswith(("Grammar:", "Grammaire :", "Gramática:", "القواعد النحوية:", "语法：", "Gramática:", "Grammatica:")):
-                    grammar_feedback = line.split(':', 1)[1].strip().strip("[]'\"")  # Remove square brackets, quotes, and extra whitespace
-                elif line.startswith(("Explanation:", "Explication :", "Explicación:", "التوضيح:", "解释：", "Explicação:", "Spiegazione:")):
-                    explanation = line.split(':', 1)[1].strip()
-                elif line.startswith(("Intonation:","Intonation :", "Entonación:", "النبرة:", "语调：", "Entonação:", "Intonazione:")):
-                    intonation = line.split(':', 1)[1].strip()
-                elif line.startswith(("Response:", "Réponse :", "Respuesta:", "الرد:", "回复：", "Resposta:", "Risposta:")):
-                    ai_message = line.split(':', 1)[1].strip()
-                elif line.startswith(("Creative:", "Créatif:", "Creativo:", "الإبداعي:", "创意:", "Criativo:", "Creativo:")):
-                    creative_feedback = line.split(':', 1)[1].strip()
+                parsed = parse_response_line(line)
+                if not parsed:
+                    continue
+                field, value = parsed
+                if field == "grammar_feedback":
+                    grammar_feedback = value
+                elif field == "explanation":
+                    explanation = value
+                elif field == "intonation":
+                    intonation = value
+                elif field == "message":
+                    ai_message = value
+                elif field == "creative_feedback":
+                    creative_feedback = value
 
             # Ensure explanation is captured
             print(f"DEBUG - Grammar Feedback: {grammar_feedback}")
@@ -1458,26 +1482,23 @@ async def generate_response(
                     "- Maintain a conversational rhythm"
                 )
 
+            if on_event is not None:
+                # The caller synthesized the reply sentence by sentence as it streamed in
+                return response
+
             # Generate speech for AI message
-            audio_file_path = await generate_speech(
+            audio_data = await generate_speech(
                 text=ai_message,
                 language=language,
                 accent=accent,
-                voice_name=voice_name
+                voice_name=voice_name,
+                audio_format=audio_format
             )
 
-            # Convert audio to base64
-            try:
-                with open(audio_file_path, 'rb') as audio_file:
-                    audio_base64 = base64.b64encode(audio_file.read()).decode('utf-8')
-            except Exception as e:
-                print(f"Error converting audio to base64: {e}")
-                audio_base64 = None
-            finally:
-                # Clean up temporary audio file
-                os.unlink(audio_file_path)
+            # Inline base64 by default, or a handle for the audio endpoint
+            audio_fields = audio_payload(audio_data, audio_delivery, audio_format.content_type) if audio_data else {"audio": None}
 
-            response["audio"] = audio_base64
+            response.update(audio_fields)
 
             return response
         else:
@@ -1499,7 +1520,139 @@ async def generate_response(
         print(f"Error generating response: {str(e)}")
         raise Exception(f"Failed to generate response: {str(e)}")
 
-async def generate_speech(text: str, language: str, accent: str, voice_name: str) -> str:
+async def generate_response_stream(
+    text: str,
+    language: str,
+    accent: str,
+    voice_name: str = 'en-US-JennyNeural',
+    topic_id: Optional[str] = None,
+    history: Optional[List[HistoryMessage]] = None,
+    is_kids_mode: bool = False,
+    audio_delivery: str = AUDIO_DELIVERY_BASE64,
+    audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Pipelined generate_response: the reply is spoken while the model is still writing it
+
+    Each sentence of the ``Response:`` field is handed to synthesis as soon as it
+    ends, so turn latency approaches the slower of the LLM and TTS instead of
+    their sum.
+
+    Yields:
+        Dict[str, Any]: Events in order of availability:
+            {"type": "field", "field": ..., "value": ...} as each reply field completes,
+            {"type": "audio", "index": ..., "text": ..., **audio fields} per sentence, in reply order,
+            then {"type": "done", "response": ...} with the dict generate_response returns,
+            or {"type": "error", "error": ...}
+    """
+    pipeline = SegmentPipeline(conversation_voice(language, voice_name), audio_format)
+    events: asyncio.Queue = asyncio.Queue()
+    outcome: Dict[str, Any] = {}
+    spoken = 0
+
+    def on_event(name: str, value: str):
+        nonlocal spoken
+        if name == "sentence":
+            pipeline.add(value)
+            spoken += 1
+        else:
+            events.put_nowait({"type": "field", "field": name, "value": value})
+
+    async def produce():
+        try:
+            response = await generate_response(
+                text, language, accent, voice_name, topic_id, history, is_kids_mode,
+                audio_delivery, audio_format, on_event=on_event
+            )
+            if not spoken:
+                # No labelled Response line, so speak the fallback message
+                for sentence in split_sentences(response.get("message") or ""):
+                    pipeline.add(sentence)
+            outcome["event"] = {"type": "done", "response": response}
+        except Exception as e:
+            outcome["event"] = {"type": "error", "error": str(e)}
+        finally:
+            pipeline.close()
+
+    async def deliver_audio():
+        index = 0
+        async for sentence, audio_data in pipeline.segments():
+            events.put_nowait({
+                "type": "audio",
+                "index": index,
+                "text": sentence,
+                **audio_payload(audio_data, audio_delivery, audio_format.content_type)
+            })
+            index += 1
+
+    async def run():
+        try:
+            await asyncio.gather(produce(), deliver_audio())
+        finally:
+            events.put_nowait(None)
+
+    runner = asyncio.create_task(run())
+    try:
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+        yield outcome.get("event", {"type": "error", "error": "Response generation stopped"})
+    finally:
+        runner.cancel()
+        await pipeline.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+def conversation_voice(language: str, voice_name: str) -> str:
+    """
+    The voice the coach actually speaks with, after the Arabic voice fallbacks
+
+    Args:
+        language (str): Language of the text
+        voice_name (str): Requested voice
+
+    Returns:
+        str: A voice that can speak ``language``
+    """
+    # Ensure a valid voice name for Arabic
+    if language == 'ar':
+        # List of valid Arabic voices
+        valid_arabic_voices = [
+            'ar-EG-SalmaNeural', 'ar-SA-HamedNeural', 
+            'ar-SA-HalaNeural', 'ar-EG-HamedNeural'
+        ]
+
+        # If the provided voice name is not in the list, default to a valid voice
+        if voice_name not in valid_arabic_voices:
+            voice_name = 'ar-EG-SalmaNeural'
+
+    # Detailed logging for Arabic voice synthesis
+    if language == 'ar':
+        print(f"Attempting to synthesize Arabic speech with voice: {voice_name}")
+
+        # Validate voice name for Arabic
+        valid_arabic_female_voices = [
+            'ar-SA-HalaNeural', 
+            'ar-EG-SalmaNeural', 
+            'ar-SA-HindNeural',  # Adding another female voice for testing
+            'ar-SA-ZariyahNeural'  # Adding another female voice for testing
+        ]
+
+        if voice_name not in valid_arabic_female_voices:
+            print(f"Invalid Arabic female voice: {voice_name}")
+            voice_name = 'ar-EG-SalmaNeural'  # Default to a known female voice
+            print(f"Defaulted to: {voice_name}")
+
+    return voice_name
+
+async def generate_speech(
+    text: str,
+    language: str,
+    accent: str,
+    voice_name: str,
+    audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT
+) -> bytes:
     """
     Generate speech from text using Azure Text-to-Speech
 
@@ -1508,101 +1661,24 @@ async def generate_speech(text: str, language: str, accent: str, voice_name: str
         language (str): Language of the text
         accent (str): Accent of the speaker
         voice_name (str): Name of the voice to use for speech synthesis
+        audio_format (AudioFormat): Output codec and container
 
     Returns:
-        str: Path to the generated audio file
+        bytes: Synthesized audio in ``audio_format``
     """
     try:
-        # Import Azure Speech SDK
-        import azure.cognitiveservices.speech as speechsdk
-        import tempfile
-        import os
-
-        # Get Azure Speech configuration
-        speech_key = os.getenv("AZURE_SPEECH_KEY")
-        service_region = os.getenv("AZURE_SPEECH_REGION", "eastus")
-
-        if not speech_key:
-            raise ValueError("Azure Speech API key not found")
-
-        # Configure speech settings
-        speech_config = speechsdk.SpeechConfig(
-            subscription=speech_key,
-            region=service_region
-        )
-        speech_config.speech_synthesis_voice_name = voice_name
-
-        # Ensure a valid voice name for Arabic
-        if language == 'ar':
-            # List of valid Arabic voices
-            valid_arabic_voices = [
-                'ar-EG-SalmaNeural', 'ar-SA-HamedNeural', 
-                'ar-SA-HalaNeural', 'ar-EG-HamedNeural'
-            ]
-            
-            # If the provided voice name is not in the list, default to a valid voice
-            if voice_name not in valid_arabic_voices:
-                voice_name = 'ar-EG-SalmaNeural'
-            
-            speech_config.speech_synthesis_voice_name = voice_name
-
-        # Detailed logging for Arabic voice synthesis
+        voice_name = conversation_voice(language, voice_name)
         if language == 'ar':
-            print(f"Attempting to synthesize Arabic speech with voice: {voice_name}")
             print(f"Text length: {len(text)} characters")
             print(f"Text preview: {text[:100]}...")
 
-            # Validate voice name for Arabic
-            valid_arabic_female_voices = [
-                'ar-SA-HalaNeural', 
-                'ar-EG-SalmaNeural', 
-                'ar-SA-HindNeural',  # Adding another female voice for testing
-                'ar-SA-ZariyahNeural'  # Adding another female voice for testing
-            ]
-
-            if voice_name not in valid_arabic_female_voices:
-                print(f"Invalid Arabic female voice: {voice_name}")
-                voice_name = 'ar-EG-SalmaNeural'  # Default to a known female voice
-                print(f"Defaulted to: {voice_name}")
-
-            speech_config.speech_synthesis_voice_name = voice_name
-
-            # Additional error handling
-            try:
-                # Validate Azure configuration
-                if not speech_key or not service_region:
-                    raise ValueError("Azure Speech configuration is incomplete")
-            except Exception as config_error:
-                print(f"Azure Speech configuration error: {config_error}")
-                raise
-
-        # Create a temporary file for audio output
-        temp_dir = tempfile.gettempdir()
-        output_filename = f"speech_{os.getpid()}_{hash(text)}.wav"
-        output_path = os.path.join(temp_dir, output_filename)
-
-        # Configure audio output
-        audio_config = speechsdk.audio.AudioOutputConfig(filename=output_path)
-
-        # Create speech synthesizer
-        synthesizer = speechsdk.SpeechSynthesizer(
-            speech_config=speech_config,
-            audio_config=audio_config
-        )
-
-        # Synthesize speech
-        result = synthesizer.speak_text_async(text).get()
-
-        # Check synthesis result
-        if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+        async def synthesize() -> bytes:
+            audio_data = await get_speech_backend().synthesize(text, voice_name, audio_format)
             print(f"Speech synthesized for text: [{text}]")
-            return output_path
-        elif result.reason == speechsdk.ResultReason.Canceled:
-            cancellation_details = result.cancellation_details
-            print(f"Speech synthesis canceled: {cancellation_details.reason}")
-            if cancellation_details.reason == speechsdk.CancellationReason.Error:
-                print(f"Error details: {cancellation_details.error_details}")
-            raise Exception("Speech synthesis failed")
+            return audio_data
+
+        # Keyed on the final voice, after the Arabic fallbacks
+        return await cached_synthesis(text, voice_name, audio_format, synthesize)
 
     except Exception as e:
         print(f"Error in generate_speech: {e}")
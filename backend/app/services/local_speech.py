@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import ffmpeg
+import numpy as np
+
+from app.services.audio_buffer import AudioBuffer
+from app.services.audio_conditioning import SPEECH_SAMPLE_RATE, encode_wav
+from app.services.audio_formats import AudioFormat
+from app.services.recognition import DEADLINE, END_OF_STREAM, Transcript
+from app.services.speech_backend import (
+    LANGUAGE_CONFIDENCE, NO_MATCH, RECOGNIZED, Audio, AssessmentResult, AudioFeed, LanguageIdentification,
+    RecognitionResult, SpeechBackend, SynthesisError
+)
+from app.services.speech_gateway import (
+    ASSESSMENT, CLEANUP_TIMEOUT_SECONDS, RECOGNITION, SYNTHESIS, SpeechGateway, speech_gateway
+)
+from app.services.speech_pool import SINGLE_SHOT_PROFILE, RecognitionProfile
+
+# Transcripts the stand-in "recognizes", per language; override with SPEECH_LOCAL_TRANSCRIPTS
+DEFAULT_TRANSCRIPTS = {
+    "en": [
+        "Hello, how are you today?",
+        "I would like to practice my pronunciation.",
+        "Yesterday I went to the market with my friends.",
+        "Can you tell me more about that?",
+    ],
+    "fr": ["Bonjour, comment allez-vous aujourd'hui ?", "J'aimerais pratiquer ma prononciation."],
+    "es": ["Hola, ¿cómo estás hoy?", "Me gustaría practicar mi pronunciación."],
+    "it": ["Ciao, come stai oggi?"],
+    "pt": ["Olá, como você está hoje?"],
+    "ar": ["مرحبا، كيف حالك اليوم؟"],
+    "zh": ["你好，你今天好吗？"],
+}
+
+# Below this RMS level (int16 units) a clip counts as silence
+SILENCE_RMS = 50.0
+TONE_SECONDS_PER_CHAR = 0.06
+
+
+@dataclass(frozen=True)
+class LatencyDistribution:
+    """Simulated service time, parsed from specs such as "fixed:120",
+    "uniform:80,200" or "lognormal:250,0.3" (median ms, sigma)"""
+    kind: str
+    a: float
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> 'LatencyDistribution':
+        kind, _, values = spec.partition(":")
+        numbers = [float(value) for value in values.split(",") if value.strip()]
+        if kind not in ("fixed", "uniform", "lognormal") or not numbers:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+        return cls(kind, numbers[0], numbers[1] if len(numbers) > 1 else 0.0)
+
+    def sample(self, rng: random.Random) -> float:
+        """Seconds"""
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b) / 1000
+        if self.kind == "lognormal":
+            return self.a * math.exp(rng.gauss(0.0, self.b)) / 1000
+        return self.a / 1000
+
+
+def _latency(operation: str, default: str) -> LatencyDistribution:
+    return LatencyDistribution.parse(os.getenv(f"SPEECH_LOCAL_LATENCY_{operation.upper()}", default))
+
+
+def _load_transcripts() -> Dict[str, List[str]]:
+    path = os.getenv("SPEECH_LOCAL_TRANSCRIPTS")
+    if not path:
+        return DEFAULT_TRANSCRIPTS
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def tone(duration: float, sample_rate: int, frequency: float = 440.0) -> np.ndarray:
+    """A faded sine tone as int16 samples"""
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    envelope = np.minimum(1.0, np.minimum(t, duration - t) / 0.02)
+    return (0.3 * 32767 * envelope * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+
+
+def encode_tone(samples: np.ndarray, sample_rate: int, audio_format: AudioFormat) -> bytes:
+    if audio_format.extension == "pcm":
+        return samples.tobytes()
+    if audio_format.extension == "wav":
+        return encode_wav(samples, sample_rate)
+    container = {"mp3": "mp3", "ogg": "ogg", "webm": "webm"}[audio_format.extension]
+    codec = "libmp3lame" if container == "mp3" else "libopus"
+    output, _ = (
+        ffmpeg
+        .input('pipe:0', format='s16le', ar=sample_rate, ac=1)
+        .output('pipe:1', format=container, acodec=codec)
+        .run(input=samples.tobytes(), capture_stdout=True, capture_stderr=True, quiet=True)
+    )
+    return output
+
+
+class LocalSpeechBackend(SpeechBackend):
+    """Deterministic in-process stand-in for Azure, for load tests and benchmarks
+
+    Every call sleeps for a latency drawn from a configurable distribution
+    (SPEECH_LOCAL_LATENCY_SYNTHESIS / _RECOGNITION / _ASSESSMENT) on a gateway
+    worker, exactly where an Azure call would block, so gateway limits, pools
+    and pipelines behave as in production. Recognition returns canned
+    transcripts, assessments return scores derived from the reference text, and
+    synthesis returns a tone whose length follows the text.
+
+    Results and latencies are seeded from SPEECH_LOCAL_SEED and the input, so a
+    run can be repeated exactly.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        gateway: SpeechGateway = speech_gateway,
+        seed: Optional[str] = None,
+        transcripts: Optional[Dict[str, List[str]]] = None
+    ):
+        self.gateway = gateway
+        self.seed = seed if seed is not None else os.getenv("SPEECH_LOCAL_SEED", "0")
+        self.transcripts = transcripts or _load_transcripts()
+        self.latency = {
+            SYNTHESIS: _latency(SYNTHESIS, "lognormal:250,0.3"),
+            RECOGNITION: _latency(RECOGNITION, "lognormal:400,0.3"),
+            ASSESSMENT: _latency(ASSESSMENT, "lognormal:500,0.3"),
+        }
+        self.frequency = float(os.getenv("SPEECH_LOCAL_TONE_HZ", "440"))
+        self._counters = {SYNTHESIS: 0, RECOGNITION: 0, ASSESSMENT: 0}
+
+    def _rng(self, *parts: Any) -> random.Random:
+        key = ":".join(str(part) for part in (self.seed,) + parts)
+        return random.Random(hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def _transcript(self, language: str, rng: random.Random) -> str:
+        options = self.transcripts.get(language.split("-")[0]) or self.transcripts.get("en") or ["hello"]
+        return rng.choice(options)
+
+    @staticmethod
+    def _fingerprint(audio: AudioBuffer) -> str:
+        return hashlib.sha1(audio.to_pcm16_bytes()).hexdigest()
+
+    async def synthesize(
+        self,
+        text: str,
+        voice_name: str,
+        audio_format: AudioFormat,
+        ssml: bool = False,
+        on_chunk: Optional[Callable[[bytes], None]] = None
+    ) -> bytes:
+        # Size the tone by the spoken words, not the markup around them
+        spoken = re.sub(r"<[^>]+>", " ", text) if ssml else text
+        if not spoken.strip():
+            raise SynthesisError("Speech synthesis failed: empty text")
+        self._counters[SYNTHESIS] += 1
+        rng = self._rng(SYNTHESIS, voice_name, text)
+
+        def speak() -> bytes:
+            time.sleep(self.latency[SYNTHESIS].sample(rng))
+            sample_rate = SPEECH_SAMPLE_RATE if audio_format.name in ("wav", "pcm-16k") else 24000
+            duration = min(20.0, max(0.3, len(spoken.strip()) * TONE_SECONDS_PER_CHAR))
+            audio_data = encode_tone(tone(duration, sample_rate, self.frequency), sample_rate, audio_format)
+            if on_chunk:
+                on_chunk(audio_data)
+            return audio_data
+
+        return await self.gateway.run(SYNTHESIS, speak)
+
+    async def recognize(
+        self,
+        audio: Audio,
+        language: str,
+        profile: RecognitionProfile = SINGLE_SHOT_PROFILE,
+        timeout: Optional[float] = None
+    ) -> RecognitionResult:
+        self._counters[RECOGNITION] += 1
+        audio = AudioBuffer.coerce(audio).for_recognition()
+        rng = self._rng(RECOGNITION, language, self._fingerprint(audio))
+
+        def recognize() -> RecognitionResult:
+            started = time.monotonic()
+            time.sleep(self.latency[RECOGNITION].sample(rng))
+            elapsed = time.monotonic() - started
+            if audio.rms() < SILENCE_RMS:
+                return RecognitionResult("", NO_MATCH, "NoMatchReason.InitialSilenceTimeout", elapsed=elapsed)
+            return RecognitionResult(
+                self._transcript(language, rng), RECOGNIZED, confidence=round(rng.uniform(0.7, 0.98), 3), elapsed=elapsed
+            )
+
+        return await self.gateway.run(RECOGNITION, recognize, timeout=timeout or profile.deadline)
+
+    async def recognize_continuous(
+        self,
+        language: str,
+        profile: RecognitionProfile,
+        audio: Optional[Audio] = None,
+        feed: Optional[AudioFeed] = None,
+        timeout: Optional[float] = None,
+        on_event: Optional[Callable[[str, str], None]] = None
+    ) -> Transcript:
+        self._counters[RECOGNITION] += 1
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        received = bytearray(AudioBuffer.coerce(audio).for_recognition().to_pcm16_bytes() if audio is not None else b"")
+        rng = self._rng(RECOGNITION, language, hashlib.sha1(bytes(received)).hexdigest() if audio is not None else "stream")
+        words = self._transcript(language, rng).split()
+        shown = 0
+
+        def emit(name: str, text: str):
+            if on_event:
+                on_event(name, text)
+
+        def write(block: bytes):
+            # One more word of the hypothesis per half second of audio, like interim results
+            nonlocal shown
+            received.extend(block)
+            heard = min(len(words), int(len(received) / (SPEECH_SAMPLE_RATE * 2 * 0.5)))
+            if heard > shown:
+                shown = heard
+                emit("recognizing", " ".join(words[:shown]))
+
+        complete = False
+        async with self.gateway.session(RECOGNITION, timeout or profile.deadline) as speech_call:
+            await speech_call.call(time.sleep, 0)
+            try:
+                if feed is not None:
+                    await asyncio.wait_for(feed(write), speech_call.remaining())
+                # Finalizing the last segment once the input has ended
+                await asyncio.wait_for(
+                    asyncio.sleep(self.latency[RECOGNITION].sample(rng)), speech_call.remaining()
+                )
+                complete = True
+            except asyncio.TimeoutError:
+                print(f"Recognition hit its deadline ({profile.name}), returning partial text")
+            finally:
+                await speech_call.call(time.sleep, 0, timeout=CLEANUP_TIMEOUT_SECONDS)
+
+        elapsed = loop.time() - started_at
+        silent = AudioBuffer.from_pcm16(bytes(received)).rms() < SILENCE_RMS if received else True
+        if not complete:
+            text = " ".join(words[:shown])
+            return Transcript(text, False, DEADLINE, [text] if text else [], elapsed=elapsed)
+        if silent:
+            return Transcript("", True, END_OF_STREAM, elapsed=elapsed)
+        text = " ".join(words)
+        emit("recognized", text)
+        return Transcript(text, True, END_OF_STREAM, [text], elapsed=elapsed)
+
+    async def identify_language(
+        self,
+        audio: Audio,
+        candidates: List[str],
+        profile: RecognitionProfile = SINGLE_SHOT_PROFILE,
+        timeout: Optional[float] = None
+    ) -> LanguageIdentification:
+        self._counters[RECOGNITION] += 1
+        audio = AudioBuffer.coerce(audio).for_recognition()
+        rng = self._rng(RECOGNITION, ",".join(candidates), self._fingerprint(audio))
+
+        def identify() -> LanguageIdentification:
+            started = time.monotonic()
+            time.sleep(self.latency[RECOGNITION].sample(rng))
+            elapsed = time.monotonic() - started
+            if audio.rms() < SILENCE_RMS or not candidates:
+                return LanguageIdentification("", NO_MATCH, "NoMatchReason.InitialSilenceTimeout", elapsed=elapsed)
+            language = rng.choice(candidates)
+            return LanguageIdentification(
+                self._transcript(language, rng),
+                RECOGNIZED,
+                confidence=round(rng.uniform(0.7, 0.98), 3),
+                elapsed=elapsed,
+                language=language,
+                language_confidence=LANGUAGE_CONFIDENCE[rng.choice(list(LANGUAGE_CONFIDENCE))]
+            )
+
+        return await self.gateway.run(RECOGNITION, identify, timeout=timeout or profile.deadline)
+
+    async def assess_pronunciation(
+        self,
+        audio: Audio,
+        reference_text: str,
+        language: str,
+        granularity: str = "Phoneme",
+        enable_miscue: bool = False,
+        timeout: Optional[float] = None
+    ) -> AssessmentResult:
+        self._counters[ASSESSMENT] += 1
+        audio = AudioBuffer.coerce(audio).for_recognition()
+        rng = self._rng(ASSESSMENT, language, reference_text, self._fingerprint(audio))
+
+        def assess() -> AssessmentResult:
+            started = time.monotonic()
+            time.sleep(self.latency[ASSESSMENT].sample(rng))
+            elapsed = time.monotonic() - started
+            if audio.rms() < SILENCE_RMS:
+                return AssessmentResult("", NO_MATCH, "NoMatchReason.InitialSilenceTimeout", elapsed=elapsed)
+
+            words = []
+            for word in reference_text.split():
+                accuracy = round(rng.uniform(55, 100), 1)
+                entry = {
+                    "Word": word.strip(".,!?;:"),
+                    "PronunciationAssessment": {
+                        "AccuracyScore": accuracy,
+                        "ErrorType": "Mispronunciation" if accuracy < 60 else "None"
+                    },
+                    "Syllables": [],
+                    "Phonemes": []
+                }
+                if granularity == "Phoneme":
+                    entry["Phonemes"] = [
+                        {"Phoneme": letter, "PronunciationAssessment": {"AccuracyScore": round(rng.uniform(50, 100), 1)}}
+                        for letter in entry["Word"].lower() if letter.isalpha()
+                    ]
+                words.append(entry)
+
+            accuracy = round(sum(w["PronunciationAssessment"]["AccuracyScore"] for w in words) / len(words), 1) if words else 0.0
+            fluency = round(rng.uniform(60, 100), 1)
+            scores = {
+                "AccuracyScore": accuracy,
+                "FluencyScore": fluency,
+                "CompletenessScore": 100.0,
+                "PronScore": round(0.6 * accuracy + 0.2 * fluency + 0.2 * 100.0, 1)
+            }
+            return AssessmentResult(reference_text, RECOGNIZED, scores=scores, words=words, elapsed=elapsed)
+
+        return await self.gateway.run(ASSESSMENT, assess, timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "calls": dict(self._counters),
+            "latency": {operation: f"{d.kind}:{d.a},{d.b}" for operation, d in self.latency.items()}
+        }
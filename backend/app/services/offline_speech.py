@@ -0,0 +1,284 @@
+import asyncio
+import importlib.util
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.audio_buffer import AudioBuffer
+from app.services.audio_formats import AudioFormat
+from app.services.audio_conditioning import SPEECH_SAMPLE_RATE
+from app.services.recognition import CANCELED as RECOGNITION_CANCELED, DEADLINE, END_OF_STREAM, Transcript
+from app.services.speech_backend import (
+    CANCELED, NO_MATCH, RECOGNIZED, Audio, AssessmentResult, AudioFeed, LanguageIdentification,
+    RecognitionResult, SpeechBackend, SpeechBackendError
+)
+from app.services.speech_gateway import SpeechGatewayError
+from app.services.speech_pool import SINGLE_SHOT_PROFILE, RecognitionProfile
+
+# Vosk model directories per language, e.g. "en=/models/vosk-model-small-en-us-0.15,fr=/models/vosk-model-small-fr-0.22"
+SPEECH_OFFLINE_MODELS = os.getenv("SPEECH_OFFLINE_MODELS", "")
+# Recognition profiles tried offline first; everything else goes straight to the fallback
+SPEECH_OFFLINE_PROFILES = os.getenv("SPEECH_OFFLINE_PROFILES", "word,sentence")
+# Mean word confidence below which the fallback backend is asked instead
+SPEECH_OFFLINE_MIN_CONFIDENCE = float(os.getenv("SPEECH_OFFLINE_MIN_CONFIDENCE", "0.8"))
+SPEECH_OFFLINE_WORKERS = int(os.getenv("SPEECH_OFFLINE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def parse_model_paths(spec: str) -> Dict[str, str]:
+    """{"en": "/models/en", ...} from "en=/models/en,fr=/models/fr" """
+    paths = {}
+    for entry in spec.split(","):
+        language, _, path = entry.partition("=")
+        if language.strip() and path.strip():
+            paths[language.strip()] = path.strip()
+    return paths
+
+
+def vosk_available() -> bool:
+    return importlib.util.find_spec("vosk") is not None
+
+
+class OfflineSpeechBackend(SpeechBackend):
+    """Recognizes short utterances on the CPU with Vosk, falling back to another backend
+
+    Word practice and short answers are recognized by a small local model with
+    no network round trip. A result below SPEECH_OFFLINE_MIN_CONFIDENCE, a
+    language without a model or a profile not in SPEECH_OFFLINE_PROFILES goes to
+    the fallback backend (normally Azure). When the fallback fails, e.g. during
+    an outage, a local result that has text is returned anyway.
+
+    Synthesis, pronunciation assessment and language identification always
+    use the fallback.
+    """
+
+    name = "offline"
+
+    def __init__(
+        self,
+        fallback: SpeechBackend,
+        model_paths: Optional[Dict[str, str]] = None,
+        profiles: Optional[str] = None,
+        min_confidence: float = SPEECH_OFFLINE_MIN_CONFIDENCE,
+        workers: int = SPEECH_OFFLINE_WORKERS
+    ):
+        self.fallback = fallback
+        self.model_paths = model_paths if model_paths is not None else parse_model_paths(SPEECH_OFFLINE_MODELS)
+        self.profiles = {name.strip() for name in (profiles or SPEECH_OFFLINE_PROFILES).split(",") if name.strip()}
+        self.min_confidence = min_confidence
+        self.workers = workers
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._counters = {"offline": 0, "fallback_confidence": 0, "fallback_unsupported": 0, "fallback_failed": 0, "errors": 0}
+        self._decoded = 0
+        self._decode_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Separate from the speech gateway so local decoding never holds an Azure slot
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="offline-speech")
+        return self._executor
+
+    def _model_path(self, language: str) -> Optional[str]:
+        return self.model_paths.get(language) or self.model_paths.get(language.split("-")[0])
+
+    def _model(self, language: str):
+        path = self._model_path(language)
+        with self._lock:
+            if path not in self._models:
+                from vosk import Model, SetLogLevel
+                SetLogLevel(-1)
+                started = time.monotonic()
+                self._models[path] = Model(path)
+                print(f"Loaded offline speech model {path} in {time.monotonic() - started:.1f}s")
+            return self._models[path]
+
+    def load_models(self):
+        """Load every configured model up front so the first request does not pay for it"""
+        for language in self.model_paths:
+            try:
+                self._model(language)
+            except Exception as e:
+                print(f"Could not load offline speech model for {language}: {str(e)}")
+
+    def _handles(self, language: str, profile: RecognitionProfile) -> bool:
+        return profile.name in self.profiles and self._model_path(language) is not None
+
+    def _decode(self, pcm: bytes, language: str) -> RecognitionResult:
+        """Runs on the offline executor"""
+        from vosk import KaldiRecognizer
+
+        started = time.monotonic()
+        recognizer = KaldiRecognizer(self._model(language), SPEECH_SAMPLE_RATE)
+        recognizer.SetWords(True)
+        recognizer.AcceptWaveform(pcm)
+        result = json.loads(recognizer.FinalResult())
+        elapsed = time.monotonic() - started
+
+        text = result.get("text", "").strip()
+        words = result.get("result", [])
+        if not text:
+            return RecognitionResult("", NO_MATCH, "No speech recognized offline", confidence=0.0, elapsed=elapsed)
+        confidence = sum(word.get("conf", 0.0) for word in words) / len(words) if words else 0.0
+        return RecognitionResult(text, RECOGNIZED, confidence=round(confidence, 3), elapsed=elapsed)
+
+    async def _recognize_offline(self, audio: Audio, language: str, timeout: float) -> Optional[RecognitionResult]:
+        """Local result, or None when local decoding failed"""
+        pcm = AudioBuffer.coerce(audio).for_recognition().to_pcm16_bytes()
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(self._get_executor(), self._decode, pcm, language), timeout
+            )
+        except Exception as e:
+            self._counters["errors"] += 1
+            print(f"Offline recognition failed for {language}: {str(e)}")
+            return None
+        self._decoded += 1
+        self._decode_seconds += result.elapsed
+        return result
+
+    def _confident(self, result: Optional[RecognitionResult]) -> bool:
+        if result is not None and result.recognized and result.confidence >= self.min_confidence:
+            self._counters["offline"] += 1
+            return True
+        self._counters["fallback_confidence"] += 1
+        return False
+
+    async def recognize(
+        self,
+        audio: Audio,
+        language: str,
+        profile: RecognitionProfile = SINGLE_SHOT_PROFILE,
+        timeout: Optional[float] = None
+    ) -> RecognitionResult:
+        if not self._handles(language, profile):
+            self._counters["fallback_unsupported"] += 1
+            return await self.fallback.recognize(audio, language, profile, timeout)
+
+        local = await self._recognize_offline(audio, language, timeout or profile.deadline)
+        if self._confident(local):
+            return local
+
+        try:
+            result = await self.fallback.recognize(audio, language, profile, timeout)
+        except (SpeechGatewayError, SpeechBackendError, asyncio.TimeoutError):
+            if local is None or not local.recognized:
+                raise
+            result = RecognitionResult("", CANCELED, "Fallback recognition failed")
+        if result.status == CANCELED and local is not None and local.recognized:
+            # Keep answering through an outage of the fallback service
+            self._counters["fallback_failed"] += 1
+            return local
+        return result
+
+    async def recognize_locally(
+        self,
+        audio: Audio,
+        language: str,
+        profile: RecognitionProfile = SINGLE_SHOT_PROFILE
+    ) -> Optional[RecognitionResult]:
+        if not self._handles(language, profile):
+            return None
+        local = await self._recognize_offline(audio, language, profile.deadline)
+        return local if self._confident(local) else None
+
+    async def recognize_continuous(
+        self,
+        language: str,
+        profile: RecognitionProfile,
+        audio: Optional[Audio] = None,
+        feed: Optional[AudioFeed] = None,
+        timeout: Optional[float] = None,
+        on_event: Optional[Callable[[str, str], None]] = None
+    ) -> Transcript:
+        if not self._handles(language, profile):
+            self._counters["fallback_unsupported"] += 1
+            return await self.fallback.recognize_continuous(language, profile, audio, feed, timeout, on_event)
+
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        deadline = timeout or profile.deadline
+
+        # Short utterances are decoded in one pass once the input has ended
+        if feed is not None:
+            received = bytearray(AudioBuffer.coerce(audio).for_recognition().to_pcm16_bytes() if audio is not None else b"")
+            try:
+                await asyncio.wait_for(feed(received.extend), deadline)
+            except asyncio.TimeoutError:
+                print(f"Recognition hit its deadline ({profile.name}) before the input ended")
+                return Transcript("", False, DEADLINE, elapsed=loop.time() - started_at)
+            audio = bytes(received)
+        if audio is None:
+            return Transcript("", True, END_OF_STREAM)
+
+        remaining = max(0.1, deadline - (loop.time() - started_at))
+        local = await self._recognize_offline(audio, language, remaining)
+        if self._confident(local):
+            if on_event:
+                on_event("recognized", local.text)
+            return Transcript(local.text, True, END_OF_STREAM, [local.text], elapsed=loop.time() - started_at)
+
+        remaining = max(0.1, deadline - (loop.time() - started_at))
+        try:
+            transcript = await self.fallback.recognize_continuous(
+                language, profile, audio=audio, timeout=remaining, on_event=on_event
+            )
+        except (SpeechGatewayError, SpeechBackendError, asyncio.TimeoutError) as e:
+            if local is None or not local.recognized:
+                raise
+            transcript = Transcript("", False, RECOGNITION_CANCELED, error=str(e) or "Fallback recognition failed")
+        if transcript.error and local is not None and local.recognized:
+            # Keep answering through an outage of the fallback service
+            self._counters["fallback_failed"] += 1
+            if on_event:
+                on_event("recognized", local.text)
+            return Transcript(local.text, True, END_OF_STREAM, [local.text], elapsed=loop.time() - started_at)
+        return transcript
+
+    async def identify_language(
+        self,
+        audio: Audio,
+        candidates: List[str],
+        profile: RecognitionProfile = SINGLE_SHOT_PROFILE,
+        timeout: Optional[float] = None
+    ) -> LanguageIdentification:
+        return await self.fallback.identify_language(audio, candidates, profile, timeout)
+
+    async def synthesize(
+        self,
+        text: str,
+        voice_name: str,
+        audio_format: AudioFormat,
+        ssml: bool = False,
+        on_chunk: Optional[Callable[[bytes], None]] = None
+    ) -> bytes:
+        return await self.fallback.synthesize(text, voice_name, audio_format, ssml, on_chunk)
+
+    async def assess_pronunciation(
+        self,
+        audio: Audio,
+        reference_text: str,
+        language: str,
+        granularity: str = "Phoneme",
+        enable_miscue: bool = False,
+        timeout: Optional[float] = None
+    ) -> AssessmentResult:
+        return await self.fallback.assess_pronunciation(
+            audio, reference_text, language, granularity, enable_miscue, timeout
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "models": sorted(self.model_paths),
+            "loaded": len(self._models),
+            "profiles": sorted(self.profiles),
+            "min_confidence": self.min_confidence,
+            **self._counters,
+            "avg_decode_ms": round(self._decode_seconds / self._decoded * 1000, 2) if self._decoded else 0.0,
+            "fallback": self.fallback.stats()
+        }
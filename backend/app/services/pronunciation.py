@@ -1,17 +1,25 @@
-import azure.cognitiveservices.speech as speechsdk
 import os
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 from dotenv import load_dotenv
-import tempfile
 import json
 import traceback
 from openai import OpenAI
 import asyncio
 import string
+import time
+from app.services.audio_buffer import AudioBuffer
+from app.services.speech_backend import CANCELED, NO_MATCH, RECOGNIZED, get_speech_backend
+from app.services.speech_pool import SINGLE_SHOT_PROFILE, WORD_PROFILE
 
 # Load environment variables
 load_dotenv()
 
+# Take the recognized text from the assessment instead of a separate recognition pass
+PRONUNCIATION_SINGLE_PASS = os.getenv("PRONUNCIATION_SINGLE_PASS", "true").lower() == "true"
+# Largest batch accepted by analyze_pronunciation_batch, and its assessments in flight at once
+PRONUNCIATION_BATCH_MAX_ITEMS = int(os.getenv("PRONUNCIATION_BATCH_MAX_ITEMS", "20"))
+PRONUNCIATION_BATCH_CONCURRENCY = int(os.getenv("PRONUNCIATION_BATCH_CONCURRENCY", "4"))
+
 # Define phoneme guidance
 PHONEME_GUIDE = {
     # English phonemes
@@ -97,29 +105,11 @@ def get_full_language_name(language_code):
     # Return full language name or default to the input code
     return language_mapping.get(language_code, language_code)
 
-def get_speech_config():
-    """Get Azure speech config with API key and region"""
-    try:
-        speech_key = os.getenv("AZURE_SPEECH_KEY")
-        service_region = os.getenv("AZURE_SPEECH_REGION", "eastus")
-        
-        if not speech_key:
-            raise ValueError("Azure Speech API key not found")
-            
-        speech_config = speechsdk.SpeechConfig(
-            subscription=speech_key,
-            region=service_region
-        )
-        return speech_config
-    except Exception as e:
-        print(f"Error getting speech config: {str(e)}")
-        raise Exception(f"Speech service configuration error: {str(e)}")
-
-async def analyze_pronunciation(audio_data: bytes, reference_text: str, language: str = "en-US", is_word_practice: str = "false") -> Optional[Dict]:
+async def analyze_pronunciation(audio_data: Union[bytes, AudioBuffer], reference_text: str, language: str = "en-US", is_word_practice: str = "false") -> Optional[Dict]:
     """Analyze pronunciation using Azure Speech SDK with a reference text
     
     Args:
-        audio_data (bytes): Audio data to analyze
+        audio_data (bytes | AudioBuffer): Audio data to analyze
         reference_text (str): Reference text to compare against
         language (str): Language code (default: "en-US")
         is_word_practice (str): String "true" or "false" indicating if this is word practice mode
@@ -133,39 +123,33 @@ async def analyze_pronunciation(audio_data: bytes, reference_text: str, language
         print(f"  Reference Text: {reference_text}")
         print(f"  Mode: {'Word Practice' if is_word_practice else 'Sentence Analysis'}")
 
-        # Create temporary WAV file for pronunciation assessment
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-            temp_file.write(audio_data)
-            temp_file_path = temp_file.name
-
-        speech_config = get_speech_config()
-        if not speech_config:
-            print("  Failed to get speech configuration")
-            return {"error": "Failed to get speech configuration"}
+        # Decode once; each recognizer gets its own in-memory stream over the same samples
+        audio = AudioBuffer.coerce(audio_data)
 
-        # First, do speech recognition to get what was actually said
-        audio_config = speechsdk.audio.AudioConfig(filename=temp_file_path)
-        speech_recognizer = speechsdk.SpeechRecognizer(
-            speech_config=speech_config,
-            audio_config=audio_config,
-            language=language
-        )
-        
-        recognition_result = speech_recognizer.recognize_once_async().get()
+        backend = get_speech_backend()
+        assessment = None
+        # A practice word recognized offline is checked before any paid round trip
+        local_result = await backend.recognize_locally(audio, language, WORD_PROFILE) if is_word_practice else None
+        if local_result is not None:
+            recognition_result = local_result
+        elif PRONUNCIATION_SINGLE_PASS:
+            # One round trip: with miscue detection the assessment also reports what was actually said
+            assessment = await backend.assess_pronunciation(
+                audio, reference_text, language, granularity="Phoneme", enable_miscue=True
+            )
+            recognition_result = assessment
+        else:
+            # Recognize first so a wrong practice word is rejected before the assessment;
+            # a single word can then be recognized offline, see app.services.offline_speech
+            profile = WORD_PROFILE if is_word_practice else SINGLE_SHOT_PROFILE
+            recognition_result = await backend.recognize(audio, language, profile)
         
-        if recognition_result.reason == speechsdk.ResultReason.NoMatch:
-            try:
-                error_details = recognition_result.no_match_details
-                error_message = f"No speech could be recognized: {error_details.reason if error_details else 'Unknown reason'}"
-            except Exception as e:
-                error_message = "No speech could be recognized. Please try speaking more clearly."
+        if recognition_result.status == NO_MATCH:
+            error_message = f"No speech could be recognized: {recognition_result.detail or 'Unknown reason'}"
             print(f"  {error_message}")
             return {"error": error_message}
-        elif recognition_result.reason == speechsdk.ResultReason.Canceled:
-            cancellation_details = speechsdk.CancellationDetails(recognition_result)
-            error_message = f"Speech recognition canceled: {cancellation_details.reason}"
-            if cancellation_details.reason == speechsdk.CancellationReason.Error:
-                error_message += f"\nError details: {cancellation_details.error_details}"
+        elif recognition_result.status == CANCELED:
+            error_message = f"Speech recognition canceled: {recognition_result.detail}"
             print(f"  {error_message}")
             return {"error": error_message}
 
@@ -197,63 +181,47 @@ async def analyze_pronunciation(audio_data: bytes, reference_text: str, language
                     "error": f"Incorrect word. You said '{actual_text}' but should have said '{reference_text}'. Please try again."
                 }
 
-        # Create pronunciation assessment configuration
-        pronunciation_config = speechsdk.PronunciationAssessmentConfig(
-            reference_text=reference_text,
-            grading_system=speechsdk.PronunciationAssessmentGradingSystem.HundredMark,
-            granularity=speechsdk.PronunciationAssessmentGranularity.Phoneme,
-            enable_miscue=True
-        )
-
-        # Create new audio config and recognizer for pronunciation assessment
-        audio_config = speechsdk.audio.AudioConfig(filename=temp_file_path)
-        speech_recognizer = speechsdk.SpeechRecognizer(
-            speech_config=speech_config,
-            audio_config=audio_config,
-            language=language
-        )
-        
-        pronunciation_config.apply_to(speech_recognizer)
-        result = speech_recognizer.recognize_once_async().get()
-        
-        # Clean up temp file
-        os.unlink(temp_file_path)
+        if assessment is None:
+            # Score the same samples against the reference text
+            assessment = await backend.assess_pronunciation(
+                audio, reference_text, language, granularity="Phoneme", enable_miscue=True
+            )
 
-        if result.reason == speechsdk.ResultReason.NoMatch:
-            try:
-                error_details = result.no_match_details
-                error_message = f"Pronunciation assessment failed: {error_details.reason if error_details else 'Unknown reason'}"
-            except Exception as e:
-                error_message = "Pronunciation assessment failed. Please try speaking more clearly."
-            print(f"  {error_message}")
-            return {"error": error_message}
+            if not assessment.recognized:
+                error_message = f"Pronunciation assessment failed: {assessment.detail or 'Unknown reason'}"
+                print(f"  {error_message}")
+                return {"error": error_message}
             
-        pronunciation_result = speechsdk.PronunciationAssessmentResult(result)
+        pronunciation_score = assessment.scores.get('PronScore', 0)
+        fluency_score = assessment.scores.get('FluencyScore', 0)
         
         # Process word-level results
         poor_words = []
         print("\nPronunciation Assessment:")
-        for word in pronunciation_result.words:
-            print(f"  Word: {word.word}")
-            print(f"    Accuracy Score: {word.accuracy_score}")
-            print(f"    Error Type: {word.error_type}")
+        for word in assessment.words:
+            word_assessment = word.get('PronunciationAssessment', {})
+            accuracy_score = word_assessment.get('AccuracyScore', 0)
+            error_type = word_assessment.get('ErrorType', 'None')
+            print(f"  Word: {word.get('Word', '')}")
+            print(f"    Accuracy Score: {accuracy_score}")
+            print(f"    Error Type: {error_type}")
             
-            if word.accuracy_score < 80:  # Only include words that need improvement
+            if accuracy_score < 80:  # Only include words that need improvement
                 poor_words.append({
-                    "word": word.word,
-                    "accuracy": word.accuracy_score,
-                    "error_type": word.error_type
+                    "word": word.get('Word', ''),
+                    "accuracy": accuracy_score,
+                    "error_type": error_type
                 })
         
         feedback_messages = []
-        if pronunciation_result.pronunciation_score < 80:
+        if pronunciation_score < 80:
             feedback_messages.append(f"Your pronunciation needs improvement. Try to pronounce '{reference_text}' more clearly.")
         else:
             feedback_messages.append(f"Good job! Your pronunciation of '{reference_text}' is clear.")
 
         return {
-            "pronunciation_score": pronunciation_result.pronunciation_score,
-            "fluency_score": pronunciation_result.fluency_score,
+            "pronunciation_score": pronunciation_score,
+            "fluency_score": fluency_score,
             "feedback_messages": feedback_messages,
             "poor_words": poor_words,
             "transcribed_text": actual_text
@@ -264,6 +232,54 @@ async def analyze_pronunciation(audio_data: bytes, reference_text: str, language
         traceback.print_exc()
         return {"error": f"Failed to analyze pronunciation: {str(e)}"}
 
+async def analyze_pronunciation_batch(
+    items: List[Tuple[Optional[AudioBuffer], str]],
+    language: str = "en-US",
+    is_word_practice: str = "false",
+    concurrency: Optional[int] = None
+) -> Dict:
+    """Analyze several (audio, reference text) pairs concurrently, e.g. a whole game round
+
+    Args:
+        items (list): Decoded audio and its reference text; audio is None when
+            the clip could not be converted or no speech was found for it
+        language (str): Language code (default: "en-US")
+        is_word_practice (str): "true" or "false", as for analyze_pronunciation
+        concurrency (int, optional): Assessments in flight at once for this batch,
+            capped at PRONUNCIATION_BATCH_CONCURRENCY
+
+    Returns:
+        Dict: Per-item results in input order, each with the analyze_pronunciation
+            fields or an error, plus a summary across the batch
+    """
+    started = time.monotonic()
+    limit = min(concurrency or PRONUNCIATION_BATCH_CONCURRENCY, PRONUNCIATION_BATCH_CONCURRENCY)
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def analyze(index: int, audio: Optional[AudioBuffer], reference_text: str) -> Dict:
+        if audio is None:
+            feedback = {"error": "No audio found for this item"}
+        else:
+            async with semaphore:
+                feedback = await analyze_pronunciation(audio, reference_text, language, is_word_practice)
+        return {"index": index, "reference_text": reference_text, **(feedback or {"error": "No speech could be recognized"})}
+
+    results = await asyncio.gather(*(
+        analyze(index, audio, reference_text) for index, (audio, reference_text) in enumerate(items)
+    ))
+
+    assessed = [result for result in results if "error" not in result]
+    summary = {
+        "items": len(results),
+        "assessed": len(assessed),
+        "failed": len(results) - len(assessed),
+        "average_pronunciation_score": round(sum(r["pronunciation_score"] for r in assessed) / len(assessed), 1) if assessed else None,
+        "average_fluency_score": round(sum(r["fluency_score"] for r in assessed) / len(assessed), 1) if assessed else None,
+        "words_to_practice": sorted({word["word"] for r in assessed for word in r["poor_words"]}),
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1)
+    }
+    return {"results": results, "summary": summary}
+
 async def transcribe_audio(audio_data: bytes, language: str = "en-US") -> Dict[str, str]:
     """
     Transcribe audio using Azure Speech to Text
@@ -276,52 +292,19 @@ async def transcribe_audio(audio_data: bytes, language: str = "en-US") -> Dict[s
         Dict[str, str]: Transcription result with text and confidence
     """
     try:
-        speech_config = get_speech_config()
-        if not speech_config:
-            return {"error": "Failed to get speech configuration"}
-
-        # Set recognition language
-        speech_config.speech_recognition_language = language
-        
-        # Create temporary WAV file
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-            temp_file.write(audio_data)
-            temp_file_path = temp_file.name
-
-        # Use file config instead of stream for more reliable recognition
-        audio_config = speechsdk.audio.AudioConfig(filename=temp_file_path)
-
-        # Create speech recognizer with specific configuration
-        speech_recognizer = speechsdk.SpeechRecognizer(
-            speech_config=speech_config,
-            audio_config=audio_config
-        )
-
         # Use single shot recognition for more reliable results with short audio
-        result = speech_recognizer.recognize_once_async().get()
-        
-        # Clean up temp file
-        os.unlink(temp_file_path)
+        result = await get_speech_backend().recognize(audio_data, language)
 
-        if result.reason == speechsdk.ResultReason.RecognizedSpeech:
+        if result.status == RECOGNIZED:
             return {"text": result.text}
-        elif result.reason == speechsdk.ResultReason.NoMatch:
-            try:
-                error_details = result.no_match_details
-                error_message = f"No speech could be recognized: {error_details.reason if error_details else 'Unknown reason'}"
-            except Exception as e:
-                error_message = "No speech could be recognized. Please try speaking more clearly."
+        elif result.status == NO_MATCH:
+            error_message = f"No speech could be recognized: {result.detail or 'Unknown reason'}"
             print(error_message)
             return {"error": error_message}
-        elif result.reason == speechsdk.ResultReason.Canceled:
-            cancellation_details = speechsdk.CancellationDetails(result)
-            error_message = f"Speech recognition canceled: {cancellation_details.reason}"
-            if cancellation_details.reason == speechsdk.CancellationReason.Error:
-                error_message += f"\nError details: {cancellation_details.error_details}"
+        else:
+            error_message = f"Speech recognition canceled: {result.detail}"
             print(error_message)
             return {"error": error_message}
-        else:
-            return {"error": f"Unexpected recognition result: {result.reason}"}
 
     except Exception as e:
         print(f"Error in transcribe_audio: {str(e)}")
@@ -0,0 +1,138 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional
+
+import azure.cognitiveservices.speech as speechsdk
+
+from app.services.speech_gateway import CLEANUP_TIMEOUT_SECONDS, RECOGNITION, speech_gateway
+from app.services.speech_pool import RecognitionProfile
+
+END_OF_STREAM = "end_of_stream"
+DEADLINE = "deadline"
+CANCELED = "canceled"
+
+
+@dataclass
+class Transcript:
+    """Outcome of one continuous recognition
+
+    ``complete`` is False when the deadline hit first; ``text`` then holds the
+    segments recognized so far plus the hypothesis for the one in progress.
+    """
+    text: str
+    complete: bool
+    reason: str
+    segments: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+class ContinuousRecognition:
+    """Collects the events of one continuous recognition on the event loop
+
+    The SDK raises its events on its own threads; every handler hops onto the
+    loop before touching state. Recognition is done when the session stops,
+    which the service signals right after the last segment of a closed push
+    stream is recognized, or when it is canceled.
+
+    ``on_event`` is called on the loop with ("recognizing", hypothesis) and
+    ("recognized", segment) as they arrive.
+    """
+
+    def __init__(
+        self,
+        recognizer: speechsdk.SpeechRecognizer,
+        loop: asyncio.AbstractEventLoop,
+        on_event: Optional[Callable[[str, str], None]] = None
+    ):
+        self.segments: List[str] = []
+        self.hypothesis = ""
+        self.error: Optional[str] = None
+        self.done = asyncio.Event()
+        self._loop = loop
+        self._on_event = on_event
+        recognizer.recognizing.connect(lambda evt: self._on_loop(self._recognizing, evt.result.text))
+        recognizer.recognized.connect(lambda evt: self._on_loop(self._recognized, evt.result.reason, evt.result.text))
+        recognizer.canceled.connect(lambda evt: self._on_loop(self._canceled, evt.cancellation_details))
+        recognizer.session_stopped.connect(lambda evt: self._on_loop(self.done.set))
+
+    def _on_loop(self, callback, *args):
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    def _emit(self, name: str, text: str):
+        if self._on_event:
+            self._on_event(name, text)
+
+    def _recognizing(self, text: str):
+        self.hypothesis = text
+        if text.strip():
+            self._emit("recognizing", text.strip())
+
+    def _recognized(self, reason: speechsdk.ResultReason, text: str):
+        self.hypothesis = ""
+        if reason == speechsdk.ResultReason.RecognizedSpeech and text.strip():
+            self.segments.append(text.strip())
+            self._emit("recognized", text.strip())
+
+    def _canceled(self, details: speechsdk.CancellationDetails):
+        # End of stream is reported as a cancellation too; only errors are failures
+        if details.reason == speechsdk.CancellationReason.Error:
+            self.error = details.error_details or str(details.reason)
+        self.done.set()
+
+    def transcript(self, complete: bool, elapsed: float) -> Transcript:
+        segments = list(self.segments)
+        if not complete and self.hypothesis.strip():
+            segments.append(self.hypothesis.strip())
+        if self.error:
+            reason = CANCELED
+        else:
+            reason = END_OF_STREAM if complete else DEADLINE
+        return Transcript(" ".join(segments), complete and not self.error, reason, segments, self.error, elapsed)
+
+
+async def recognize_continuous(
+    recognizer: speechsdk.SpeechRecognizer,
+    push_stream: speechsdk.audio.PushAudioInputStream,
+    profile: RecognitionProfile,
+    feed: Optional[Callable[[], Awaitable[None]]] = None,
+    timeout: Optional[float] = None,
+    on_event: Optional[Callable[[str, str], None]] = None
+) -> Transcript:
+    """Recognize everything written to ``push_stream``, finishing as soon as it is all recognized
+
+    Args:
+        recognizer (speechsdk.SpeechRecognizer): Recognizer reading from ``push_stream``
+        push_stream (speechsdk.audio.PushAudioInputStream): Its input; closed once
+            ``feed`` returns, or already closed when there is no ``feed``
+        profile (RecognitionProfile): Supplies the default deadline
+        feed (Callable, optional): Writes the audio while recognition runs
+        timeout (float, optional): Deadline in seconds instead of ``profile.deadline``,
+            including the wait for a gateway slot
+        on_event (Callable, optional): Receives partial hypotheses and final
+            segments, see ContinuousRecognition
+
+    Returns:
+        Transcript: Full text, or partial text when the deadline hit
+    """
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    recognition = ContinuousRecognition(recognizer, loop, on_event)
+    complete = False
+
+    async with speech_gateway.session(RECOGNITION, timeout or profile.deadline) as speech_call:
+        await speech_call.call(recognizer.start_continuous_recognition)
+        try:
+            if feed is not None:
+                try:
+                    await asyncio.wait_for(feed(), speech_call.remaining())
+                finally:
+                    push_stream.close()
+            await asyncio.wait_for(recognition.done.wait(), speech_call.remaining())
+            complete = True
+        except asyncio.TimeoutError:
+            print(f"Recognition hit its deadline ({profile.name}), returning partial text")
+        finally:
+            await speech_call.call(recognizer.stop_continuous_recognition, timeout=CLEANUP_TIMEOUT_SECONDS)
+
+    return recognition.transcript(complete, loop.time() - started_at)
@@ -0,0 +1,123 @@
+import re
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+# Line prefixes of each field of a coach reply, in every supported language
+RESPONSE_FIELD_PREFIXES = {
+    "grammar_feedback": ("Grammar:", "Grammaire :", "Gramática:", "القواعد النحوية:", "语法：", "Gramática:", "Grammatica:"),
+    "explanation": ("Explanation:", "Explication :", "Explicación:", "التوضيح:", "解释：", "Explicação:", "Spiegazione:"),
+    "intonation": ("Intonation:", "Intonation :", "Entonación:", "النبرة:", "语调：", "Entonação:", "Intonazione:"),
+    "message": ("Response:", "Réponse :", "Respuesta:", "الرد:", "回复：", "Resposta:", "Risposta:"),
+    "creative_feedback": ("Creative:", "Créatif:", "Creativo:", "الإبداعي:", "创意:", "Criativo:", "Creativo:"),
+}
+
+# A sentence is complete once its closing punctuation is followed by whitespace
+# (CJK full stops need no whitespace)
+_SENTENCE_BREAK = re.compile(r'[.!?…]+["\')\]]*\s+|[。！？]+')
+
+
+def _match_prefix(line: str, prefixes: Tuple[str, ...]) -> Optional[str]:
+    for prefix in prefixes:
+        if line.startswith(prefix):
+            return prefix
+    return None
+
+
+def parse_response_line(line: str) -> Optional[Tuple[str, str]]:
+    """(field, value) for a labelled line of a coach reply, or None"""
+    for field, prefixes in RESPONSE_FIELD_PREFIXES.items():
+        prefix = _match_prefix(line, prefixes)
+        if prefix:
+            value = line[len(prefix):].strip()
+            if field == "grammar_feedback":
+                # Remove square brackets, quotes, and extra whitespace
+                value = value.strip("[]'\"")
+            return field, value
+    return None
+
+
+class ResponseStreamParser:
+    """Turns a coach reply arriving in arbitrary text deltas into events
+
+    Labelled fields are reported as ("field", value) once their line is
+    complete. The ``Response:`` field is also cut into sentences while it is
+    still being written, each reported as ("sentence", text) as soon as it ends.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._line = ""
+        self._response_prefix: Optional[str] = None
+        self._spoken = 0
+
+    def feed(self, delta: str) -> List[Tuple[str, str]]:
+        self.text += delta
+        self._line += delta
+        events: List[Tuple[str, str]] = []
+        while "\n" in self._line:
+            line, self._line = self._line.split("\n", 1)
+            events += self._complete_line(line)
+        events += self._partial_line()
+        return events
+
+    def finish(self) -> List[Tuple[str, str]]:
+        """Flush whatever is left once the model is done"""
+        line, self._line = self._line, ""
+        return self._complete_line(line) if line else []
+
+    def _partial_line(self) -> List[Tuple[str, str]]:
+        if self._response_prefix is None:
+            self._response_prefix = _match_prefix(self._line, RESPONSE_FIELD_PREFIXES["message"])
+            if self._response_prefix is None:
+                return []
+            self._spoken = 0
+
+        return self._take_sentences(self._line[len(self._response_prefix):])
+
+    def _take_sentences(self, value: str) -> List[Tuple[str, str]]:
+        """Sentences of the response value that end after what was already handed out"""
+        events = []
+        for match in _SENTENCE_BREAK.finditer(value, self._spoken):
+            sentence = value[self._spoken:match.end()].strip()
+            self._spoken = match.end()
+            if sentence:
+                events.append(("sentence", sentence))
+        return events
+
+    def _complete_line(self, line: str) -> List[Tuple[str, str]]:
+        events = []
+        parsed = parse_response_line(line)
+        if parsed and parsed[0] == "message":
+            # Speak whatever the sentence splitter has not handed out yet
+            if self._response_prefix is None:
+                self._spoken = 0
+            value = line[len(_match_prefix(line, RESPONSE_FIELD_PREFIXES["message"])):]
+            events += self._take_sentences(value)
+            rest = value[self._spoken:].strip()
+            if rest:
+                events.append(("sentence", rest))
+        self._response_prefix = None
+        self._spoken = 0
+        if parsed:
+            events.append(parsed)
+        return events
+
+
+async def consume_response_stream(stream: AsyncIterator, on_event: Callable[[str, str], None]) -> str:
+    """Read a streamed chat completion, reporting fields and sentences as they complete
+
+    Args:
+        stream: Async iterator of chat completion chunks (``stream=True``)
+        on_event (Callable): Called with ("sentence", text) or (field, value)
+
+    Returns:
+        str: The full reply text
+    """
+    parser = ResponseStreamParser()
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            for name, value in parser.feed(delta):
+                on_event(name, value)
+    for name, value in parser.finish():
+        on_event(name, value)
+    return parser.text
@@ -1,168 +1,243 @@
-import azure.cognitiveservices.speech as speechsdk
 import os
-from typing import Optional
+from typing import AsyncIterator, Callable, Optional
 from dotenv import load_dotenv
 import traceback
 import asyncio
-import tempfile
-import time
+from app.services.audio_buffer import AudioBuffer
+from app.services.audio_conditioning import StreamingConditioner
+from app.services.audio_formats import AudioFormat, DEFAULT_AUDIO_FORMAT
+from app.services.audio_ingest import MAX_AUDIO_SECONDS, MAX_UPLOAD_BYTES, UploadTooLargeError, sniff_input_format
+from app.services.recognition import Transcript
+from app.services.speech_backend import SynthesisError, get_speech_backend
+from app.services.speech_gateway import SpeechGatewayBusyError
+from app.services.speech_pool import LONG_FORM_PROFILE, RecognitionProfile
+from app.services.streaming_tts import stream_speech
+from app.services.tts_cache import cached_synthesis
+from app.services.transcoding import LIVE_TRANSCODE_WORKERS, live_transcoding_pool, transcoding_pool, build_decode_args
 
 # Load environment variables
 load_dotenv()
 
-def get_speech_config():
-    """Get Azure speech config with API key and region"""
-    try:
-        speech_key = os.getenv("AZURE_SPEECH_KEY")
-        service_region = os.getenv("AZURE_SPEECH_REGION", "eastus")
-        
-        if not speech_key:
-            raise ValueError("Azure Speech API key not found")
-            
-        speech_config = speechsdk.SpeechConfig(
-            subscription=speech_key,
-            region=service_region
-        )
-        return speech_config
-    except Exception as e:
-        print(f"Error getting speech config: {str(e)}")
-        raise Exception(f"Speech service configuration error: {str(e)}")
-
-async def transcribe_audio(audio_data, language):
+async def transcribe_audio(
+    audio_data,
+    language,
+    profile: RecognitionProfile = LONG_FORM_PROFILE,
+    timeout: Optional[float] = None
+):
     """
     Transcribe audio using Azure Speech-to-Text with continuous recognition
     
     Args:
         audio_data (bytes): Audio data to transcribe
         language (str): Language for transcription
+        profile (RecognitionProfile): Latency profile, e.g. WORD_PROFILE for a single word
+        timeout (float, optional): Deadline in seconds instead of the profile's
     
     Returns:
-        str: Transcribed text
+        str: Transcribed text, partial if the deadline hit first
     """
     try:
-        # Create speech configuration
-        speech_config = speechsdk.SpeechConfig(
-            subscription=os.getenv('AZURE_SPEECH_KEY'),
-            region=os.getenv('AZURE_SPEECH_REGION')
-        )
         print('languageeee',language)
-        # Set recognition language
-        speech_config.speech_recognition_language = language
-        
-        # Configure recognition settings for very long pauses
-        speech_config.set_property(
-            speechsdk.PropertyId.SpeechServiceConnection_InitialSilenceTimeoutMs,
-            "300000"  # 5 minutes initial silence timeout
-        )
-        speech_config.set_property(
-            speechsdk.PropertyId.SpeechServiceConnection_EndSilenceTimeoutMs,
-            "300000"  # 5 minutes end silence timeout
-        )
-        
-        # Create push stream for audio input
-        push_stream = speechsdk.audio.PushAudioInputStream()
-        audio_config = speechsdk.AudioConfig(stream=push_stream)
-        
-        # Create speech recognizer
-        recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_config)
-        
-        # Event to signal completion
-        recognition_done = asyncio.Event()
-        
-        # Thread-safe list to collect transcription results
-        transcription_results = []
-        
-        # Event handler for recognized speech
-        def handle_recognized(evt):
-            if evt.result.text.strip():
-                transcription_results.append(evt.result.text.strip())
-        
-        # Event handler to mark recognition as complete
-        def stop_cb(evt):
-            print(f'Recognition stopped: {evt}')
-            recognition_done.set()
-        
-        # Connect event handlers
-        recognizer.recognized.connect(handle_recognized)
-        recognizer.session_stopped.connect(stop_cb)
-        recognizer.canceled.connect(stop_cb)
-        
-        # Start continuous recognition
-        recognizer.start_continuous_recognition()
-        
-        # Write audio data to push stream
-        push_stream.write(audio_data)
-        push_stream.close()
-        
-        # Wait for recognition to complete with timeout
-        try:
-            await asyncio.wait_for(recognition_done.wait(), timeout=60.0)
-        except asyncio.TimeoutError:
-            print("Recognition timed out")
-        
-        # Stop continuous recognition
-        recognizer.stop_continuous_recognition()
-        
-        # Combine and return full transcription
-        full_text = " ".join(transcription_results)
-        return full_text if full_text.strip() else ""
+        # Finishes as soon as the last segment of the clip is recognized
+        transcript = await get_speech_backend().recognize_continuous(language, profile, audio=audio_data, timeout=timeout)
+        if transcript.error:
+            print(f"Recognition canceled: {transcript.error}")
+        return transcript.text
     
     except Exception as e:
         print(f"Error in transcribe_audio: {str(e)}")
         return ""
 
-async def generate_speech(text: str, voice_name: str = "en-US-JennyNeural") -> Optional[str]:
-    """Generate speech from text using Azure TTS, return path to audio file"""
+async def transcribe_audio_stream(
+    audio_chunks: AsyncIterator[bytes],
+    language: str,
+    profile: RecognitionProfile = LONG_FORM_PROFILE,
+    timeout: Optional[float] = None
+) -> str:
+    """
+    Transcribe an upload, decoding it while it is still being read
+
+    Encoded chunks (webm/ogg/mp4) are piped through a streaming ffmpeg decode as
+    they arrive, so decoding overlaps the upload. The decoded clip then gets the
+    full condition_speech chain, denoise and loudness normalisation included,
+    before recognition; only live sessions (see transcribe_live) settle for the
+    incremental StreamingConditioner.
+
+    WAV uploads are already PCM, so they skip ffmpeg.
+
+    Args:
+        audio_chunks (AsyncIterator[bytes]): Encoded audio, e.g. from app.services.audio_ingest.iter_upload
+        language (str): Language for transcription
+        profile (RecognitionProfile): Latency profile, e.g. WORD_PROFILE for a single word
+        timeout (float, optional): Deadline in seconds instead of the profile's;
+            it covers reading and decoding the upload too
+
+    Returns:
+        str: Transcribed text, partial if the deadline hit first
+    """
     try:
-        speech_config = get_speech_config()
-        if not speech_config:
-            return None
-        
-        # Set voice name
-        speech_config.speech_synthesis_voice_name = voice_name
-        
-        # Create a more persistent temporary file for audio output
-        temp_file_path = os.path.join(tempfile.gettempdir(), f"speech_{os.getpid()}_{id(text)}.wav")
-        
-        # Create audio output config with temporary file
-        audio_config = speechsdk.audio.AudioOutputConfig(filename=temp_file_path)
-        
-        # Create speech synthesizer
-        speech_synthesizer = speechsdk.SpeechSynthesizer(
-            speech_config=speech_config, 
-            audio_config=audio_config
+        first_chunk = await audio_chunks.__anext__()
+    except StopAsyncIteration:
+        return ""
+
+    async def replay():
+        yield first_chunk
+        async for chunk in audio_chunks:
+            yield chunk
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    upload = replay()
+    input_format = sniff_input_format(first_chunk)
+    audio = None
+    if input_format == 'wav':
+        wav_data = b''.join([chunk async for chunk in upload])
+        audio = AudioBuffer.from_wav_bytes(wav_data)
+        if audio is None:
+            # Not PCM WAV (e.g. compressed WAV): let ffmpeg decode it
+            async def replay_wav():
+                yield wav_data
+            upload = replay_wav()
+
+    if audio is None:
+        # Recognition input is 16kHz 16-bit mono, matching build_decode_args
+        pcm = bytearray()
+        await transcoding_pool.submit_stream(upload, pcm.extend, build_decode_args(input_format), timeout=timeout)
+        if not pcm:
+            return ""
+        audio = AudioBuffer.from_pcm16(bytes(pcm))
+
+    conditioned = await loop.run_in_executor(None, lambda: audio.condition().to_int16())
+    if timeout is not None:
+        # Whatever reading and decoding left of the deadline
+        timeout = max(timeout - (loop.time() - started), 0.1)
+    transcript = await get_speech_backend().recognize_continuous(language, profile, audio=conditioned, timeout=timeout)
+    if transcript.error:
+        print(f"Recognition canceled: {transcript.error}")
+    return transcript.text
+
+# Each live session holds a recognition slot (and, unless it sends PCM, a live
+# transcoding worker) for up to MAX_AUDIO_SECONDS; the rest are left to uploads
+LIVE_TRANSCRIBE_MAX_SESSIONS = min(int(os.getenv("LIVE_TRANSCRIBE_MAX_SESSIONS", "4")), LIVE_TRANSCODE_WORKERS)
+_live_sessions = 0
+
+async def transcribe_live(
+    frames: AsyncIterator[bytes],
+    language: str,
+    profile: RecognitionProfile = LONG_FORM_PROFILE,
+    input_format: Optional[str] = None,
+    on_event: Optional[Callable[[str, str], None]] = None,
+    timeout: Optional[float] = None
+) -> Transcript:
+    """
+    Transcribe audio frames as the user speaks them
+
+    Raw PCM frames go straight into the recognizer's push stream; encoded frames
+    (webm/ogg Opus) go through a streaming ffmpeg decode first. Recognition runs
+    while frames arrive, so the transcript is ready right after the last frame.
+
+    Args:
+        frames (AsyncIterator[bytes]): Audio frames, ending when the user stops speaking
+        language (str): Language for transcription
+        profile (RecognitionProfile): Latency profile, e.g. WORD_PROFILE for a single word
+        input_format (str, optional): "pcm" for 16kHz 16-bit mono PCM, otherwise
+            sniffed from the first frame
+        on_event (Callable, optional): Receives ("recognizing", hypothesis) and
+            ("recognized", segment) while the user is still speaking
+        timeout (float, optional): Deadline in seconds; defaults to the longest
+            accepted clip plus the profile's deadline
+
+    Returns:
+        Transcript: Full text, or partial text when the deadline hit
+
+    Raises:
+        SpeechGatewayBusyError: LIVE_TRANSCRIBE_MAX_SESSIONS live sessions are already open
+    """
+    global _live_sessions
+    if _live_sessions >= LIVE_TRANSCRIBE_MAX_SESSIONS:
+        raise SpeechGatewayBusyError("Too many live transcriptions in progress, please retry shortly")
+    _live_sessions += 1
+    try:
+        return await _transcribe_live(frames, language, profile, input_format, on_event, timeout)
+    finally:
+        _live_sessions -= 1
+
+async def _transcribe_live(
+    frames: AsyncIterator[bytes],
+    language: str,
+    profile: RecognitionProfile,
+    input_format: Optional[str],
+    on_event: Optional[Callable[[str, str], None]],
+    timeout: Optional[float]
+) -> Transcript:
+    conditioner = StreamingConditioner()
+    received = 0
+
+    async def limited(source: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        nonlocal received
+        async for frame in source:
+            received += len(frame)
+            if received > MAX_UPLOAD_BYTES:
+                raise UploadTooLargeError(f"Audio stream exceeds the {MAX_UPLOAD_BYTES} byte limit")
+            yield frame
+
+    async def feed(write_pcm):
+        def write(block: bytes):
+            write_pcm(conditioner.process(block))
+
+        if input_format == "pcm":
+            async for frame in limited(frames):
+                write(frame)
+            return
+        try:
+            first_frame = await frames.__anext__()
+        except StopAsyncIteration:
+            return
+
+        async def replay():
+            yield first_frame
+            async for frame in frames:
+                yield frame
+
+        await live_transcoding_pool.submit_stream(
+            limited(replay()),
+            write,
+            build_decode_args(input_format or sniff_input_format(first_frame)),
+            timeout=timeout or MAX_AUDIO_SECONDS + profile.deadline
         )
-        
-        print('Starting synthesis',voice_name)
-        # Synthesize speech to file
-        result = speech_synthesizer.speak_text_async(text).get()
-        print('Synthesis completed',speech_config)
-        
-        if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-            print(f'Synthesis successful. Audio saved to {temp_file_path}')
-            # Verify file exists and has content
-            if os.path.exists(temp_file_path):
-                file_size = os.path.getsize(temp_file_path)
-                print(f'Audio file size: {file_size} bytes')
-                if file_size > 0:
-                    return temp_file_path
-                else:
-                    print('Audio file is empty')
-            else:
-                print('Audio file was not created')
-            return None
-        else:
-            # Clean up the temporary file if synthesis fails
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-            
-            #error_details = result.properties.get(speechsdk.PropertyId.SpeechServiceResponse_JsonErrorDetails)
-            print(f"Speech synthesis failed: {result.reason}")
-            #if error_details:
-                #print(f"Error details: {error_details}")
-            return None
+
+    return await get_speech_backend().recognize_continuous(
+        language, profile, feed=feed, timeout=timeout or MAX_AUDIO_SECONDS + profile.deadline, on_event=on_event
+    )
+
+async def generate_speech(
+    text: str,
+    voice_name: str = "en-US-JennyNeural",
+    audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT
+) -> Optional[bytes]:
+    """Generate speech from text using Azure TTS, return the audio bytes in ``audio_format``"""
+    try:
+        async def synthesize() -> Optional[bytes]:
+            print('Starting synthesis',voice_name)
+            try:
+                audio_data = await get_speech_backend().synthesize(text, voice_name, audio_format)
+            except SynthesisError as e:
+                print(str(e))
+                return None
+            print(f'Synthesis successful. Audio size: {len(audio_data)} bytes')
+            return audio_data
+        
+        return await cached_synthesis(text, voice_name, audio_format, synthesize)
             
     except Exception as e:
         print(f"Error generating speech: {str(e)}")
         traceback.print_exc()
         return None
+
+def generate_speech_stream(
+    text: str,
+    voice_name: str = "en-US-JennyNeural",
+    audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT
+) -> AsyncIterator[bytes]:
+    """Stream speech for ``text`` sentence by sentence, see streaming_tts.stream_speech"""
+    return stream_speech(text, voice_name, audio_format)
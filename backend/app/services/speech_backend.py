@@ -0,0 +1,218 @@
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from app.services.audio_buffer import AudioBuffer
+from app.services.audio_formats import AudioFormat
+from app.services.recognition import Transcript
+from app.services.speech_pool import SINGLE_SHOT_PROFILE, RecognitionProfile
+
+# "azure" or "local", see get_speech_backend
+SPEECH_BACKEND = os.getenv("SPEECH_BACKEND", "azure")
+
+RECOGNIZED = "recognized"
+NO_MATCH = "no_match"
+CANCELED = "canceled"
+
+Audio = Union[bytes, AudioBuffer]
+# Receives a write callable for 16kHz 16-bit mono PCM and writes audio until the input ends
+AudioFeed = Callable[[Callable[[bytes], None]], Awaitable[None]]
+
+
+class SpeechBackendError(Exception):
+    """Raised when a speech backend cannot produce a result"""
+
+
+class SynthesisError(SpeechBackendError):
+    """Raised when synthesis fails or comes back empty"""
+
+
+@dataclass
+class RecognitionResult:
+    """Outcome of a single-shot recognition
+
+    ``detail`` carries the no-match or cancellation reason; ``elapsed`` is the
+    service time in seconds, without any wait for a gateway slot.
+    """
+    text: str
+    status: str
+    detail: Optional[str] = None
+    confidence: float = 1.0
+    alternatives: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def recognized(self) -> bool:
+        return self.status == RECOGNIZED
+
+
+@dataclass
+class AssessmentResult:
+    """Outcome of a pronunciation assessment
+
+    ``scores`` and ``words`` keep Azure's field names (AccuracyScore, PronScore,
+    CompletenessScore, FluencyScore; Word, PronunciationAssessment, Syllables,
+    Phonemes) so every backend reports the same shape.
+    """
+    text: str
+    status: str
+    detail: Optional[str] = None
+    scores: Dict[str, float] = field(default_factory=dict)
+    words: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def recognized(self) -> bool:
+        return self.status == RECOGNIZED
+
+
+@dataclass
+class LanguageIdentification(RecognitionResult):
+    """Outcome of one recognition that also picked the locale among candidates
+
+    ``language_confidence`` maps the service's Low / Normal / High rating onto
+    0..1, see LANGUAGE_CONFIDENCE.
+    """
+    language: Optional[str] = None
+    language_confidence: float = 0.0
+
+
+# Numeric stand-ins for the categorical confidence of language identification
+LANGUAGE_CONFIDENCE = {"Low": 0.3, "Normal": 0.6, "High": 0.9}
+
+
+class SpeechBackend(ABC):
+    """Speech recognition, pronunciation assessment and synthesis behind one interface
+
+    Every Azure Speech call in the app goes through the active backend, so the
+    server can run against the in-process stand-in (SPEECH_BACKEND=local) for
+    load tests and benchmarks without a key or quota.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def synthesize(
+        self,
+        text: str,
+        voice_name: str,
+        audio_format: AudioFormat,
+        ssml: bool = False,
+        on_chunk: Optional[Callable[[bytes], None]] = None
+    ) -> bytes:
+        """Speak ``text`` (or an SSML document) and return the audio in ``audio_format``
+
+        Args:
+            on_chunk (Callable, optional): Called from a worker thread with audio
+                as it is produced, before the full result is returned
+
+        Raises:
+            SynthesisError: Synthesis failed or produced no audio
+        """
+
+    @abstractmethod
+    async def recognize(
+        self,
+        audio: Audio,
+        language: str,
+        profile: RecognitionProfile = SINGLE_SHOT_PROFILE,
+        timeout: Optional[float] = None
+    ) -> RecognitionResult:
+        """Recognize the first utterance of a clip"""
+
+    @abstractmethod
+    async def recognize_continuous(
+        self,
+        language: str,
+        profile: RecognitionProfile,
+        audio: Optional[Audio] = None,
+        feed: Optional[AudioFeed] = None,
+        timeout: Optional[float] = None,
+        on_event: Optional[Callable[[str, str], None]] = None
+    ) -> Transcript:
+        """Recognize a whole clip, or audio written by ``feed`` while it arrives
+
+        Returns as soon as all the audio is recognized, or with partial text at
+        the deadline; see app.services.recognition.recognize_continuous.
+        """
+
+    @abstractmethod
+    async def assess_pronunciation(
+        self,
+        audio: Audio,
+        reference_text: str,
+        language: str,
+        granularity: str = "Phoneme",
+        enable_miscue: bool = False,
+        timeout: Optional[float] = None
+    ) -> AssessmentResult:
+        """Score how ``audio`` pronounces ``reference_text`` on a hundred-mark scale"""
+
+    async def identify_language(
+        self,
+        audio: Audio,
+        candidates: List[str],
+        profile: RecognitionProfile = SINGLE_SHOT_PROFILE,
+        timeout: Optional[float] = None
+    ) -> LanguageIdentification:
+        """Recognize the first utterance of a clip once, in whichever of ``candidates`` fits best
+
+        Raises:
+            SpeechBackendError: The backend cannot identify languages
+        """
+        raise SpeechBackendError(f"The {self.name} speech backend does not support language identification")
+
+    async def recognize_locally(
+        self,
+        audio: Audio,
+        language: str,
+        profile: RecognitionProfile = SINGLE_SHOT_PROFILE
+    ) -> Optional[RecognitionResult]:
+        """A confident result recognized without a paid round trip, or None
+
+        Lets callers that would otherwise skip recognition, e.g. single-pass
+        pronunciation assessment, check a clip for free when the backend can.
+        """
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+_backend: Optional[SpeechBackend] = None
+
+
+def create_speech_backend(name: str = SPEECH_BACKEND) -> SpeechBackend:
+    if name == "azure":
+        from app.services.azure_speech import AzureSpeechBackend
+        return AzureSpeechBackend()
+    if name == "local":
+        from app.services.local_speech import LocalSpeechBackend
+        return LocalSpeechBackend()
+    raise ValueError(f"Unknown speech backend: {name}")
+
+
+def get_speech_backend() -> SpeechBackend:
+    """The backend selected by SPEECH_BACKEND, created on first use
+
+    With SPEECH_OFFLINE_MODELS set and vosk installed, short utterances are
+    recognized locally first, see app.services.offline_speech.
+    """
+    global _backend
+    if _backend is None:
+        backend = create_speech_backend()
+        if os.getenv("SPEECH_OFFLINE_MODELS"):
+            from app.services.offline_speech import OfflineSpeechBackend, vosk_available
+            if vosk_available():
+                backend = OfflineSpeechBackend(backend)
+            else:
+                print("SPEECH_OFFLINE_MODELS is set but vosk is not installed (see requirements-offline.txt), recognizing with the fallback only")
+        _backend = backend
+    return _backend
+
+
+def set_speech_backend(backend: SpeechBackend):
+    """Swap the active backend, e.g. to benchmark with a differently configured stand-in"""
+    global _backend
+    _backend = backend
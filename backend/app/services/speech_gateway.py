@@ -0,0 +1,263 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+SYNTHESIS = "synthesis"
+RECOGNITION = "recognition"
+ASSESSMENT = "assessment"
+
+# Cleanup calls such as stop_continuous_recognition run even after a deadline passed
+CLEANUP_TIMEOUT_SECONDS = 5.0
+
+
+class SpeechGatewayError(Exception):
+    """Raised when the gateway refuses or abandons a speech call"""
+
+
+class SpeechGatewayBusyError(SpeechGatewayError):
+    """Raised when too many calls of one operation are already waiting for a slot"""
+
+
+class SpeechGatewayTimeoutError(SpeechGatewayError, asyncio.TimeoutError):
+    """Raised when a call misses its deadline; existing asyncio.TimeoutError handlers catch it"""
+
+
+def _setting(operation: str, name: str, default: str) -> str:
+    return os.getenv(f"SPEECH_{operation.upper()}_{name}", default)
+
+
+class _Operation:
+    def __init__(self, name: str, limit: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(limit)
+        self.waiting = 0
+        self.in_flight = 0
+        self.counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "timed_out": 0,
+            "cancelled": 0,
+            "rejected": 0
+        }
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_service = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        started = self.counters["submitted"] - self.counters["rejected"]
+        finished = started - self.in_flight - self.waiting
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            **self.counters,
+            "avg_queue_wait_ms": round(self.total_wait / started * 1000, 2) if started else 0.0,
+            "max_queue_wait_ms": round(self.max_wait * 1000, 2),
+            "avg_service_ms": round(self.total_service / finished * 1000, 2) if finished > 0 else 0.0
+        }
+
+
+def _abandon_acquire(acquire: asyncio.Future, semaphore: asyncio.Semaphore):
+    """Stop waiting for a permit, releasing it if it was granted anyway"""
+    def release_if_acquired(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is None:
+            semaphore.release()
+
+    acquire.cancel()
+    acquire.add_done_callback(release_if_acquired)
+
+
+class SpeechCall:
+    """One admitted speech call: runs blocking SDK work on the gateway executor
+
+    A call holds its operation slot until every piece of work it started has
+    returned, even work abandoned after a deadline, so the in-flight cap always
+    reflects the threads actually busy with Azure.
+    """
+
+    def __init__(self, gateway: 'SpeechGateway', deadline: float):
+        self._gateway = gateway
+        self._deadline = deadline
+        self._pending: Set[asyncio.Future] = set()
+
+    def remaining(self) -> float:
+        return max(0.0, self._deadline - asyncio.get_running_loop().time())
+
+    async def call(self, fn: Callable[..., T], *args: Any, timeout: Optional[float] = None) -> T:
+        """Run ``fn(*args)`` on the executor and await it within the call's deadline
+
+        Args:
+            fn (Callable): Blocking function, e.g. ``recognizer.recognize_once_async().get``
+            timeout (float, optional): Own timeout instead of the remaining deadline,
+                for cleanup that must run even once the deadline has passed
+        """
+        timeout = self.remaining() if timeout is None else timeout
+        if timeout <= 0:
+            raise SpeechGatewayTimeoutError("Speech call deadline exceeded")
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._gateway._get_executor(), fn, *args)
+        self._pending.add(future)
+        future.add_done_callback(self._finished)
+        try:
+            # Shielded so an abandoned call keeps its slot until the thread is free
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise SpeechGatewayTimeoutError(f"Speech call exceeded its {timeout:.1f}s deadline") from None
+
+    def _finished(self, future: asyncio.Future):
+        self._pending.discard(future)
+        if not future.cancelled():
+            # Results of abandoned calls are dropped; mark their errors retrieved
+            future.exception()
+
+    def _release_when_idle(self, release: Callable[[], None]):
+        pending = list(self._pending)
+        if not pending:
+            release()
+            return
+        remaining = len(pending)
+
+        def on_done(_):
+            nonlocal remaining
+            remaining -= 1
+            if remaining == 0:
+                release()
+
+        for future in pending:
+            future.add_done_callback(on_done)
+
+
+class SpeechGateway:
+    """The single path for blocking Azure Speech SDK calls
+
+    SDK work runs on a bounded thread pool instead of the event loop. Each
+    operation type (synthesis, recognition, assessment) has its own cap on
+    in-flight calls, a bounded number of waiters beyond that cap, and a default
+    deadline covering both the wait for a slot and the call itself. Callers
+    that wait too long are rejected with SpeechGatewayBusyError so load is shed
+    instead of queued without bound.
+
+    Limits and deadlines come from SPEECH_<OPERATION>_MAX_IN_FLIGHT and
+    SPEECH_<OPERATION>_TIMEOUT_SECONDS, e.g. SPEECH_SYNTHESIS_MAX_IN_FLIGHT.
+    """
+
+    DEFAULTS = {
+        SYNTHESIS: (8, 30.0),
+        RECOGNITION: (8, 90.0),
+        ASSESSMENT: (4, 30.0),
+    }
+
+    def __init__(self, workers: Optional[int] = None, max_waiting: Optional[int] = None):
+        self._operations: Dict[str, _Operation] = {}
+        for name, (limit, timeout) in self.DEFAULTS.items():
+            self._operations[name] = _Operation(
+                name,
+                int(_setting(name, "MAX_IN_FLIGHT", str(limit))),
+                float(_setting(name, "TIMEOUT_SECONDS", str(timeout)))
+            )
+        self.workers = workers or int(os.getenv(
+            "SPEECH_EXECUTOR_WORKERS", str(sum(operation.limit for operation in self._operations.values()))
+        ))
+        self.max_waiting = max_waiting or int(os.getenv("SPEECH_MAX_WAITING", "32"))
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="speech")
+        return self._executor
+
+    @asynccontextmanager
+    async def session(self, operation: str, timeout: Optional[float] = None) -> AsyncIterator[SpeechCall]:
+        """Hold one ``operation`` slot for a multi-step interaction such as continuous recognition
+
+        Args:
+            operation (str): SYNTHESIS, RECOGNITION or ASSESSMENT
+            timeout (float, optional): Deadline in seconds, including the wait for a slot
+
+        Yields:
+            SpeechCall: Runs the blocking steps within the deadline
+        """
+        state = self._operations[operation]
+        state.counters["submitted"] += 1
+        if state.waiting >= self.max_waiting and state.in_flight >= state.limit:
+            state.counters["rejected"] += 1
+            raise SpeechGatewayBusyError(f"Too many {operation} requests in progress, please retry shortly")
+
+        loop = asyncio.get_running_loop()
+        timeout = timeout or state.timeout
+        enqueued_at = loop.time()
+        state.waiting += 1
+        # Shielded in a task so a permit acquired just as the wait is abandoned is handed back
+        acquire = asyncio.ensure_future(state.semaphore.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(acquire), timeout)
+        except asyncio.TimeoutError:
+            state.counters["timed_out"] += 1
+            _abandon_acquire(acquire, state.semaphore)
+            raise SpeechGatewayTimeoutError(f"No {operation} slot freed up within {timeout:.1f}s") from None
+        except asyncio.CancelledError:
+            state.counters["cancelled"] += 1
+            _abandon_acquire(acquire, state.semaphore)
+            raise
+        finally:
+            state.waiting -= 1
+
+        started_at = loop.time()
+        waited = started_at - enqueued_at
+        state.total_wait += waited
+        state.max_wait = max(state.max_wait, waited)
+        state.in_flight += 1
+        speech_call = SpeechCall(self, enqueued_at + timeout)
+        outcome = "completed"
+        try:
+            yield speech_call
+        except SpeechGatewayTimeoutError:
+            outcome = "timed_out"
+            raise
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except BaseException:
+            outcome = "failed"
+            raise
+        finally:
+            state.counters[outcome] += 1
+            state.total_service += loop.time() - started_at
+
+            def release():
+                state.in_flight -= 1
+                state.semaphore.release()
+
+            speech_call._release_when_idle(release)
+
+    async def run(self, operation: str, fn: Callable[..., T], *args: Any, timeout: Optional[float] = None) -> T:
+        """Run one blocking SDK call, e.g. ``synthesizer.speak_text_async(text).get``, off the event loop"""
+        async with self.session(operation, timeout) as speech_call:
+            return await speech_call.call(fn, *args)
+
+    async def offload(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run short blocking SDK setup, e.g. building a recognizer, on the executor without taking a slot"""
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "workers": self.workers,
+            "max_waiting": self.max_waiting,
+            **{name: operation.stats() for name, operation in self._operations.items()}
+        }
+
+
+speech_gateway = SpeechGateway()
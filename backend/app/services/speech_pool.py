@@ -0,0 +1,390 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import azure.cognitiveservices.speech as speechsdk
+
+from app.services.audio_formats import AudioFormat
+from app.services.audio_io import recognition_stream_format
+
+# Warm synthesizers kept per (region, voice, format)
+SPEECH_POOL_SIZE = int(os.getenv("SPEECH_POOL_SIZE", "2"))
+# Pre-connected recognizers kept ready per (region, locale, profile)
+SPEECH_POOL_WARM_RECOGNIZERS = int(os.getenv("SPEECH_POOL_WARM_RECOGNIZERS", "2"))
+# The service drops idle connections, so older instances are recycled instead of reused
+SPEECH_POOL_MAX_IDLE_SECONDS = float(os.getenv("SPEECH_POOL_MAX_IDLE_SECONDS", "120"))
+SPEECH_POOL_MAX_USES = int(os.getenv("SPEECH_POOL_MAX_USES", "500"))
+# How often idle clients are checked and closed, so their connections are not held until the next request
+SPEECH_POOL_SWEEP_SECONDS = float(os.getenv("SPEECH_POOL_SWEEP_SECONDS", "30"))
+
+
+@dataclass(frozen=True)
+class RecognitionProfile:
+    """Recognizer settings shared by every recognizer built for one kind of request
+
+    ``deadline`` is the default time budget, in seconds, for one recognition
+    with this profile; see app.services.recognition.
+    """
+    name: str
+    properties: Tuple[Tuple[speechsdk.PropertyId, str], ...] = ()
+    continuous: bool = False
+    audio_logging: bool = False
+    deadline: float = 30.0
+
+    def apply(self, speech_config: speechsdk.SpeechConfig):
+        for property_id, value in self.properties:
+            speech_config.set_property(property_id, value)
+        if self.audio_logging:
+            speech_config.enable_audio_logging()
+
+
+def _latency_properties(initial_silence_ms: int, end_silence_ms: int, segmentation_silence_ms: int):
+    return (
+        (speechsdk.PropertyId.SpeechServiceConnection_InitialSilenceTimeoutMs, str(initial_silence_ms)),
+        (speechsdk.PropertyId.SpeechServiceConnection_EndSilenceTimeoutMs, str(end_silence_ms)),
+        (speechsdk.PropertyId.Speech_SegmentationSilenceTimeoutMs, str(segmentation_silence_ms)),
+    )
+
+
+def _deadline(name: str, default: float) -> float:
+    return float(os.getenv(f"RECOGNITION_{name.upper()}_DEADLINE_SECONDS", str(default)))
+
+
+# One recognize_once call with the service's default timeouts
+SINGLE_SHOT_PROFILE = RecognitionProfile("single_shot")
+
+# Continuous recognition finishes as soon as the closed push stream is fully
+# recognized, so the silence timeouts only shape segmentation; the deadline is
+# the upper bound a request can be held for.
+
+# A single practice word
+WORD_PROFILE = RecognitionProfile(
+    "word",
+    _latency_properties(3000, 500, 300),
+    continuous=True,
+    deadline=_deadline("word", 8.0)
+)
+
+# One sentence, e.g. a pronunciation or repeat-after-me exercise
+SENTENCE_PROFILE = RecognitionProfile(
+    "sentence",
+    _latency_properties(5000, 800, 500),
+    continuous=True,
+    deadline=_deadline("sentence", 20.0)
+)
+
+# A whole conversation turn or long-form answer
+LONG_FORM_PROFILE = RecognitionProfile(
+    "long_form",
+    _latency_properties(10000, 1500, 800),
+    continuous=True,
+    deadline=_deadline("long_form", 90.0)
+)
+
+RECOGNITION_PROFILES = {profile.name: profile for profile in (WORD_PROFILE, SENTENCE_PROFILE, LONG_FORM_PROFILE)}
+
+# Short single-shot recognitions compared across locales
+ACCENT_PROFILE = RecognitionProfile(
+    "accent",
+    (
+        (speechsdk.PropertyId.SpeechServiceConnection_InitialSilenceTimeoutMs, "3000"),
+        (speechsdk.PropertyId.SpeechServiceConnection_EndSilenceTimeoutMs, "800"),
+        (speechsdk.PropertyId.Speech_SegmentationSilenceTimeoutMs, "200"),
+    ),
+    audio_logging=True
+)
+
+
+@dataclass
+class _Pooled:
+    client: object
+    connection: speechsdk.Connection
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    uses: int = 0
+    disconnected: bool = False
+    stream: Optional[speechsdk.audio.PushAudioInputStream] = None
+
+
+class SpeechClientPool:
+    """Warm, pre-connected Azure speech clients shared across requests
+
+    Synthesizers are reusable, so they are checked out, used and returned; each
+    keeps its service connection open between requests. Recognizers are bound to
+    their audio input when built, so they cannot be reused; instead a few are
+    built ahead of time per locale with an empty push stream and an opened
+    connection, and every one taken is replaced in the background.
+
+    Instances whose connection dropped, that sat idle past ``max_idle`` or that
+    served ``max_uses`` requests are recycled rather than handed out, and
+    ``start_sweeper`` closes them periodically in between requests. The pool
+    never blocks: when every warm synthesizer is busy a throwaway one is built.
+    """
+
+    def __init__(
+        self,
+        size: int = SPEECH_POOL_SIZE,
+        warm_recognizers: int = SPEECH_POOL_WARM_RECOGNIZERS,
+        max_idle: float = SPEECH_POOL_MAX_IDLE_SECONDS,
+        max_uses: int = SPEECH_POOL_MAX_USES
+    ):
+        self.size = size
+        self.warm_recognizers = warm_recognizers
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self._lock = threading.Lock()
+        self._synthesizers: Dict[Tuple[str, str, str], List[_Pooled]] = {}
+        self._recognizers: Dict[Tuple[str, str, str], List[_Pooled]] = {}
+        self._refilling = set()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_sweeping = threading.Event()
+        self._counters = {
+            "synthesizers_created": 0,
+            "synthesizers_reused": 0,
+            "recognizers_created": 0,
+            "recognizers_warm": 0,
+            "recycled": 0,
+            "swept": 0,
+            "connect_errors": 0
+        }
+
+    def config(self) -> speechsdk.SpeechConfig:
+        """Speech config from AZURE_SPEECH_KEY and AZURE_SPEECH_REGION; raises ValueError without a key"""
+        speech_key = os.getenv("AZURE_SPEECH_KEY")
+        if not speech_key:
+            raise ValueError("Azure Speech API key not found")
+        return speechsdk.SpeechConfig(subscription=speech_key, region=os.getenv("AZURE_SPEECH_REGION", "eastus"))
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _connect(self, entry: _Pooled, for_continuous_recognition: bool):
+        def on_disconnected(evt):
+            entry.disconnected = True
+
+        entry.connection.disconnected.connect(on_disconnected)
+        try:
+            entry.connection.open(for_continuous_recognition)
+        except Exception as e:
+            # Not fatal: the client connects on first use instead
+            print(f"Speech pool pre-connect failed: {e}")
+            self._count("connect_errors")
+
+    def _usable(self, entry: _Pooled) -> bool:
+        return (
+            not entry.disconnected
+            and entry.uses < self.max_uses
+            and time.monotonic() - entry.last_used < self.max_idle
+        )
+
+    def _retire(self, entry: _Pooled):
+        self._count("recycled")
+        try:
+            entry.connection.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def synthesizer(
+        self,
+        voice_name: str,
+        audio_format: AudioFormat,
+        speech_config: Optional[speechsdk.SpeechConfig] = None
+    ) -> Iterator[speechsdk.SpeechSynthesizer]:
+        """Check out a synthesizer for ``voice_name`` that keeps audio in ``result.audio_data``
+
+        Args:
+            voice_name (str): Voice the synthesizer speaks with
+            audio_format (AudioFormat): Output format
+            speech_config (speechsdk.SpeechConfig, optional): Config to build a new
+                instance from; defaults to one built from the environment
+        """
+        speech_config = speech_config or self.config()
+        key = (speech_config.region, voice_name, audio_format.name)
+
+        entry = None
+        with self._lock:
+            idle = self._synthesizers.setdefault(key, [])
+            while idle:
+                candidate = idle.pop()
+                if self._usable(candidate):
+                    entry = candidate
+                    break
+                threading.Thread(target=self._retire, args=(candidate,), daemon=True).start()
+        if entry is None:
+            entry = self._build_synthesizer(speech_config, voice_name, audio_format)
+        else:
+            self._count("synthesizers_reused")
+
+        failed = False
+        try:
+            yield entry.client
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            # Handlers attached for this request must not fire for the next one
+            entry.client.synthesizing.disconnect_all()
+            entry.uses += 1
+            entry.last_used = time.monotonic()
+            with self._lock:
+                idle = self._synthesizers.setdefault(key, [])
+                keep = not failed and self._usable(entry) and len(idle) < self.size
+                if keep:
+                    idle.append(entry)
+            if not keep:
+                self._retire(entry)
+
+    def _build_synthesizer(self, speech_config: speechsdk.SpeechConfig, voice_name: str, audio_format: AudioFormat) -> _Pooled:
+        speech_config.speech_synthesis_voice_name = voice_name
+        speech_config.set_speech_synthesis_output_format(audio_format.azure_format)
+        synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+        entry = _Pooled(synthesizer, speechsdk.Connection.from_speech_synthesizer(synthesizer))
+        self._connect(entry, True)
+        self._count("synthesizers_created")
+        return entry
+
+    def take_recognizer(
+        self,
+        language: str,
+        profile: RecognitionProfile,
+        speech_config: Optional[speechsdk.SpeechConfig] = None
+    ) -> Tuple[speechsdk.SpeechRecognizer, speechsdk.audio.PushAudioInputStream]:
+        """A recognizer for ``language`` reading from a fresh 16kHz mono push stream
+
+        The caller owns both: write the audio into the stream and close it. A
+        replacement is built in the background so the next request finds one warm.
+
+        Args:
+            language (str): Recognition locale, e.g. "en-US"
+            profile (RecognitionProfile): Timeouts and options to build with
+            speech_config (speechsdk.SpeechConfig, optional): Credentials to use
+                instead of the environment
+        """
+        speech_config = speech_config or self.config()
+        key = (speech_config.region, language, profile.name)
+
+        entry = None
+        with self._lock:
+            warm = self._recognizers.setdefault(key, [])
+            while warm:
+                candidate = warm.pop(0)
+                if self._usable(candidate):
+                    entry = candidate
+                    break
+                threading.Thread(target=self._retire, args=(candidate,), daemon=True).start()
+        if entry is None:
+            # Nothing warm; don't pay for a pre-connect on the request path
+            entry = self._build_recognizer(speech_config, language, profile, connect=False)
+        else:
+            self._count("recognizers_warm")
+
+        self._schedule_refill(key, speech_config, language, profile)
+        return entry.client, entry.stream
+
+    def _build_recognizer(
+        self,
+        speech_config: speechsdk.SpeechConfig,
+        language: str,
+        profile: RecognitionProfile,
+        connect: bool = True
+    ) -> _Pooled:
+        speech_config.speech_recognition_language = language
+        profile.apply(speech_config)
+        stream = speechsdk.audio.PushAudioInputStream(stream_format=recognition_stream_format())
+        recognizer = speechsdk.SpeechRecognizer(
+            speech_config=speech_config,
+            audio_config=speechsdk.audio.AudioConfig(stream=stream)
+        )
+        entry = _Pooled(recognizer, speechsdk.Connection.from_recognizer(recognizer), stream=stream)
+        if connect:
+            self._connect(entry, profile.continuous)
+        self._count("recognizers_created")
+        return entry
+
+    def _schedule_refill(self, key, speech_config: speechsdk.SpeechConfig, language: str, profile: RecognitionProfile):
+        with self._lock:
+            if key in self._refilling or self.warm_recognizers <= 0:
+                return
+            self._refilling.add(key)
+        threading.Thread(
+            target=self._refill, args=(key, speech_config, language, profile), daemon=True
+        ).start()
+
+    def _refill(self, key, speech_config: speechsdk.SpeechConfig, language: str, profile: RecognitionProfile):
+        try:
+            while True:
+                with self._lock:
+                    if len(self._recognizers.get(key, [])) >= self.warm_recognizers:
+                        return
+                entry = self._build_recognizer(speech_config, language, profile)
+                with self._lock:
+                    self._recognizers.setdefault(key, []).append(entry)
+        except Exception as e:
+            print(f"Speech pool refill failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+    def prewarm(self, voice_names: List[str], audio_format: AudioFormat):
+        """Open synthesizer connections ahead of the first request (blocking)"""
+        for voice_name in voice_names:
+            try:
+                with self.synthesizer(voice_name, audio_format):
+                    pass
+            except Exception as e:
+                print(f"Speech pool prewarm failed for {voice_name}: {e}")
+
+    def sweep(self) -> int:
+        """Close idle clients that are no longer usable; returns how many were closed"""
+        with self._lock:
+            stale = []
+            for clients in (*self._synthesizers.values(), *self._recognizers.values()):
+                stale += [entry for entry in clients if not self._usable(entry)]
+                clients[:] = [entry for entry in clients if self._usable(entry)]
+            self._counters["swept"] += len(stale)
+        for entry in stale:
+            self._retire(entry)
+        return len(stale)
+
+    def start_sweeper(self, interval: float = SPEECH_POOL_SWEEP_SECONDS):
+        """Sweep idle clients every ``interval`` seconds on a daemon thread until close()"""
+        if self._sweeper is not None or interval <= 0:
+            return
+        self._stop_sweeping.clear()
+
+        def run():
+            while not self._stop_sweeping.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Speech pool sweep failed: {e}")
+
+        self._sweeper = threading.Thread(target=run, name="speech-pool-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def close(self):
+        self._stop_sweeping.set()
+        self._sweeper = None
+        with self._lock:
+            entries = [entry for idle in self._synthesizers.values() for entry in idle]
+            entries += [entry for warm in self._recognizers.values() for entry in warm]
+            self._synthesizers.clear()
+            self._recognizers.clear()
+        for entry in entries:
+            self._retire(entry)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                **self._counters,
+                "idle_synthesizers": {"/".join(key): len(idle) for key, idle in self._synthesizers.items()},
+                "warm_recognizers": {"/".join(key): len(warm) for key, warm in self._recognizers.items()}
+            }
+
+
+speech_pool = SpeechClientPool()
@@ -0,0 +1,240 @@
+import asyncio
+import os
+import re
+import struct
+from typing import AsyncIterator, List, Optional, Tuple
+
+from app.services.audio_formats import AUDIO_FORMATS, AudioFormat
+from app.services.speech_backend import SynthesisError, get_speech_backend
+from app.services.tts_cache import cached_synthesis
+
+# Segments synthesized ahead of the one currently being streamed
+STREAM_TTS_CONCURRENCY = int(os.getenv("STREAM_TTS_CONCURRENCY", "3"))
+
+# Short sentences are merged so each segment is worth an Azure round trip
+MIN_SEGMENT_CHARS = 40
+MAX_SEGMENT_CHARS = 300
+
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+|(?<=[。！？])')
+_CLAUSE_END = re.compile(r'(?<=[,;:，；])\s*')
+
+
+def split_sentences(text: str, min_chars: int = MIN_SEGMENT_CHARS, max_chars: int = MAX_SEGMENT_CHARS) -> List[str]:
+    """Split text into sentence-aligned segments for incremental synthesis
+
+    The first sentence is always its own segment so first audio arrives as early
+    as possible; later sentences shorter than ``min_chars`` are merged with their
+    neighbours, and sentences longer than ``max_chars`` are split at clause breaks.
+    """
+    sentences = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        while len(sentence) > max_chars:
+            cut = max((match.end() for match in _CLAUSE_END.finditer(sentence, 0, max_chars)), default=0)
+            if cut <= 0:
+                cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            sentences.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            sentences.append(sentence)
+
+    segments: List[str] = []
+    for sentence in sentences:
+        if len(segments) > 1 and len(segments[-1]) < min_chars and len(segments[-1]) + len(sentence) < max_chars:
+            segments[-1] = f"{segments[-1]} {sentence}"
+        else:
+            segments.append(sentence)
+    return segments
+
+
+def streaming_wav_header(sample_rate: int, channels: int = 1, bits_per_sample: int = 16) -> bytes:
+    """RIFF header for a WAV stream of unknown length
+
+    The size fields are set to their maximum, which browsers and most decoders
+    treat as "read until the end of the stream".
+    """
+    byte_rate = sample_rate * channels * bits_per_sample // 8
+    block_align = channels * bits_per_sample // 8
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, block_align, bits_per_sample)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
+# Formats whose per-segment output cannot simply be concatenated, and what to
+# synthesize instead: WAV segments become raw PCM behind one streaming header
+_SEGMENT_FORMATS = {
+    "wav": ("pcm-16k", 16000),
+    "wav-24k": ("pcm-24k", 24000),
+}
+# Container formats with no concatenable stand-in: back-to-back Ogg or WebM files
+# (chained Ogg) stop after the first in Chrome and MSE players, so these are
+# synthesized as one segment, still streamed as Azure produces it
+_SINGLE_SEGMENT_FORMATS = {"opus", "webm-opus"}
+
+
+def streaming_format(audio_format: AudioFormat) -> Tuple[AudioFormat, AudioFormat, bytes]:
+    """Resolve a requested format for streaming
+
+    Returns:
+        Tuple[AudioFormat, AudioFormat, bytes]: The format the stream is labelled
+        with, the format each segment is synthesized in, and any bytes sent
+        before the first segment
+    """
+    segment_name, sample_rate = _SEGMENT_FORMATS.get(audio_format.name, (audio_format.name, None))
+    segment_format = AUDIO_FORMATS[segment_name]
+    if sample_rate:
+        return audio_format, segment_format, streaming_wav_header(sample_rate)
+    return segment_format, segment_format, b""
+
+
+async def _synthesize_segment(
+    text: str,
+    voice_name: str,
+    audio_format: AudioFormat,
+    chunks: asyncio.Queue,
+    semaphore: asyncio.Semaphore
+):
+    """Synthesize one segment, pushing audio into ``chunks`` as Azure produces it
+
+    Cache and asset-pack hits arrive as a single chunk. The queue is closed with
+    None whether or not synthesis succeeded.
+    """
+    loop = asyncio.get_running_loop()
+    streamed = False
+
+    def on_chunk(audio_data: bytes):
+        # Called on a synthesis worker thread
+        nonlocal streamed
+        streamed = True
+        loop.call_soon_threadsafe(chunks.put_nowait, audio_data)
+
+    async def synthesize() -> Optional[bytes]:
+        async with semaphore:
+            try:
+                return await get_speech_backend().synthesize(text, voice_name, audio_format, on_chunk=on_chunk)
+            except SynthesisError as e:
+                print(f"Streaming synthesis failed for segment {text[:60]!r}: {e}")
+                return None
+
+    try:
+        audio_data = await cached_synthesis(text, voice_name, audio_format, synthesize)
+        if audio_data and not streamed:
+            chunks.put_nowait(audio_data)
+    except Exception as e:
+        print(f"Error synthesizing segment {text[:60]!r}: {e}")
+    finally:
+        chunks.put_nowait(None)
+
+
+class SegmentPipeline:
+    """Synthesizes text segments as they are added and hands their audio back in order
+
+    Segments can be added while earlier ones are still synthesizing or being
+    consumed, which lets a producer (a streaming LLM reply, say) overlap with
+    synthesis. At most ``concurrency`` Azure calls run at once. Call close()
+    after the last segment so the readers know when to stop.
+    """
+
+    def __init__(
+        self,
+        voice_name: str,
+        audio_format: AudioFormat,
+        concurrency: int = STREAM_TTS_CONCURRENCY
+    ):
+        self.voice_name = voice_name
+        self.audio_format = audio_format
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # (text, chunk queue) per segment in order, then None once closed
+        self._segments: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    def add(self, text: str):
+        chunks: asyncio.Queue = asyncio.Queue()
+        self._tasks.append(asyncio.create_task(
+            _synthesize_segment(text, self.voice_name, self.audio_format, chunks, self._semaphore)
+        ))
+        self._segments.put_nowait((text, chunks))
+
+    def close(self):
+        self._segments.put_nowait(None)
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Audio chunks as Azure produces them, segment after segment"""
+        while True:
+            segment = await self._segments.get()
+            if segment is None:
+                return
+            _, chunks = segment
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+
+    async def segments(self) -> AsyncIterator[Tuple[str, bytes]]:
+        """(text, audio) for each complete segment; failed segments are skipped"""
+        while True:
+            segment = await self._segments.get()
+            if segment is None:
+                return
+            text, chunks = segment
+            parts = []
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                parts.append(chunk)
+            if parts:
+                yield text, b"".join(parts)
+
+    async def cancel(self):
+        """Drop synthesis nobody will read"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def stream_speech(
+    text: str,
+    voice_name: str,
+    audio_format: AudioFormat,
+    concurrency: int = STREAM_TTS_CONCURRENCY
+) -> AsyncIterator[bytes]:
+    """Yield encoded audio for ``text`` sentence by sentence
+
+    All segments are scheduled up front, with at most ``concurrency`` Azure
+    calls running at once, and their audio is yielded strictly in order, so the
+    first sentence plays while later ones are still being synthesized. A segment
+    that fails is skipped rather than ending the stream. Opus formats are
+    synthesized as a single segment, see _SINGLE_SEGMENT_FORMATS.
+
+    Args:
+        text (str): Text to speak
+        voice_name (str): Voice to speak with
+        audio_format (AudioFormat): Requested format; resolve it with streaming_format()
+        concurrency (int): Maximum segments synthesized at once
+
+    Yields:
+        bytes: Audio chunks in the stream format
+    """
+    _, segment_format, preamble = streaming_format(audio_format)
+    if preamble:
+        yield preamble
+
+    pipeline = SegmentPipeline(voice_name, segment_format, concurrency)
+    segments = [text.strip()] if segment_format.name in _SINGLE_SEGMENT_FORMATS else split_sentences(text)
+    for segment in segments:
+        pipeline.add(segment)
+    pipeline.close()
+    try:
+        async for chunk in pipeline.chunks():
+            yield chunk
+    finally:
+        # The client went away or the stream finished; drop work nobody will read
+        await pipeline.cancel()
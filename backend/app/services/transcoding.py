@@ -0,0 +1,353 @@
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import ffmpeg
+
+from app.services.audio_conditioning import SPEECH_SAMPLE_RATE
+
+
+class TranscodingError(Exception):
+    """Raised when ffmpeg fails to decode an upload"""
+
+
+class TranscodingBusyError(TranscodingError):
+    """Raised when the transcoding queue is full and the job is rejected"""
+
+
+class TranscodingTimeoutError(TranscodingError):
+    """Raised when a job misses its deadline"""
+
+
+STREAM_READ_SIZE = 8192
+
+
+@dataclass
+class TranscodeJob:
+    args: List[str]
+    data: Optional[bytes]
+    deadline: float
+    enqueued_at: float
+    future: asyncio.Future
+    # Streaming jobs read input from ``chunks`` and hand output to ``sink`` as it is produced
+    chunks: Optional[AsyncIterator[bytes]] = None
+    sink: Optional[Callable[[bytes], None]] = None
+
+
+def build_decode_args(input_format: Optional[str] = 'webm', sample_rate: int = SPEECH_SAMPLE_RATE) -> List[str]:
+    """Build the ffmpeg command line that decodes browser recordings to raw 16-bit mono PCM
+
+    Filtering, denoise and normalisation happen in-process in app.services.audio_conditioning.
+    """
+    input_kwargs = {'format': input_format} if input_format else {}
+    return (
+        ffmpeg
+        .input('pipe:0', **input_kwargs)
+        .output(
+            'pipe:1',
+            format='s16le',
+            acodec='pcm_s16le',
+            ac=1,              # Mono
+            ar=sample_rate,
+            loglevel='error'   # Reduce logging
+        )
+        .overwrite_output()
+        .compile()
+    )
+
+
+async def _run_together(coroutines: List[Awaitable[Any]], timeout: float) -> List[Any]:
+    """Await ``coroutines`` concurrently; the first failure or the deadline cancels the rest
+
+    Unlike ``asyncio.gather``, a failing coroutine never leaves its siblings
+    running, e.g. feeding stdin after stdout failed.
+
+    Raises:
+        asyncio.TimeoutError: ``timeout`` seconds passed before all of them finished
+    """
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        if pending:
+            raise asyncio.TimeoutError()
+        return [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class TranscodingPool:
+    """Bounded pool of asyncio workers that run ffmpeg jobs without blocking the event loop.
+
+    Jobs are queued up to ``max_queue``; once the queue is full new jobs are rejected
+    with ``TranscodingBusyError`` so callers can shed load instead of piling up.
+    Each job carries a deadline measured from submission, covering both the time
+    spent waiting in the queue and the ffmpeg run itself.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_queue: Optional[int] = None, timeout: Optional[float] = None):
+        self.workers = workers or int(os.getenv("TRANSCODE_WORKERS", "2"))
+        self.max_queue = max_queue or int(os.getenv("TRANSCODE_MAX_QUEUE", "16"))
+        self.timeout = timeout or float(os.getenv("TRANSCODE_TIMEOUT_SECONDS", "20"))
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._busy_workers = 0
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timed_out": 0
+        }
+        self._total_wait = 0.0
+        self._total_service = 0.0
+
+    def _ensure_started(self):
+        """Start worker tasks on the running loop the first time a job is submitted"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._busy_workers = 0
+        self._tasks = [
+            loop.create_task(self._worker(index), name=f"transcoder-{index}")
+            for index in range(self.workers)
+        ]
+        print(f"Started transcoding pool with {self.workers} workers (max queue {self.max_queue})")
+
+    async def start(self):
+        self._ensure_started()
+
+    async def stop(self):
+        """Cancel workers and fail any job still waiting in the queue"""
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                job = self._queue.get_nowait()
+                if not job.future.done():
+                    job.future.set_exception(TranscodingError("Transcoding pool is shutting down"))
+        self._queue = None
+        self._loop = None
+
+    def _enqueue(self, job: TranscodeJob):
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._counters["rejected"] += 1
+            raise TranscodingBusyError("Audio conversion queue is full, please retry shortly")
+        self._counters["submitted"] += 1
+
+    async def submit(self, audio_data: bytes, args: Optional[List[str]] = None, timeout: Optional[float] = None) -> bytes:
+        """Queue an ffmpeg job and wait for its output
+
+        Args:
+            audio_data (bytes): Data written to ffmpeg's stdin
+            args (List[str], optional): ffmpeg command line. Defaults to decoding webm to 16kHz PCM.
+            timeout (float, optional): Deadline in seconds from submission. Defaults to the pool timeout.
+
+        Returns:
+            bytes: Data read from ffmpeg's stdout
+        """
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        job = TranscodeJob(
+            args=args or build_decode_args(),
+            data=audio_data,
+            deadline=now + (timeout or self.timeout),
+            enqueued_at=now,
+            future=loop.create_future()
+        )
+
+        self._enqueue(job)
+        return await job.future
+
+    async def submit_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        sink: Callable[[bytes], None],
+        args: Optional[List[str]] = None,
+        timeout: Optional[float] = None
+    ) -> int:
+        """Queue a streaming ffmpeg job that consumes input and emits output incrementally
+
+        Input chunks are written to ffmpeg's stdin as they arrive while stdout is read
+        concurrently, so decoding overlaps the upload and neither side is held in memory.
+
+        Args:
+            chunks (AsyncIterator[bytes]): Encoded input, e.g. from app.services.audio_ingest.iter_upload
+            sink (Callable[[bytes], None]): Called with each block of decoded output
+            args (List[str], optional): ffmpeg command line. Defaults to decoding webm to 16kHz PCM.
+            timeout (float, optional): Deadline in seconds from submission. Defaults to the pool timeout.
+
+        Returns:
+            int: Number of output bytes handed to ``sink``
+        """
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        job = TranscodeJob(
+            args=args or build_decode_args(),
+            data=None,
+            deadline=now + (timeout or self.timeout),
+            enqueued_at=now,
+            future=loop.create_future(),
+            chunks=chunks,
+            sink=sink
+        )
+        self._enqueue(job)
+        return await job.future
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            self._busy_workers += 1
+            try:
+                if job.future.cancelled():
+                    continue
+
+                loop = asyncio.get_running_loop()
+                started_at = loop.time()
+                self._total_wait += started_at - job.enqueued_at
+
+                remaining = job.deadline - started_at
+                if remaining <= 0:
+                    self._counters["timed_out"] += 1
+                    job.future.set_exception(TranscodingTimeoutError("Audio conversion timed out waiting in queue"))
+                    continue
+
+                try:
+                    if job.chunks is not None:
+                        output = await self._run_stream(job.args, job.chunks, job.sink, remaining)
+                    else:
+                        output = await self._run(job.args, job.data, remaining)
+                except TranscodingTimeoutError as e:
+                    self._counters["timed_out"] += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                except Exception as e:
+                    self._counters["failed"] += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    self._counters["completed"] += 1
+                    if not job.future.done():
+                        job.future.set_result(output)
+                finally:
+                    self._total_service += loop.time() - started_at
+            finally:
+                self._busy_workers -= 1
+                self._queue.task_done()
+
+    async def _run(self, args: List[str], data: bytes, timeout: float) -> bytes:
+        """Run one ffmpeg process asynchronously, killing it if it overruns the deadline"""
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+
+        try:
+            stdout_data, stderr_data = await asyncio.wait_for(process.communicate(input=data), timeout=timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise TranscodingTimeoutError(f"Audio conversion exceeded {timeout:.1f}s deadline")
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+
+        if process.returncode != 0:
+            print(f"FFmpeg error: {stderr_data.decode() if stderr_data else 'Unknown error'}")
+            raise TranscodingError("Failed to convert audio format")
+
+        return stdout_data
+
+    async def _run_stream(
+        self,
+        args: List[str],
+        chunks: AsyncIterator[bytes],
+        sink: Callable[[bytes], None],
+        timeout: float
+    ) -> int:
+        """Run one ffmpeg process, feeding stdin and draining stdout concurrently"""
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+
+        async def feed():
+            try:
+                async for chunk in chunks:
+                    process.stdin.write(chunk)
+                    await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # ffmpeg exited early; its return code and stderr explain why
+                pass
+            finally:
+                process.stdin.close()
+
+        async def drain() -> int:
+            produced = 0
+            while True:
+                block = await process.stdout.read(STREAM_READ_SIZE)
+                if not block:
+                    return produced
+                sink(block)
+                produced += len(block)
+
+        try:
+            _, produced, stderr_data = await _run_together([feed(), drain(), process.stderr.read()], timeout)
+            await process.wait()
+        except asyncio.TimeoutError:
+            raise TranscodingTimeoutError(f"Audio conversion exceeded {timeout:.1f}s deadline")
+        finally:
+            # Also on cancellation and errors raised by the input iterator (e.g. size limits)
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+        if process.returncode != 0:
+            print(f"FFmpeg error: {stderr_data.decode() if stderr_data else 'Unknown error'}")
+            raise TranscodingError("Failed to convert audio format")
+
+        return produced
+
+    def stats(self) -> Dict[str, float]:
+        """Queue depth, worker utilisation and job counters for monitoring"""
+        finished = self._counters["completed"] + self._counters["failed"] + self._counters["timed_out"]
+        return {
+            "workers": self.workers,
+            "busy_workers": self._busy_workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            **self._counters,
+            "avg_queue_wait_ms": round(self._total_wait / finished * 1000, 2) if finished else 0.0,
+            "avg_service_ms": round(self._total_service / finished * 1000, 2) if finished else 0.0
+        }
+
+
+transcoding_pool = TranscodingPool()
+
+# Live WebSocket decodes hold a worker for the whole conversation turn, so they get
+# their own workers and can never starve upload decodes; see speech.transcribe_live
+LIVE_TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_LIVE_WORKERS", "4"))
+live_transcoding_pool = TranscodingPool(workers=LIVE_TRANSCODE_WORKERS, max_queue=LIVE_TRANSCODE_WORKERS)
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from app.services.audio_formats import AudioFormat
+from app.services.tts_cache import make_cache_key
+
+# Bumped when the index layout changes; packs with another schema are ignored
+PACK_SCHEMA_VERSION = 1
+INDEX_FILENAME = "index.json"
+
+
+@dataclass(frozen=True)
+class AssetItem:
+    """One piece of known-ahead text to pre-synthesize with one voice"""
+    text: str
+    voice_name: str
+    language: str
+    source: str
+
+    def key(self, audio_format: AudioFormat) -> str:
+        return make_cache_key(self.text, self.voice_name, audio_format)
+
+
+def _atomic_write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class AssetPack:
+    """Read-only view of a pre-synthesized TTS asset pack
+
+    The pack is a directory holding ``index.json`` and one audio file per entry.
+    Entries are addressed with the same content key as the TTS cache, so any
+    synthesis of an identical (text, voice, format) is served from the pack.
+    Only the index is held in memory; audio files are read on demand.
+    """
+
+    def __init__(self, directory: str, index: Dict):
+        self.directory = directory
+        self.version = index.get("version")
+        self.entries: Dict[str, Dict] = index.get("entries", {})
+        self.hits = 0
+
+    @classmethod
+    def load(cls, directory: str) -> Optional['AssetPack']:
+        index_path = os.path.join(directory, INDEX_FILENAME)
+        try:
+            with open(index_path, "r", encoding="utf-8") as index_file:
+                index = json.load(index_file)
+        except FileNotFoundError:
+            print(f"No TTS asset pack index at {index_path}")
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Failed to read TTS asset pack index {index_path}: {e}")
+            return None
+
+        if index.get("schema") != PACK_SCHEMA_VERSION:
+            print(f"Ignoring TTS asset pack with schema {index.get('schema')} (expected {PACK_SCHEMA_VERSION})")
+            return None
+        return cls(directory, index)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, entry["file"]), "rb") as audio_file:
+                data = audio_file.read()
+        except OSError as e:
+            print(f"TTS asset pack file missing for {key}: {e}")
+            return None
+        self.hits += 1
+        return data
+
+    def stats(self) -> Dict[str, object]:
+        return {"directory": self.directory, "version": self.version, "entries": len(self.entries), "hits": self.hits}
+
+
+asset_pack: Optional[AssetPack] = None
+
+
+def load_asset_pack(directory: Optional[str] = None) -> Optional[AssetPack]:
+    """Load the pack from ``directory`` or TTS_ASSET_PACK_DIR and make it the active pack"""
+    global asset_pack
+    directory = directory or os.getenv("TTS_ASSET_PACK_DIR")
+    if not directory:
+        return None
+    asset_pack = AssetPack.load(directory)
+    if asset_pack is not None:
+        print(f"Loaded TTS asset pack {asset_pack.version} with {len(asset_pack)} entries from {directory}")
+    return asset_pack
+
+
+def _read_index(directory: str) -> Dict:
+    try:
+        with open(os.path.join(directory, INDEX_FILENAME), "r", encoding="utf-8") as index_file:
+            index = json.load(index_file)
+        if index.get("schema") == PACK_SCHEMA_VERSION:
+            return index
+    except (OSError, ValueError):
+        pass
+    return {"schema": PACK_SCHEMA_VERSION, "entries": {}}
+
+
+def _write_index(directory: str, index: Dict):
+    index["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    _atomic_write(
+        os.path.join(directory, INDEX_FILENAME),
+        json.dumps(index, ensure_ascii=False, indent=2, sort_keys=True).encode("utf-8")
+    )
+
+
+async def build_asset_pack(
+    items: Iterable[AssetItem],
+    directory: str,
+    audio_formats: List[AudioFormat],
+    synthesize: Callable[[AssetItem, AudioFormat], Awaitable[Optional[bytes]]],
+    version: str,
+    concurrency: int = 4,
+    checkpoint_every: int = 25
+) -> Dict[str, int]:
+    """Synthesize every item in every format into ``directory``
+
+    Entries already in the index whose file exists are skipped, and the index is
+    checkpointed as work completes, so an interrupted build resumes where it
+    stopped.
+
+    Args:
+        items (Iterable[AssetItem]): Texts and voices to synthesize
+        directory (str): Pack directory, created if missing
+        audio_formats (List[AudioFormat]): Output formats to produce
+        synthesize (Callable): Coroutine returning audio for one item and format
+        version (str): Pack version recorded in the index
+        concurrency (int): Maximum syntheses in flight
+        checkpoint_every (int): Index is rewritten after this many new entries
+
+    Returns:
+        Dict[str, int]: Counts of synthesized, skipped and failed entries
+    """
+    index = _read_index(directory)
+    index["version"] = version
+    index.setdefault("created_at", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+    entries = index["entries"]
+
+    pending = []
+    skipped = 0
+    seen = set()
+    for item in items:
+        for audio_format in audio_formats:
+            key = item.key(audio_format)
+            if key in seen:
+                continue
+            seen.add(key)
+            entry = entries.get(key)
+            if entry and os.path.exists(os.path.join(directory, entry["file"])):
+                skipped += 1
+                continue
+            pending.append((key, item, audio_format))
+
+    counts = {"synthesized": 0, "skipped": skipped, "failed": 0, "total": len(seen)}
+    print(f"TTS asset pack: {len(pending)} to synthesize, {skipped} already present")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    since_checkpoint = 0
+
+    async def run(key: str, item: AssetItem, audio_format: AudioFormat):
+        nonlocal since_checkpoint
+        async with semaphore:
+            try:
+                audio_data = await synthesize(item, audio_format)
+            except Exception as e:
+                print(f"Failed to synthesize [{item.voice_name}] {item.text[:60]!r}: {e}")
+                audio_data = None
+        if not audio_data:
+            counts["failed"] += 1
+            return
+
+        relative_path = os.path.join(key[:2], f"{key}.{audio_format.extension}")
+        await asyncio.to_thread(_atomic_write, os.path.join(directory, relative_path), audio_data)
+        entries[key] = {
+            "file": relative_path,
+            "text": item.text,
+            "voice_name": item.voice_name,
+            "language": item.language,
+            "source": item.source,
+            "format": audio_format.name,
+            "content_type": audio_format.content_type,
+            "bytes": len(audio_data)
+        }
+        counts["synthesized"] += 1
+        since_checkpoint += 1
+        if since_checkpoint >= checkpoint_every:
+            since_checkpoint = 0
+            await asyncio.to_thread(_write_index, directory, index)
+
+    os.makedirs(directory, exist_ok=True)
+    try:
+        await asyncio.gather(*(run(key, item, audio_format) for key, item, audio_format in pending))
+    finally:
+        _write_index(directory, index)
+    return counts
@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.services.audio_formats import AudioFormat
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so formatting-only differences in text or SSML share an entry"""
+    return " ".join(text.split())
+
+
+def make_cache_key(text: str, voice_name: str, audio_format: AudioFormat, prosody: str = "") -> str:
+    """Content address for one synthesis: normalized text/SSML, voice, prosody and output format"""
+    if not voice_name:
+        raise ValueError("A voice name is required to address synthesized audio")
+    material = "\0".join([voice_name, audio_format.name, prosody, normalize_text(text)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Two-tier cache for synthesized audio
+
+    The memory tier is an LRU bounded by ``max_bytes``. The optional disk tier under
+    ``cache_dir`` is shared by every worker process: entries are written to a temp
+    file and moved into place with ``os.replace``, so readers never see a partial
+    file. The disk tier is not size-managed; point it at a directory that can be
+    cleared independently.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, cache_dir: Optional[str] = None):
+        self.max_bytes = max_bytes or int(os.getenv("TTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+        self.cache_dir = cache_dir if cache_dir is not None else os.getenv("TTS_CACHE_DIR") or None
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "disk_writes": 0,
+            "disk_errors": 0
+        }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.audio")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Look the key up in memory, then on disk; disk hits are promoted to memory"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["disk_hits"] += 1
+        self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        self._remember(key, data)
+        self._write_disk(key, data)
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self._counters["evictions"] += 1
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as cached_file:
+                return cached_file.read() or None
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"TTS cache read failed for {key}: {e}")
+            self._counters["disk_errors"] += 1
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as temp_file:
+                    temp_file.write(data)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            self._counters["disk_writes"] += 1
+        except OSError as e:
+            print(f"TTS cache write failed for {key}: {e}")
+            self._counters["disk_errors"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self._counters["memory_hits"] + self._counters["disk_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "disk_enabled": bool(self.cache_dir),
+                **self._counters,
+                "hit_ratio": round(hits / lookups, 3) if lookups else 0.0
+            }
+
+
+tts_cache = TTSCache()
+
+# Misses currently being synthesized, so concurrent identical requests share one call
+_in_flight: Dict[str, asyncio.Future] = {}
+
+
+async def cached_synthesis(
+    text: str,
+    voice_name: str,
+    audio_format: AudioFormat,
+    synthesize: Callable[[], Awaitable[Optional[bytes]]],
+    prosody: str = ""
+) -> Optional[bytes]:
+    """Return cached audio for this synthesis, or run ``synthesize`` and cache its result
+
+    Misses in both cache tiers are looked up in the pre-built asset pack, if one is
+    loaded, before falling back to Azure.
+
+    Args:
+        text (str): Plain text or SSML being synthesized
+        voice_name (str): Azure voice name
+        audio_format (AudioFormat): Output format
+        synthesize (Callable): Coroutine factory that calls Azure on a miss
+        prosody (str): Any prosody settings applied outside ``text``
+
+    Returns:
+        Optional[bytes]: Audio bytes, or whatever ``synthesize`` returned on failure
+    """
+    key = make_cache_key(text, voice_name, audio_format, prosody)
+    if tts_cache.cache_dir:
+        cached = await asyncio.to_thread(tts_cache.get, key)
+    else:
+        cached = tts_cache.get(key)
+    if cached is not None:
+        return cached
+
+    from app.services import tts_assets
+    if tts_assets.asset_pack is not None and key in tts_assets.asset_pack:
+        packed = await asyncio.to_thread(tts_assets.asset_pack.get, key)
+        if packed is not None:
+            return packed
+
+    pending = _in_flight.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[key] = future
+    try:
+        audio_data = await synthesize()
+        if audio_data:
+            if tts_cache.cache_dir:
+                await asyncio.to_thread(tts_cache.put, key, audio_data)
+            else:
+                tts_cache.put(key, audio_data)
+        future.set_result(audio_data)
+        return audio_data
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Waiters re-raise it; mark it retrieved so it is not reported as unhandled
+        future.exception()
+        raise
+    finally:
+        _in_flight.pop(key, None)
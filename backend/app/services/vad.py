@@ -0,0 +1,185 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.services.audio_buffer import AudioBuffer
+
+
+@dataclass
+class SpeechSegment:
+    """A stretch of speech, in seconds from the start of the clip"""
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class SpeechMap:
+    """Speech segments found in a clip plus the per-frame features they came from.
+
+    Computed once per clip so that trimming, silence rejection, long-clip chunking
+    and pause metrics can all reuse it instead of rescanning the samples.
+    """
+    segments: List[SpeechSegment]
+    duration: float
+    hop_seconds: float
+    frame_rms: np.ndarray = field(repr=False)
+    frame_zcr: np.ndarray = field(repr=False)
+
+    @property
+    def has_speech(self) -> bool:
+        return bool(self.segments)
+
+    @property
+    def speech_duration(self) -> float:
+        return sum(segment.duration for segment in self.segments)
+
+    @property
+    def speech_ratio(self) -> float:
+        return self.speech_duration / self.duration if self.duration > 0 else 0.0
+
+    def is_mostly_silence(self, min_speech_seconds: float = 0.1) -> bool:
+        return self.speech_duration < min_speech_seconds
+
+    def bounds(self, padding: float = 0.0) -> Optional[Tuple[float, float]]:
+        """Start and end of speech in seconds, widened by ``padding`` on each side"""
+        if not self.segments:
+            return None
+        return (
+            max(0.0, self.segments[0].start - padding),
+            min(self.duration, self.segments[-1].end + padding)
+        )
+
+    def pauses(self) -> List[SpeechSegment]:
+        """Silent gaps between consecutive speech segments"""
+        return [
+            SpeechSegment(previous.end, current.start)
+            for previous, current in zip(self.segments, self.segments[1:])
+        ]
+
+    def pause_metrics(self) -> Dict[str, float]:
+        """Local fluency indicators derived from the segment map"""
+        pauses = [pause.duration for pause in self.pauses()]
+        return {
+            "speech_seconds": round(self.speech_duration, 3),
+            "speech_ratio": round(self.speech_ratio, 3),
+            "segment_count": len(self.segments),
+            "pause_count": len(pauses),
+            "mean_pause_seconds": round(float(np.mean(pauses)), 3) if pauses else 0.0,
+            "longest_pause_seconds": round(max(pauses), 3) if pauses else 0.0
+        }
+
+    def utterances(self, count: int, padding: float = 0.1) -> List[Tuple[float, float]]:
+        """Group the speech into at most ``count`` utterances by cutting at the longest pauses
+
+        Used to split one recording of a word list into one span per word.
+        """
+        if not self.segments or count < 1:
+            return []
+        pauses = self.pauses()
+        longest = sorted(range(len(pauses)), key=lambda i: pauses[i].duration, reverse=True)[:count - 1]
+        spans = []
+        start = self.segments[0].start
+        for i in sorted(longest):
+            spans.append((start, self.segments[i].end))
+            start = self.segments[i + 1].start
+        spans.append((start, self.segments[-1].end))
+        return [(max(0.0, begin - padding), min(self.duration, end + padding)) for begin, end in spans]
+
+    def chunks(self, max_seconds: float = 15.0) -> List[Tuple[float, float]]:
+        """Split the speech into chunks no longer than ``max_seconds``, cutting inside pauses"""
+        chunks = []
+        for segment in self.segments:
+            if chunks and segment.end - chunks[-1][0] <= max_seconds:
+                chunks[-1] = (chunks[-1][0], segment.end)
+                continue
+            # Segments longer than the limit are cut at fixed intervals
+            start = segment.start
+            while segment.end - start > max_seconds:
+                chunks.append((start, start + max_seconds))
+                start += max_seconds
+            chunks.append((start, segment.end))
+        return chunks
+
+
+def _runs(mask: np.ndarray) -> np.ndarray:
+    """(start, end) frame index pairs of every run of True values"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.column_stack((np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def detect_speech(
+    audio: AudioBuffer,
+    frame_ms: float = 25.0,
+    hop_ms: float = 10.0,
+    rms_threshold: float = 500 / 32768.0,
+    noise_factor: float = 3.0,
+    zcr_threshold: float = 0.25,
+    min_speech_ms: float = 60.0,
+    min_silence_ms: float = 200.0
+) -> SpeechMap:
+    """Frame-energy and zero-crossing voice activity detection over a whole clip
+
+    A frame counts as speech when its RMS clears both ``rms_threshold`` and
+    ``noise_factor`` times the estimated noise floor. Quieter frames with a high
+    zero-crossing rate (fricatives such as 's' or 'f') count when they clear half
+    that threshold. Gaps shorter than ``min_silence_ms`` are bridged and bursts
+    shorter than ``min_speech_ms`` are dropped.
+
+    Args:
+        audio (AudioBuffer): Decoded audio, any rate or channel count
+        frame_ms (float): Analysis window length
+        hop_ms (float): Step between windows
+        rms_threshold (float): Absolute RMS floor for speech, in full-scale units
+        noise_factor (float): Multiple of the noise floor a frame must exceed
+        zcr_threshold (float): Zero-crossing rate above which quiet frames may be unvoiced speech
+        min_speech_ms (float): Shortest burst kept as speech
+        min_silence_ms (float): Shortest gap kept as a pause
+
+    Returns:
+        SpeechMap: Segments with timestamps and the per-frame features
+    """
+    mono = audio.to_mono().to_float32()
+    samples = mono.samples
+    sample_rate = mono.sample_rate
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    hop = max(1, int(sample_rate * hop_ms / 1000))
+    hop_seconds = hop / float(sample_rate)
+
+    if len(samples) < frame:
+        empty = np.zeros(0, dtype=np.float32)
+        return SpeechMap([], mono.duration, hop_seconds, empty, empty)
+
+    # Strided (frames, frame) view over the samples; no copy is made here
+    windows = sliding_window_view(samples, frame)[::hop]
+    frame_rms = np.sqrt(np.mean(np.square(windows, dtype=np.float64), axis=1)).astype(np.float32)
+    signs = np.signbit(windows)
+    frame_zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1).astype(np.float32)
+
+    noise_floor = float(np.percentile(frame_rms, 10))
+    threshold = max(rms_threshold, noise_floor * noise_factor)
+    speech = (frame_rms > threshold) | ((frame_rms > threshold * 0.5) & (frame_zcr > zcr_threshold))
+
+    # Bridge short pauses, then drop short bursts
+    min_silence_frames = int(round(min_silence_ms / hop_ms))
+    for start, end in _runs(~speech):
+        if start > 0 and end < len(speech) and end - start < min_silence_frames:
+            speech[start:end] = True
+    min_speech_frames = int(round(min_speech_ms / hop_ms))
+    for start, end in _runs(speech):
+        if end - start < min_speech_frames:
+            speech[start:end] = False
+
+    segments = [
+        SpeechSegment(
+            start=round(float(start) * hop_seconds, 3),
+            end=round(min(mono.duration, float(end - 1) * hop_seconds + frame / float(sample_rate)), 3)
+        )
+        for start, end in _runs(speech)
+    ]
+    return SpeechMap(segments, mono.duration, hop_seconds, frame_rms, frame_zcr)
@@ -0,0 +1,122 @@
+"""Build or refresh reference_embeddings.json for the local accent classifier
+
+Every clip is run through the same preprocessing as live accent detection,
+turned into an acoustic embedding, and each accent's embeddings are reduced
+to the statistics the "embedding" strategy compares against.
+
+The recordings directory has one subdirectory per accent, named like the
+detector's accents (American, British, Australian, Indian), holding the clips.
+Clips may also sit one directory deeper, one subdirectory per speaker.
+Accents found in the directory replace their previous statistics; the others
+already in the file are kept, so one accent can be refreshed on its own.
+
+With --store, every clip's embedding is also kept as its own row in the binary
+reference store (see embedding_store.py), labelled with its accent and speaker,
+and --clusters adds a clustered index for large stores. Refreshing an accent in
+an existing store keeps that store's standardisation.
+
+Usage:
+    python build_reference_embeddings.py recordings/
+    python build_reference_embeddings.py recordings/ --accent British --output reference_embeddings.json
+    python build_reference_embeddings.py recordings/ --store reference_store --clusters 64
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.modules.accent_detection.accent_detector import AccentDetector
+from app.modules.accent_detection.embedding_store import EmbeddingStore
+from app.modules.accent_detection.embeddings import REFERENCE_EMBEDDINGS_PATH, ReferenceEmbeddings, extract_embedding
+from app.services.audio_buffer import AudioBuffer
+
+AUDIO_EXTENSIONS = (".wav", ".webm", ".ogg", ".mp3", ".m4a")
+
+
+def embed_file(path: str) -> Optional[np.ndarray]:
+    """Embedding of one clip after live-detection preprocessing, None if it has no usable speech"""
+    with open(path, "rb") as f:
+        wav_data = AccentDetector._ensure_wav_format(f.read())
+    audio = AudioBuffer.from_wav_bytes(wav_data or b"")
+    if audio is None:
+        return None
+    processed = AccentDetector._preprocess_audio(audio)
+    return extract_embedding(processed) if processed is not None else None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build reference embeddings for the local accent classifier")
+    parser.add_argument("recordings", help="Directory with one subdirectory of clips per accent")
+    parser.add_argument("--output", default=REFERENCE_EMBEDDINGS_PATH, help="Reference file to write")
+    parser.add_argument("--accent", action="append", help="Only rebuild this accent, repeatable (default: every subdirectory)")
+    parser.add_argument("--store", help="Also write every clip's embedding to this binary reference store")
+    parser.add_argument("--clusters", type=int, default=0, help="Clusters to index the store with (default: none, brute-force search)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Clips embedded in parallel")
+    return parser.parse_args()
+
+
+def clips_for(directory: str) -> List[Tuple[str, str]]:
+    """(path, speaker) of every clip; a clip's speaker is its subdirectory, or its own name at the top level"""
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path):
+            clips.extend((os.path.join(path, clip), name) for clip in sorted(os.listdir(path)) if clip.lower().endswith(AUDIO_EXTENSIONS))
+        elif name.lower().endswith(AUDIO_EXTENSIONS):
+            clips.append((path, os.path.splitext(name)[0]))
+    return clips
+
+
+def build_store(path: str, rebuilt: List[str], rows: List[Tuple[np.ndarray, str, str]], clusters: int) -> EmbeddingStore:
+    """The store at ``path`` with the rebuilt accents' rows replaced"""
+    embeddings, accents, speakers = zip(*rows)
+    existing = EmbeddingStore.open(path)
+    if existing.is_empty or set(existing.accents) <= set(rebuilt):
+        store = EmbeddingStore.build(np.stack(embeddings), accents, speakers)
+    else:
+        added = EmbeddingStore.build(np.stack(embeddings), accents, speakers, existing.center, existing.scale)
+        store = existing.without_accents(rebuilt).extend(added)
+    return store.clustered(clusters) if clusters else store
+
+
+async def main():
+    args = parse_args()
+    logging.disable(logging.WARNING)
+    accents = args.accent or sorted(
+        name for name in os.listdir(args.recordings) if os.path.isdir(os.path.join(args.recordings, name))
+    )
+    references = ReferenceEmbeddings.load(args.output)
+
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for accent in accents:
+            clips = clips_for(os.path.join(args.recordings, accent))
+            embeddings = await asyncio.gather(*(loop.run_in_executor(executor, embed_file, path) for path, _ in clips))
+            usable = [(embedding, accent, f"{accent}/{speaker}") for embedding, (_, speaker) in zip(embeddings, clips) if embedding is not None]
+            print(f"{accent}: {len(usable)} of {len(clips)} clips usable")
+            if usable:
+                references.update(accent, np.stack([embedding for embedding, _, _ in usable]))
+                rows.extend(usable)
+
+    if references.is_empty:
+        print("No usable clips, nothing written")
+        return 1
+    references.save(args.output)
+    print(f"Wrote {len(references.accents)} accents to {args.output} in {time.monotonic() - started:.1f}s")
+    if args.store and rows:
+        store = build_store(args.store, accents, rows, args.clusters)
+        store.save(args.store)
+        print(f"Wrote {len(store)} embeddings of {len(store.speakers)} speakers to {args.store}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
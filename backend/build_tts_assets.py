@@ -0,0 +1,189 @@
+"""Build the offline TTS asset pack
+
+Enumerates every piece of spoken text that is known ahead of time (conversation
+openers, topic prompts and practice words), synthesizes each one with every voice
+that can speak it, and writes a versioned pack the server loads at startup from
+TTS_ASSET_PACK_DIR.
+
+Usage:
+    python build_tts_assets.py --output tts_assets
+    python build_tts_assets.py --output tts_assets --format wav --format opus --languages en,fr
+
+Re-running against the same directory only synthesizes what is missing.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterator, List
+
+from app.routers.coach import VOICE_GENDERS, VOICE_MAPPING, build_initial_message
+from app.services import conversation
+from app.services.audio_formats import AUDIO_FORMATS, DEFAULT_AUDIO_FORMAT, AudioFormat
+from app.services.speech_backend import SPEECH_BACKEND, SpeechBackendError, get_speech_backend
+from app.services.speech_pool import speech_pool
+from app.services.topics import TopicManager as AdultTopicManager
+from app.services.tts_assets import AssetItem, build_asset_pack
+from app.topics.manager import TopicManager as KidsTopicManager
+
+SOURCES = ("initial", "greetings", "topics", "words")
+
+WORD_DETECTIVE_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "data", "wordDetectiveData.ts")
+
+# Child voices the kids games speak practice words with, on top of the coach voices
+KID_VOICES = {
+    "en": ["en-US-AnaNeural", "en-GB-MaisieNeural", "en-AU-CarlyNeural"]
+}
+
+
+def conversation_voices(languages: List[str]) -> Iterator[tuple]:
+    """(language, accent, voice) for every coach voice in the selected languages"""
+    for language, accents in VOICE_MAPPING.items():
+        if language not in languages:
+            continue
+        for accent, voices in accents.items():
+            for voice_name in voices.values():
+                yield language, accent, voice_name
+
+
+def voices_for_language(language: str) -> List[str]:
+    voices = [voice_name for _, _, voice_name in conversation_voices([language])]
+    return list(dict.fromkeys(voices + KID_VOICES.get(language, [])))
+
+
+def topic_ids() -> List[tuple]:
+    """(topic_id, is_kids_mode) pairs whose opening message is deterministic"""
+    kids = [(topic_id, True) for topic_id in KidsTopicManager().topics]
+    adults = [(topic_id, False) for topic_id in AdultTopicManager().topics]
+    return kids + adults
+
+
+async def initial_message_items(languages: List[str]) -> List[AssetItem]:
+    """Openers exactly as /start-conversation builds them"""
+    items = []
+    for language, accent, voice_name in conversation_voices(languages):
+        for topic_id, is_kids_mode in topic_ids():
+            data = await build_initial_message(language, accent, voice_name, topic_id, is_kids_mode)
+            items.append(AssetItem(data["message"], voice_name, language, "initial"))
+    return items
+
+
+async def greeting_items(languages: List[str]) -> List[AssetItem]:
+    """Greeting templates from the conversation service"""
+    items = []
+    for language, accent, voice_name in conversation_voices(languages):
+        gender = VOICE_GENDERS.get(voice_name, 'female')
+        for topic_id, is_kids_mode in topic_ids():
+            data = await conversation.generate_initial_message(language, accent, gender, topic_id, is_kids_mode)
+            items.append(AssetItem(data["message"], voice_name, language, "greetings"))
+    return items
+
+
+def topic_prompt_items(languages: List[str]) -> List[AssetItem]:
+    """Initial and follow-up prompts of both topic managers"""
+    items = []
+    for manager in (KidsTopicManager(), AdultTopicManager()):
+        for topic in manager.topics.values():
+            for prompts in (topic.initial_prompt, topic.follow_up_prompt):
+                # Adult follow-ups are plain English strings
+                if isinstance(prompts, str):
+                    prompts = {"en": prompts}
+                for language, text in prompts.items():
+                    if language not in languages:
+                        continue
+                    for voice_name in voices_for_language(language):
+                        items.append(AssetItem(text, voice_name, language, "topics"))
+    return items
+
+
+def load_words(words_file: str) -> List[str]:
+    """Practice words from a plain list (one per line) or the Word Detective data module"""
+    with open(words_file, "r", encoding="utf-8") as f:
+        content = f.read()
+    if words_file.endswith((".ts", ".tsx", ".js")):
+        return re.findall(r"\bword:\s*['\"]([^'\"]+)['\"]", content)
+    return [line.strip() for line in content.splitlines() if line.strip()]
+
+
+def word_items(words: List[str], languages: List[str]) -> List[AssetItem]:
+    # The word games are English only
+    if "en" not in languages:
+        return []
+    return [AssetItem(word, voice_name, "en", "words") for word in words for voice_name in voices_for_language("en")]
+
+
+async def collect_items(sources: List[str], languages: List[str], words_file: str) -> List[AssetItem]:
+    items = []
+    # The message builders log every step; keep the build output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        if "initial" in sources:
+            items += await initial_message_items(languages)
+        if "greetings" in sources:
+            items += await greeting_items(languages)
+    if "topics" in sources:
+        items += topic_prompt_items(languages)
+    if "words" in sources:
+        items += word_items(load_words(words_file), languages)
+
+    counts: Dict[str, int] = {}
+    for item in items:
+        counts[item.source] = counts.get(item.source, 0) + 1
+    for source, count in counts.items():
+        print(f"{source}: {count} texts")
+    return items
+
+
+async def synthesize(item: AssetItem, audio_format: AudioFormat):
+    """Same synthesis path as speech.generate_speech, so the audio matches what the server would produce"""
+    try:
+        return await get_speech_backend().synthesize(item.text, item.voice_name, audio_format)
+    except SpeechBackendError as e:
+        print(f"Synthesis failed for [{item.voice_name}] {item.text[:60]!r}: {e}")
+        return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pre-synthesize known-ahead speech into a TTS asset pack")
+    parser.add_argument("--output", default=os.getenv("TTS_ASSET_PACK_DIR", "tts_assets"), help="Pack directory")
+    parser.add_argument("--version", default=time.strftime("%Y%m%d%H%M%S"), help="Version recorded in the pack index")
+    parser.add_argument("--format", action="append", choices=sorted(AUDIO_FORMATS), help="Output format, repeatable (default: server default)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Syntheses in flight at once")
+    parser.add_argument("--languages", default=",".join(VOICE_MAPPING), help="Comma-separated language codes")
+    parser.add_argument("--sources", default=",".join(SOURCES), help=f"Comma-separated subset of {', '.join(SOURCES)}")
+    parser.add_argument("--words-file", default=WORD_DETECTIVE_DATA, help="Word list, or the Word Detective data module")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be synthesized")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    languages = [language.strip() for language in args.languages.split(",") if language.strip()]
+    sources = [source.strip() for source in args.sources.split(",") if source.strip()]
+    unknown = set(sources) - set(SOURCES)
+    if unknown:
+        print(f"Unknown sources: {', '.join(sorted(unknown))}")
+        return 2
+
+    audio_formats = [AUDIO_FORMATS[name] for name in args.format] if args.format else [DEFAULT_AUDIO_FORMAT]
+    items = await collect_items(sources, languages, args.words_file)
+    if args.dry_run:
+        unique = {item.key(audio_format) for item in items for audio_format in audio_formats}
+        print(f"{len(unique)} unique syntheses across {len(audio_formats)} format(s)")
+        return 0
+
+    if SPEECH_BACKEND == "azure":
+        # Fail before queueing anything when credentials are missing
+        speech_pool.config()
+    # Keep one warm synthesizer per in-flight synthesis
+    speech_pool.size = max(speech_pool.size, args.concurrency)
+    counts = await build_asset_pack(items, args.output, audio_formats, synthesize, args.version, args.concurrency)
+    print(f"Asset pack {args.version} in {args.output}: {counts}")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,132 @@
+"""Compare the accent-detection strategies on a labelled corpus
+
+Runs every clip through AccentDetector.detect_accent once per strategy
+("per_locale": one recognition per candidate locale, "identify": a single
+recognition with language identification, "embedding": the local acoustic
+classifier) and reports top-1 accuracy, latency, speech service calls per
+detection and, for two strategies, how often they agree.
+
+The corpus is a directory with one subdirectory per accent, named like the
+detector's accents (American, British, Australian, Indian), holding the clips.
+
+Usage:
+    python compare_accent_strategies.py corpus/
+    python compare_accent_strategies.py corpus/ --limit 20 --json results.json
+
+Set SPEECH_BACKEND=local to exercise the harness without an Azure key.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from app.modules.accent_detection.accent_detector import ACCENT_DETECTION_STRATEGIES, AccentDetector
+from app.services.speech_gateway import RECOGNITION, speech_gateway
+
+AUDIO_EXTENSIONS = (".wav", ".webm", ".ogg", ".mp3", ".m4a")
+
+
+def load_corpus(directory: str, accents: List[str], limit: int) -> List[Tuple[str, str]]:
+    """(path, accent) for every clip under a directory named after a known accent"""
+    clips = []
+    for accent in sorted(os.listdir(directory)):
+        accent_dir = os.path.join(directory, accent)
+        if not os.path.isdir(accent_dir):
+            continue
+        if accent not in accents:
+            print(f"Skipping {accent_dir}: not one of {', '.join(accents)}")
+            continue
+        names = sorted(name for name in os.listdir(accent_dir) if name.lower().endswith(AUDIO_EXTENSIONS))
+        clips.extend((os.path.join(accent_dir, name), accent) for name in names[:limit or None])
+    return clips
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def run_strategy(detector: AccentDetector, strategy: str, clips: List[Tuple[str, str]]) -> List[Dict]:
+    results = []
+    for path, accent in clips:
+        with open(path, "rb") as f:
+            audio_data = f.read()
+        calls_before = speech_gateway.stats()[RECOGNITION]["submitted"]
+        started = time.monotonic()
+        try:
+            probabilities = await detector.detect_accent(audio_data, strategy)
+            error = None
+        except Exception as e:
+            probabilities, error = {}, str(e)
+        elapsed = time.monotonic() - started
+        predicted = next(iter(probabilities), None)
+        results.append({
+            "path": path,
+            "accent": accent,
+            "predicted": predicted,
+            "probabilities": probabilities,
+            "seconds": round(elapsed, 3),
+            "service_calls": speech_gateway.stats()[RECOGNITION]["submitted"] - calls_before,
+            "error": error
+        })
+    return results
+
+
+def summarize(results: List[Dict]) -> Dict:
+    seconds = [result["seconds"] for result in results]
+    correct = sum(result["predicted"] == result["accent"] for result in results)
+    return {
+        "clips": len(results),
+        "accuracy": round(correct / len(results), 3) if results else 0.0,
+        "errors": sum(result["error"] is not None for result in results),
+        "mean_seconds": round(sum(seconds) / len(seconds), 3) if seconds else 0.0,
+        "p50_seconds": round(percentile(seconds, 0.5), 3),
+        "p95_seconds": round(percentile(seconds, 0.95), 3),
+        "service_calls_per_detection": round(sum(r["service_calls"] for r in results) / len(results), 2) if results else 0.0
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare accent-detection strategies on a labelled corpus")
+    parser.add_argument("corpus", help="Directory with one subdirectory of clips per accent")
+    parser.add_argument("--strategy", action="append", choices=ACCENT_DETECTION_STRATEGIES, help="Strategy to run, repeatable (default: all)")
+    parser.add_argument("--limit", type=int, default=0, help="Clips per accent (default: all)")
+    parser.add_argument("--json", help="Write per-clip results and summaries to this file")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    logging.disable(logging.INFO)
+    detector = AccentDetector()
+    clips = load_corpus(args.corpus, list(detector.accent_configs), args.limit)
+    if not clips:
+        print(f"No clips found under {args.corpus}")
+        return 2
+    print(f"{len(clips)} clips")
+
+    strategies = args.strategy or list(ACCENT_DETECTION_STRATEGIES)
+    results = {strategy: await run_strategy(detector, strategy, clips) for strategy in strategies}
+    summaries = {strategy: summarize(strategy_results) for strategy, strategy_results in results.items()}
+
+    for strategy, summary in summaries.items():
+        print(f"{strategy}: " + ", ".join(f"{key}={value}" for key, value in summary.items()))
+    if len(strategies) == 2:
+        first, second = (results[strategy] for strategy in strategies)
+        agreement = sum(a["predicted"] == b["predicted"] for a, b in zip(first, second)) / len(clips)
+        print(f"agreement: {agreement:.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"summaries": summaries, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
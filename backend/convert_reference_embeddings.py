@@ -0,0 +1,41 @@
+"""Convert reference_embeddings.json to the binary reference store
+
+Each accent's centroid becomes one row, standardised the same way, so the
+converted store scores clips exactly as the JSON file did. Clip-level rows
+come from build_reference_embeddings.py --store.
+
+Usage:
+    python convert_reference_embeddings.py
+    python convert_reference_embeddings.py reference_embeddings.json reference_store --clusters 4
+"""
+import argparse
+import sys
+
+from app.modules.accent_detection.embedding_store import REFERENCE_STORE_PATH, EmbeddingStore
+from app.modules.accent_detection.embeddings import REFERENCE_EMBEDDINGS_PATH, ReferenceEmbeddings
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert reference_embeddings.json to the binary reference store")
+    parser.add_argument("source", nargs="?", default=REFERENCE_EMBEDDINGS_PATH, help="JSON reference file")
+    parser.add_argument("store", nargs="?", default=REFERENCE_STORE_PATH, help="Store directory to write")
+    parser.add_argument("--clusters", type=int, default=0, help="Clusters to index the store with (default: none)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    references = ReferenceEmbeddings.load(args.source)
+    if references.is_empty:
+        print(f"No references in {args.source}, nothing written")
+        return 1
+    store = EmbeddingStore.from_references(references)
+    if args.clusters:
+        store = store.clustered(args.clusters)
+    store.save(args.store)
+    print(f"Wrote {len(store)} embeddings to {args.store}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+
+# Tests run against the in-process stand-in, never Azure
+os.environ.setdefault("SPEECH_BACKEND", "local")
+os.environ.setdefault("AZURE_SPEECH_KEY", "test")
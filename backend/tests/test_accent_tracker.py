@@ -0,0 +1,47 @@
+import math
+
+import pytest
+
+from app.modules.accent_detection.accent_tracker import MIN_TURN_PROBABILITY, AccentEstimate
+
+
+def uniform_estimate():
+    return AccentEstimate({"american": math.log(0.5), "british": math.log(0.5)})
+
+
+def test_update_accumulates_evidence():
+    estimate = uniform_estimate()
+    estimate.update({"american": 0.8, "british": 0.2}, weight=1.0)
+    assert estimate.posterior()["american"] == pytest.approx(0.8)
+    estimate.update({"american": 0.8, "british": 0.2}, weight=1.0)
+    assert estimate.posterior()["american"] == pytest.approx(0.64 / 0.68)
+    assert estimate.turns == 2
+    assert max(estimate.log_posterior.values()) == 0
+
+
+def test_update_accepts_scores_on_any_scale():
+    percentages, fractions = uniform_estimate(), uniform_estimate()
+    percentages.update({"american": 30, "british": 70}, weight=0.5)
+    fractions.update({"american": 0.3, "british": 0.7}, weight=0.5)
+    assert percentages.posterior() == pytest.approx(fractions.posterior())
+
+
+def test_one_turn_never_rules_an_accent_out():
+    estimate = uniform_estimate()
+    estimate.update({"american": 1.0}, weight=1.0)
+    assert estimate.posterior()["british"] == pytest.approx(MIN_TURN_PROBABILITY / (1 + MIN_TURN_PROBABILITY))
+
+
+def test_no_evidence_is_ignored():
+    estimate = uniform_estimate()
+    estimate.update({"american": 0.0, "british": 0.0}, weight=1.0)
+    estimate.update({"australian": 1.0}, weight=1.0)
+    assert estimate.turns == 0
+    assert estimate.confidence == pytest.approx(0.5)
+
+
+def test_percentages_are_ordered():
+    estimate = uniform_estimate()
+    estimate.update({"american": 0.1, "british": 0.9}, weight=1.0)
+    assert list(estimate.percentages()) == ["british", "american"]
+    assert sum(estimate.percentages().values()) == pytest.approx(100)
@@ -0,0 +1,60 @@
+"""End-to-end requests against the app with the local speech backend (see conftest.py)"""
+import asyncio
+import base64
+
+import httpx
+
+from app import main
+
+COACH = "/api/coach/api/coach"
+
+
+def run_app(scenario):
+    async def run():
+        await main.startup_event()
+        try:
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+                return await scenario(client)
+        finally:
+            await main.shutdown_event()
+
+    return asyncio.run(run())
+
+
+def test_root():
+    async def scenario(client):
+        return await client.get("/")
+
+    response = run_app(scenario)
+    assert response.status_code == 200
+    assert response.json() == {"message": "Accent Improver Backend"}
+
+
+def test_generate_speech_without_a_voice():
+    async def scenario(client):
+        return await client.post(f"{COACH}/generate-speech", data={"text": "Hello there"})
+
+    body = run_app(scenario).json()
+    assert body["voice_name"] == "en-US-JennyNeural"
+    assert "error" not in body
+    assert base64.b64decode(body["audio"])[:4] == b"RIFF"
+
+
+def test_generate_speech_by_handle_serves_ranges():
+    async def scenario(client):
+        speech = (await client.post(
+            f"{COACH}/generate-speech",
+            data={"text": "Hello there", "voice_name": "female", "audio_delivery": "handle"}
+        )).json()
+        whole = await client.get(speech["audio_url"])
+        part = await client.get(speech["audio_url"], headers={"Range": "bytes=0-3"})
+        past_end = await client.get(speech["audio_url"], headers={"Range": f"bytes={len(whole.content)}-"})
+        return whole, part, past_end
+
+    whole, part, past_end = run_app(scenario)
+    assert whole.status_code == 200
+    assert part.status_code == 206
+    assert part.content == b"RIFF"
+    assert part.headers["content-range"] == f"bytes 0-3/{len(whole.content)}"
+    assert past_end.status_code == 416
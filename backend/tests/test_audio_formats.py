@@ -0,0 +1,25 @@
+from app.services.audio_formats import DEFAULT_AUDIO_FORMAT, negotiate_audio_format
+
+
+def test_explicit_format_wins_over_accept():
+    assert negotiate_audio_format("MP3", "audio/ogg").name == "mp3"
+
+
+def test_unknown_explicit_format_falls_through_to_accept():
+    assert negotiate_audio_format("flac", "audio/ogg").name == "opus"
+
+
+def test_accept_quality_order():
+    assert negotiate_audio_format(None, "audio/mpeg;q=0.5, audio/webm;q=0.9").name == "webm-opus"
+    assert negotiate_audio_format(None, "audio/mpeg, audio/webm").name == "mp3"
+
+
+def test_l16_rate():
+    assert negotiate_audio_format(None, "audio/L16; rate=24000").name == "pcm-24k"
+    assert negotiate_audio_format(None, "audio/L16").name == "pcm-16k"
+
+
+def test_zero_quality_and_unsupported_types_fall_back():
+    assert negotiate_audio_format(None, "audio/mpeg;q=0") is DEFAULT_AUDIO_FORMAT
+    assert negotiate_audio_format(None, "application/json, */*") is DEFAULT_AUDIO_FORMAT
+    assert negotiate_audio_format() is DEFAULT_AUDIO_FORMAT
@@ -0,0 +1,41 @@
+from app.services.response_stream import ResponseStreamParser
+
+
+def feed_all(parser, deltas):
+    events = []
+    for delta in deltas:
+        events += parser.feed(delta)
+    return events + parser.finish()
+
+
+def test_sentences_are_reported_while_the_response_is_written():
+    parser = ResponseStreamParser()
+    assert parser.feed("Response: Hello there") == []
+    assert parser.feed(".") == []
+    assert parser.feed(" How are") == [("sentence", "Hello there.")]
+    assert parser.feed(" you? Fine") == [("sentence", "How are you?")]
+    assert parser.finish() == [("sentence", "Fine"), ("message", "Hello there. How are you? Fine")]
+
+
+def test_fields_are_reported_once_their_line_is_complete():
+    events = feed_all(ResponseStreamParser(), ["Grammar: ['ok']\nExpla", "nation: Because.\nResponse: Yes.\n"])
+    assert events == [
+        ("grammar_feedback", "ok"),
+        ("explanation", "Because."),
+        ("sentence", "Yes."),
+        ("message", "Yes."),
+    ]
+
+
+def test_arbitrary_delta_boundaries_give_the_same_events():
+    text = "Grammar: Good\nResponse: First one. Second one! Third\nCreative: Nice\n"
+    whole = feed_all(ResponseStreamParser(), [text])
+    by_character = feed_all(ResponseStreamParser(), list(text))
+    assert by_character == whole
+    assert [value for name, value in whole if name == "sentence"] == ["First one.", "Second one!", "Third"]
+
+
+def test_localized_prefixes():
+    events = feed_all(ResponseStreamParser(), ["Réponse : Bonjour. Ça va ?\n"])
+    assert ("message", "Bonjour. Ça va ?") in events
+    assert ("sentence", "Bonjour.") in events
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.speech_gateway import (
+    RECOGNITION, SpeechGateway, SpeechGatewayBusyError, SpeechGatewayTimeoutError
+)
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    monkeypatch.setenv("SPEECH_RECOGNITION_MAX_IN_FLIGHT", "1")
+    gateway = SpeechGateway(workers=2, max_waiting=1)
+    yield gateway
+    gateway.close()
+
+
+def test_in_flight_calls_are_capped(gateway):
+    async def main():
+        running = peak = 0
+
+        def work():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            time.sleep(0.02)
+            running -= 1
+
+        await asyncio.gather(gateway.run(RECOGNITION, work), gateway.run(RECOGNITION, work))
+        return peak
+
+    assert asyncio.run(main()) == 1
+
+
+def test_waiters_beyond_the_limit_are_rejected(gateway):
+    async def main():
+        holder = asyncio.ensure_future(gateway.run(RECOGNITION, time.sleep, 0.1))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(gateway.run(RECOGNITION, time.sleep, 0))
+        await asyncio.sleep(0.01)
+        with pytest.raises(SpeechGatewayBusyError):
+            await gateway.run(RECOGNITION, time.sleep, 0)
+        await asyncio.gather(holder, waiter)
+
+    asyncio.run(main())
+    assert gateway.stats()[RECOGNITION]["rejected"] == 1
+
+
+def test_slot_wait_counts_towards_the_deadline(gateway):
+    async def main():
+        holder = asyncio.ensure_future(gateway.run(RECOGNITION, time.sleep, 0.2))
+        await asyncio.sleep(0.01)
+        with pytest.raises(SpeechGatewayTimeoutError):
+            await gateway.run(RECOGNITION, time.sleep, 0, timeout=0.05)
+        await holder
+        return gateway._operations[RECOGNITION]
+
+    state = asyncio.run(main())
+    assert state.in_flight == 0
+    assert state.semaphore._value == state.limit
+
+
+def test_call_deadline_keeps_the_slot_until_the_thread_is_free(gateway):
+    async def main():
+        with pytest.raises(SpeechGatewayTimeoutError):
+            await gateway.run(RECOGNITION, time.sleep, 0.1, timeout=0.02)
+        state = gateway._operations[RECOGNITION]
+        held = state.in_flight
+        await asyncio.sleep(0.15)
+        return held, state.in_flight
+
+    assert asyncio.run(main()) == (1, 0)
@@ -0,0 +1,32 @@
+from app.services.audio_formats import AUDIO_FORMATS
+from app.services.streaming_tts import split_sentences, streaming_format
+
+
+def test_first_sentence_is_its_own_segment():
+    segments = split_sentences("Hi. Ok. Sure. Fine.")
+    assert segments[0] == "Hi."
+    assert segments[1:] == ["Ok. Sure. Fine."]
+
+
+def test_long_sentences_are_split_at_clause_breaks():
+    sentence = "one two three, " * 30
+    segments = split_sentences(sentence, max_chars=100)
+    assert len(segments) > 1
+    assert all(len(segment) <= 100 for segment in segments)
+    assert " ".join(segments).split() == sentence.split()
+
+
+def test_cjk_sentences_need_no_whitespace():
+    assert split_sentences("你好。今天天气很好，我们出去走走吧。", min_chars=0) == ["你好。", "今天天气很好，我们出去走走吧。"]
+
+
+def test_wav_streams_as_pcm_behind_one_header():
+    stream_format, segment_format, preamble = streaming_format(AUDIO_FORMATS["wav-24k"])
+    assert stream_format.name == "wav-24k"
+    assert segment_format.name == "pcm-24k"
+    assert preamble[:4] == b"RIFF" and preamble[8:12] == b"WAVE"
+
+
+def test_opus_is_not_rewrapped():
+    for name in ("opus", "webm-opus", "mp3"):
+        assert streaming_format(AUDIO_FORMATS[name]) == (AUDIO_FORMATS[name], AUDIO_FORMATS[name], b"")
@@ -0,0 +1,23 @@
+import pytest
+
+from app.services.audio_formats import AUDIO_FORMATS
+from app.services.tts_cache import make_cache_key
+
+VOICE = "en-US-JennyNeural"
+
+
+def test_key_ignores_whitespace_differences():
+    assert make_cache_key("Hello  there ", VOICE, AUDIO_FORMATS["mp3"]) == make_cache_key("Hello there", VOICE, AUDIO_FORMATS["mp3"])
+
+
+def test_key_depends_on_voice_format_and_prosody():
+    key = make_cache_key("Hello", VOICE, AUDIO_FORMATS["mp3"])
+    assert key != make_cache_key("Hello", "en-GB-SoniaNeural", AUDIO_FORMATS["mp3"])
+    assert key != make_cache_key("Hello", VOICE, AUDIO_FORMATS["opus"])
+    assert key != make_cache_key("Hello", VOICE, AUDIO_FORMATS["mp3"], prosody="rate=0.8")
+
+
+@pytest.mark.parametrize("voice_name", [None, ""])
+def test_key_requires_a_voice(voice_name):
+    with pytest.raises(ValueError):
+        make_cache_key("Hello", voice_name, AUDIO_FORMATS["mp3"])
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from app.services.audio_buffer import AudioBuffer
+from app.services.vad import SpeechMap, SpeechSegment, detect_speech
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(SAMPLE_RATE * seconds), dtype=np.float32)
+
+
+def speech_map(*segments, duration=10.0):
+    empty = np.zeros(0, dtype=np.float32)
+    return SpeechMap([SpeechSegment(start, end) for start, end in segments], duration, 0.01, empty, empty)
+
+
+def test_detects_speech_between_silences():
+    audio = AudioBuffer(np.concatenate([silence(0.5), tone(1.0), silence(0.5), tone(0.5), silence(0.5)]), SAMPLE_RATE)
+    result = detect_speech(audio)
+    assert len(result.segments) == 2
+    assert result.segments[0].start == pytest.approx(0.5, abs=0.05)
+    assert result.segments[0].end == pytest.approx(1.5, abs=0.05)
+    assert result.segments[1].start == pytest.approx(2.0, abs=0.05)
+    assert result.duration == pytest.approx(3.0)
+
+
+def test_short_pauses_are_bridged_and_silence_has_no_speech():
+    bridged = detect_speech(AudioBuffer(np.concatenate([silence(0.5), tone(0.5), silence(0.1), tone(0.5), silence(0.5)]), SAMPLE_RATE))
+    assert len(bridged.segments) == 1
+    assert detect_speech(AudioBuffer(silence(1.0), SAMPLE_RATE)).is_mostly_silence()
+
+
+def test_bounds_and_pause_metrics():
+    segments = speech_map((1.0, 2.0), (2.5, 4.0), (5.0, 6.0))
+    assert segments.bounds(padding=0.5) == (0.5, 6.5)
+    metrics = segments.pause_metrics()
+    assert metrics["pause_count"] == 2
+    assert metrics["longest_pause_seconds"] == 1.0
+    assert metrics["speech_seconds"] == 3.5
+
+
+def test_utterances_cut_at_the_longest_pauses():
+    segments = speech_map((0.0, 1.0), (1.1, 2.0), (3.0, 4.0), (6.0, 7.0))
+    assert segments.utterances(3, padding=0.0) == [(0.0, 2.0), (3.0, 4.0), (6.0, 7.0)]
+    assert segments.utterances(1, padding=0.0) == [(0.0, 7.0)]
+
+
+def test_chunks_respect_the_limit():
+    segments = speech_map((0.0, 4.0), (5.0, 9.0), (10.0, 30.0), duration=30.0)
+    chunks = segments.chunks(max_seconds=10.0)
+    assert chunks == [(0.0, 9.0), (10.0, 20.0), (20.0, 30.0)]